@@ -130,38 +130,20 @@ const MedicalHistory: React.FC = () => {
       return;
     }
 
-    // Fetching conditions and medications data
+    // Fetching conditions, medications and lab results in one request
     const fetchConditions = async () => {
       try {
-        const conditionsResponse = await fetch(
-          `http://127.0.0.1:5000/api/medical_history/conditions?user_id=${userId}`
+        const summaryResponse = await fetch(
+          `http://127.0.0.1:5000/api/medical_history/summary?user_id=${userId}`
         );
-        const medicationsResponse = await fetch(
-          `http://127.0.0.1:5000/api/medical_history/medications?user_id=${userId}`
-        );
-        const labResultsResponse = await fetch(
-          `http://127.0.0.1:5000/api/medical_history?user_id=${userId}`
-        );
-        const conditionsData = await conditionsResponse.json();
-        const medicationsData = await medicationsResponse.json();
-        const labResultsData = await labResultsResponse.json();
-
-        if (conditionsResponse.ok) {
-          setConditions(conditionsData);
-        } else {
-          setError(conditionsData.error || 'Failed to load conditions.');
-        }
-
-        if (medicationsResponse.ok) {
-          setMedications(medicationsData);
-        } else {
-          setError(medicationsData.error || 'Failed to load medications.');
-        }
+        const summaryData = await summaryResponse.json();
 
-        if (labResultsResponse.ok) {
-          setLabResults(labResultsData);
+        if (summaryResponse.ok) {
+          setConditions(summaryData.conditions);
+          setMedications(summaryData.medications);
+          setLabResults(summaryData.history);
         } else {
-          setError(labResultsData.error || 'Failed to load lab.');
+          setError(summaryData.error || 'Failed to load medical history.');
         }
 
       } catch (error) {
@@ -1,25 +1,44 @@
 from flask import Flask
 from flask_cors import CORS
 from config import Config
-from database import get_db_connection
+import database
+import metrics
+import profiling
+import availability
+import bloom
+import cache
+import passwords
+import tokens
 from views.auth import auth_bp
 from views.dashboard import dashboard_bp
 from views.appointments import appointments_bp
 from views.medical_history import medical_history_bp
+from views.system import system_bp
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     CORS(app)
+    metrics.init_app(app)  # First, so request timings include the other hooks
+    profiling.init_app(app)
+    database.init_app(app)
+    availability.init_app(app)
+    bloom.init_app(app)
+    cache.init_app(app)
+    passwords.init_app(app)
+    tokens.init_app(app)
     
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
     app.register_blueprint(appointments_bp, url_prefix='/api/appointments')
     app.register_blueprint(medical_history_bp,url_prefix='/api/medical_history')
+    if app.config['METRICS_ENABLED'] or app.config['PROFILING_ENABLED']:
+        app.register_blueprint(system_bp, url_prefix='/api/system')  # Operator key required, see views/system.py
     
     return app
 
 if __name__ == '__main__':
+    Config.DEVELOPMENT = True  # The debug server, so the default SECRET_KEY may sign tokens
     app = create_app()
     app.run(debug=True)
@@ -0,0 +1,349 @@
+"""In-memory availability index.
+
+Every (hospital, day) pair is reduced to two small bitmasks: the slots that
+exist (from Timeslots) and the slots that are taken by a Scheduled
+appointment. Bit ``i`` stands for the i-th distinct slot time, so the seeded
+schedule of ten hourly slots fits in a 16-bit word. Masks are kept in flat
+``array`` buffers laid out hospital-row by day, which keeps the whole 3-year
+schedule for a hundred hospitals well under a megabyte.
+"""
+import heapq
+import sys
+import threading
+import time
+from array import array
+from itertools import islice
+from datetime import date, datetime, timedelta
+
+from config import Config
+
+
+def _seconds(value):
+    """Normalizes a TIME value (timedelta, time or 'HH:MM:SS') to seconds since midnight."""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    if isinstance(value, str):
+        hours, minutes, seconds = (int(part) for part in value.split(':'))
+        return hours * 3600 + minutes * 60 + seconds
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+
+class _Bitmaps:
+    """One immutable-shape snapshot of the index; swapped in whole on every warm-up."""
+
+    __slots__ = ('start', 'days', 'times', 'bits', 'rows', 'opened', 'booked')
+
+    def __init__(self, start, days, times, rows, opened, booked):
+        self.start = start
+        self.days = days
+        self.times = times
+        self.bits = {seconds: bit for bit, seconds in enumerate(times)}
+        self.rows = rows
+        self.opened = opened
+        self.booked = booked
+
+    def offset(self, hospital_id, day):
+        """Array offset of a (hospital, day); -1 for an unknown hospital, None if out of window."""
+        if self.start is None:
+            return None
+        index = (day - self.start).days
+        if index < 0 or index >= self.days:
+            return None
+        row = self.rows.get(hospital_id)
+        return -1 if row is None else row * self.days + index
+
+
+class AvailabilityIndex:
+    """Per-(hospital, day) bitmaps of open and booked slots, updated incrementally."""
+
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval
+        self.ready = False
+        self.warmed_at = None
+        self.warm_seconds = None
+
+        self._lock = threading.RLock()
+        self._warming = False
+        self._journal = []
+        self._state = _Bitmaps(None, 0, [], {}, array('H'), array('H'))
+
+    # Warm-up
+
+    def warm(self, connection, start=None, days=None, schedule=None):
+        """Loads slots and Scheduled appointments for ``days`` days from ``start``.
+
+        Slots come from Timeslots, or are generated from ``schedule`` (a
+        schedule.ScheduleBook) when one is given.
+        """
+        started = time.monotonic()
+        start = start or date.today()
+        days = days or Config.AVAILABILITY_INDEX_DAYS
+        end = start + timedelta(days=days)
+
+        with self._lock:
+            self._warming = True
+            self._journal = []
+        try:
+            cursor = connection.cursor()
+            try:
+                if schedule is not None:
+                    times = schedule.distinct_times()
+                else:
+                    cursor.execute("""
+                        SELECT DISTINCT timeslot_time FROM Timeslots
+                        WHERE timeslot_date >= %s AND timeslot_date < %s
+                    """, (start, end))
+                    times = sorted(_seconds(row[0]) for row in cursor.fetchall())
+                if len(times) > 64:
+                    raise ValueError(f"{len(times)} distinct slot times do not fit a 64-bit mask")
+                typecode = 'H' if len(times) <= 16 else 'Q'
+                bits = {seconds: bit for bit, seconds in enumerate(times)}
+                rows = {}
+                opened, booked = array(typecode), array(typecode)
+
+                def row_of(hospital_id):
+                    row = rows.get(hospital_id)
+                    if row is None:
+                        row = rows[hospital_id] = len(rows)
+                        opened.frombytes(bytes(days * opened.itemsize))
+                        booked.frombytes(bytes(days * booked.itemsize))
+                    return row
+
+                if schedule is not None:
+                    masks = {}  # Most days share a handful of rule sets
+                    for hospital_id in schedule.hospital_ids:
+                        base = row_of(hospital_id) * days
+                        for index in range(days):
+                            slot_times = schedule.slot_times(hospital_id, start + timedelta(days=index))
+                            if slot_times:
+                                mask = masks.get(slot_times)
+                                if mask is None:
+                                    mask = masks[slot_times] = sum(1 << bits[seconds] for seconds in slot_times)
+                                opened[base + index] = mask
+                else:
+                    cursor.execute("""
+                        SELECT hospital_id, timeslot_date, timeslot_time FROM Timeslots
+                        WHERE timeslot_date >= %s AND timeslot_date < %s
+                    """, (start, end))
+                    for hospital_id, slot_date, slot_time in self._stream(cursor):
+                        offset = row_of(hospital_id) * days + (slot_date - start).days
+                        opened[offset] |= 1 << bits[_seconds(slot_time)]
+
+                cursor.execute("""
+                    SELECT hospital_id, appointment_time FROM Appointments
+                    WHERE status = 'Scheduled' AND appointment_time >= %s AND appointment_time < %s
+                """, (datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())))
+                for hospital_id, when in self._stream(cursor):
+                    bit = bits.get(_seconds(when))
+                    row = rows.get(hospital_id)
+                    if bit is not None and row is not None:
+                        booked[row * days + (when.date() - start).days] |= 1 << bit
+            finally:
+                cursor.close()
+
+            with self._lock:
+                self._state = _Bitmaps(start, days, times, rows, opened, booked)
+                # Replay bookings that committed while the snapshot was loading
+                for apply, args in self._journal:
+                    apply(*args)
+                self._journal = []
+                self.ready = True
+                self.warmed_at = time.monotonic()
+                self.warm_seconds = round(self.warmed_at - started, 3)
+        finally:
+            with self._lock:
+                self._warming = False
+        return self
+
+    @staticmethod
+    def _stream(cursor, size=10000):
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            yield from rows
+
+    def needs_refresh(self):
+        return (self.refresh_interval is not None and self.warmed_at is not None and
+                not self._warming and time.monotonic() - self.warmed_at > self.refresh_interval)
+
+    # Lookups
+
+    def covers(self, day):
+        """Whether lookups for ``day`` can be answered from the index."""
+        state = self._state
+        return self.ready and state.start is not None and 0 <= (_as_date(day) - state.start).days < state.days
+
+    def free_mask(self, hospital_id, day):
+        """Bitmask of open, unbooked slots, or None when the day is outside the index."""
+        state = self._state
+        offset = state.offset(int(hospital_id), _as_date(day)) if self.ready else None
+        if offset is None:
+            return None
+        if offset < 0:
+            return 0
+        return state.opened[offset] & ~state.booked[offset]
+
+    def available_times(self, hospital_id, day, booked=None):
+        """Free slot times formatted like the SQL path ('H:MM:SS'), or None if not answerable.
+
+        ``booked``, the day's Scheduled appointment times read from the
+        database, replaces the in-memory booked mask, which only sees this
+        process's bookings between reloads.
+        """
+        state = self._state
+        offset = state.offset(int(hospital_id), _as_date(day)) if self.ready else None
+        if offset is None:
+            return None
+        if offset < 0:
+            return []
+        if booked is None:
+            taken = state.booked[offset]
+        else:
+            taken = sum(1 << state.bits[_seconds(when)] for when in booked if _seconds(when) in state.bits)
+        mask = state.opened[offset] & ~taken
+        return [str(timedelta(seconds=state.times[bit])) for bit in self._bits_set(mask)]
+
+    def earliest_free(self, after, limit, hospital_ids=None, until=None):
+        """First ``limit`` free slots strictly after ``after``, as (datetime, hospital_id).
+
+        Each hospital contributes a lazy, time-ordered stream of its free slots
+        and the streams are k-way merged, so the scan stops as soon as ``limit``
+        slots are found. Returns None when the answer may lie outside the index.
+        """
+        state = self._state
+        if not self.ready or state.start is None or after.date() < state.start:
+            return None
+        window_end = state.start + timedelta(days=state.days)
+        until = until or window_end
+        hospital_ids = list(state.rows) if hospital_ids is None else [int(h) for h in hospital_ids]
+
+        streams = [self._free_slots(state, hospital_id, after, min(until, window_end)) for hospital_id in hospital_ids]
+        slots = list(islice(heapq.merge(*streams), limit))
+        if len(slots) < limit and until > window_end:
+            return None
+        return slots
+
+    def _free_slots(self, state, hospital_id, after, until):
+        row = state.rows.get(hospital_id)
+        if row is None:
+            return
+        base = row * state.days
+        first = (after.date() - state.start).days
+        after_seconds = _seconds(after)
+        for index in range(first, (until - state.start).days):
+            mask = state.opened[base + index] & ~state.booked[base + index]
+            if not mask:
+                continue
+            midnight = datetime.combine(state.start + timedelta(days=index), datetime.min.time())
+            for bit in self._bits_set(mask):
+                if index == first and state.times[bit] <= after_seconds:
+                    continue
+                yield midnight + timedelta(seconds=state.times[bit]), hospital_id
+
+    @staticmethod
+    def _bits_set(mask):
+        bit = 0
+        while mask:
+            if mask & 1:
+                yield bit
+            mask >>= 1
+            bit += 1
+
+    # Incremental updates
+
+    def mark_booked(self, hospital_id, when):
+        self._update(self._set_booked, (int(hospital_id), _as_datetime(when), True))
+
+    def mark_free(self, hospital_id, when):
+        self._update(self._set_booked, (int(hospital_id), _as_datetime(when), False))
+
+    def _update(self, apply, args):
+        with self._lock:
+            if self._warming:
+                self._journal.append((apply, args))
+            apply(*args)
+
+    def _set_booked(self, hospital_id, when, booked):
+        state = self._state
+        bit = state.bits.get(_seconds(when))
+        offset = state.offset(hospital_id, when.date())
+        if bit is None or offset is None or offset < 0:
+            return
+        if booked:
+            state.booked[offset] |= 1 << bit
+        else:
+            state.booked[offset] &= ~(1 << bit)
+
+    # Reporting
+
+    def memory_footprint(self):
+        """Approximate bytes held by the index, split by structure."""
+        state = self._state
+        bitmaps = (state.opened.buffer_info()[1] + state.booked.buffer_info()[1]) * state.opened.itemsize
+        rows = sys.getsizeof(state.rows) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in state.rows.items())
+        times = sys.getsizeof(state.times) + sys.getsizeof(state.bits) + sum(sys.getsizeof(t) for t in state.times)
+        return {"bitmaps": bitmaps, "hospital_rows": rows, "slot_times": times, "total": bitmaps + rows + times}
+
+    def stats(self):
+        state = self._state
+        return {
+            "ready": self.ready,
+            "start_date": state.start.isoformat() if state.start else None,
+            "days": state.days,
+            "hospitals": len(state.rows),
+            "slot_times": len(state.times),
+            "mask_bits": state.opened.itemsize * 8,
+            "warm_seconds": self.warm_seconds,
+            "memory_bytes": self.memory_footprint(),
+        }
+
+
+availability_index = AvailabilityIndex(refresh_interval=Config.AVAILABILITY_INDEX_REFRESH)
+
+
+def warm_in_background():
+    """Rebuilds the shared index on a daemon thread; lookups use SQL until it is ready."""
+    from database import create_connection
+
+    with availability_index._lock:
+        if availability_index._warming:
+            return None
+        availability_index._warming = True
+
+    def run():
+        connection = create_connection()
+        try:
+            schedule = None
+            if Config.TIMESLOT_SOURCE == 'schedule':
+                from schedule import current_schedule
+                schedule = current_schedule()
+            availability_index.warm(connection, schedule=schedule)
+        except Exception as e:
+            print(f"Error warming availability index: {e}")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run, name='availability-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def init_app(app):
+    """Starts warming the index when AVAILABILITY_INDEX_ENABLED is set."""
+    if app.config.get('AVAILABILITY_INDEX_ENABLED') and not availability_index.ready:
+        warm_in_background()
@@ -0,0 +1,187 @@
+"""Bloom filter of registered emails for negative lookups.
+
+Signup checks the filter before hashing: an email the filter has never seen
+is almost certainly new, so the duplicate-email SELECT is skipped and the
+unique index on Users.email catches the rare miss at INSERT. False positives
+only cost the query that would have been made anyway. Login does not use it.
+
+init_app loads the filter on a background thread at startup, so no request
+waits for the full scan of Users; until it is ready every signup asks Users.
+
+Users created by other worker processes reach the filter through an
+incremental catch-up over ``user_id > watermark``. When an email misses, a
+catch-up runs first, but at most once per Config.EMAIL_FILTER_CATCHUP_INTERVAL,
+so a burst of unknown emails costs at most one cheap primary-key range query
+per interval.
+
+A miss is therefore not proof of absence. InnoDB hands out auto-increment
+ids before commit, not in commit order, so a user whose id is below a
+watermark another commit already moved past is missed until the next full
+load. Nothing may turn a user away on a miss alone; the unique index on
+Users.email and the indexed lookup stay authoritative.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from config import Config
+
+
+def normalize_email(email):
+    # Users.email uses a case-insensitive collation, so the filter must too
+    return email.strip().lower()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one blake2b digest."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def memory_bytes(self):
+        return len(self._bits)
+
+
+class EmailFilter:
+    """Bloom filter over Users.email, kept current by user_id watermark."""
+
+    def __init__(self, error_rate=0.001, catchup_interval=1.0):
+        self.error_rate = error_rate
+        self.catchup_interval = catchup_interval
+        self.ready = False
+        self.watermark = 0
+        self.skipped_lookups = 0
+        self.catchups = 0
+        self._loading = False
+
+        self._lock = threading.Lock()
+        self._filter = BloomFilter(1, error_rate)
+        self._caught_up_at = 0.0
+
+    def load(self, connection):
+        """Rebuilds the filter from every email in Users."""
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*), COALESCE(MAX(user_id), 0) FROM Users")
+            count, watermark = cursor.fetchone()
+            # Headroom so catch-ups can add users before the error rate degrades
+            bloom = BloomFilter(max(1024, 2 * count), self.error_rate)
+            cursor.execute("SELECT email FROM Users WHERE user_id <= %s", (watermark,))
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                for (email,) in rows:
+                    bloom.add(normalize_email(email))
+        finally:
+            cursor.close()
+        with self._lock:
+            self._filter = bloom
+            self.watermark = max(self.watermark, watermark)
+            self._caught_up_at = time.monotonic()
+            self.ready = True
+        return self
+
+    def warm_in_background(self):
+        """Loads the filter on a daemon thread unless a load is already running."""
+        from database import create_connection
+
+        with self._lock:
+            if self._loading:
+                return None
+            self._loading = True
+
+        def run():
+            try:
+                connection = create_connection()
+                try:
+                    self.load(connection)
+                finally:
+                    connection.close()
+            except Exception as e:
+                print(f"Error loading email filter: {e}")
+            finally:
+                self._loading = False
+
+        thread = threading.Thread(target=run, name='email-filter-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def catch_up(self, connection):
+        """Adds users created since the last load or catch-up; rebuilds when the filter is full."""
+        with self._lock:
+            self._caught_up_at = time.monotonic()
+            watermark = self.watermark
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT user_id, email FROM Users WHERE user_id > %s ORDER BY user_id", (watermark,))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        with self._lock:
+            for user_id, email in rows:
+                self._filter.add(normalize_email(email))
+                self.watermark = max(self.watermark, user_id)
+            self.catchups += 1
+            full = self._filter.count > self._filter.capacity
+        if full:
+            self.load(connection)
+        return len(rows)
+
+    def add(self, email):
+        """Records a user created by this process."""
+        with self._lock:
+            self._filter.add(normalize_email(email))
+
+    def might_contain(self, email):
+        return normalize_email(email) in self._filter
+
+    def catch_up_due(self):
+        return time.monotonic() - self._caught_up_at >= self.catchup_interval
+
+    def record_skipped_lookup(self):
+        with self._lock:
+            self.skipped_lookups += 1
+
+    def stats(self):
+        bloom = self._filter
+        return {
+            "ready": self.ready,
+            "emails": bloom.count,
+            "capacity": bloom.capacity,
+            "hashes": bloom.hashes,
+            "memory_bytes": bloom.memory_bytes(),
+            "watermark": self.watermark,
+            "skipped_lookups": self.skipped_lookups,  # Signup duplicate-email SELECTs avoided
+            "catchups": self.catchups,
+        }
+
+
+email_filter = EmailFilter(Config.EMAIL_FILTER_ERROR_RATE, Config.EMAIL_FILTER_CATCHUP_INTERVAL)
+
+
+def init_app(app):
+    """Starts loading the filter when EMAIL_FILTER_ENABLED is set."""
+    if app.config.get('EMAIL_FILTER_ENABLED') and not email_filter.ready:
+        email_filter.warm_in_background()
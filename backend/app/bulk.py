@@ -0,0 +1,183 @@
+"""Bulk loading helpers for seed and dataset scripts.
+
+Rows are consumed from any iterable in fixed-size chunks, so generators of
+tens of millions of rows load in constant memory. Two write paths:
+
+* insert_rows: ``executemany`` on an INSERT ... VALUES statement, which
+  mysql-connector rewrites into one multi-row INSERT per chunk.
+* load_infile: each chunk is written to a temporary CSV file and loaded with
+  ``LOAD DATA LOCAL INFILE``, the fastest path. It needs
+  ``local_infile=ON`` on the server and a connection opened with
+  ``allow_local_infile=True``.
+
+Wrap loads in bulk_session() to skip per-row foreign key and unique checks
+and to defer non-unique index maintenance where the engine supports it.
+"""
+import csv
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+
+def chunked(rows, size):
+    """Yields lists of up to ``size`` rows from any iterable."""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class LoadStats:
+    """Row count and timing for one table load."""
+
+    def __init__(self, table, method):
+        self.table = table
+        self.method = method
+        self.rows = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.seconds) if self.seconds else None
+
+    def as_dict(self):
+        return {"table": self.table, "method": self.method, "rows": self.rows,
+                "seconds": round(self.seconds, 3), "rows_per_second": self.rows_per_second}
+
+    def __str__(self):
+        return (f"{self.table:<20} {self.rows:>12,} rows in {self.seconds:8.2f}s "
+                f"({self.rows_per_second or 0:,} rows/s, {self.method})")
+
+
+@contextmanager
+def bulk_session(connection, tables, unique_checks=False):
+    """Relaxes per-row checks for the session while ``tables`` are loaded.
+
+    InnoDB ignores DISABLE KEYS (only MyISAM defers index builds), so the
+    large wins there come from unique_checks / foreign_key_checks being off
+    and from committing once per chunk rather than per row. The loaded data
+    must already satisfy the constraints: they are not re-checked afterwards.
+    Pass unique_checks=True when loading with ignore=True into tables that
+    may already hold some of the rows, since InnoDB may skip duplicate checks
+    while they are off. On SQLite only foreign key enforcement is switched off.
+    """
+    if getattr(connection, 'dialect', 'mysql') == 'sqlite':
+        connection.commit()  # PRAGMA foreign_keys is ignored inside a transaction
+        connection.raw.execute("PRAGMA foreign_keys = OFF")
+        try:
+            yield
+        finally:
+            connection.commit()
+            connection.raw.execute("PRAGMA foreign_keys = ON")
+        return
+    cursor = connection.cursor()
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    if not unique_checks:
+        cursor.execute("SET SESSION unique_checks = 0")
+    for table in tables:
+        cursor.execute(f"ALTER TABLE `{table}` DISABLE KEYS")
+    try:
+        yield
+    finally:
+        for table in tables:
+            cursor.execute(f"ALTER TABLE `{table}` ENABLE KEYS")
+        if not unique_checks:
+            cursor.execute("SET SESSION unique_checks = 1")
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+        cursor.close()
+
+
+def _insert_verb(connection, ignore):
+    if not ignore:
+        return 'INSERT'
+    return 'INSERT OR IGNORE' if getattr(connection, 'dialect', 'mysql') == 'sqlite' else 'INSERT IGNORE'
+
+
+def insert_rows(connection, table, columns, rows, chunk_size=5000, progress=None, ignore=False):
+    """Inserts ``rows`` with one multi-row INSERT per chunk; returns LoadStats.
+
+    With ``ignore``, rows that collide with a unique key are skipped.
+    """
+    stats = LoadStats(table, 'executemany')
+    sql = (f"{_insert_verb(connection, ignore)} INTO `{table}` ({', '.join(columns)}) "
+           f"VALUES ({', '.join(['%s'] * len(columns))})")
+    started = time.perf_counter()
+    cursor = connection.cursor()
+    try:
+        for chunk in chunked(rows, chunk_size):
+            cursor.executemany(sql, chunk)
+            connection.commit()
+            stats.rows += len(chunk)
+            if progress:
+                progress(stats)
+    finally:
+        cursor.close()
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def _csv_value(value):
+    # LOAD DATA's defaults: \N is NULL and backslash is the escape character
+    if value is None:
+        return '\\N'
+    if isinstance(value, timedelta):
+        total = int(value.total_seconds())
+        return f"{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\')
+    return value
+
+
+def write_csv(path, rows):
+    """Writes rows in the format load_infile reads; returns the row count."""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out, lineterminator='\n')
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+            count += 1
+    return count
+
+
+def load_infile(connection, table, columns, rows, chunk_size=500000, progress=None, ignore=False):
+    """Loads ``rows`` through temporary CSV files and LOAD DATA LOCAL INFILE; returns LoadStats.
+
+    With ``ignore``, rows that collide with a unique key are skipped.
+    """
+    if getattr(connection, 'dialect', 'mysql') != 'mysql':
+        raise ValueError("LOAD DATA LOCAL INFILE needs MySQL; use the executemany method")
+    stats = LoadStats(table, 'load_data_infile')
+    sql = (f"LOAD DATA LOCAL INFILE %s {'IGNORE ' if ignore else ''}INTO TABLE `{table}` CHARACTER SET utf8mb4 "
+           f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+           f"LINES TERMINATED BY '\\n' ({', '.join(columns)})")
+    started = time.perf_counter()
+    cursor = connection.cursor()
+    fd, path = tempfile.mkstemp(prefix=f"{table}-", suffix='.csv')
+    os.close(fd)
+    try:
+        for chunk in chunked(rows, chunk_size):
+            write_csv(path, chunk)
+            cursor.execute(sql, (path,))
+            connection.commit()
+            stats.rows += len(chunk)
+            if progress:
+                progress(stats)
+    finally:
+        cursor.close()
+        os.unlink(path)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def load(connection, table, columns, rows, method='executemany', chunk_size=None, progress=None, ignore=False):
+    """Loads rows with the named method: 'executemany' or 'infile'."""
+    if method == 'infile':
+        return load_infile(connection, table, columns, rows, chunk_size or 500000, progress, ignore)
+    if method == 'executemany':
+        return insert_rows(connection, table, columns, rows, chunk_size or 5000, progress, ignore)
+    raise ValueError(f"Unknown load method: {method}")
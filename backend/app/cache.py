@@ -0,0 +1,423 @@
+"""Read-through cache for model reads.
+
+Decorate a model's static read method with ``@cached(ttl, tags)`` and
+invalidate from write paths with ``cache.invalidate('user:42')``. Tags name
+the data a cached value depends on, e.g. ``user:42`` or ``hospital:7``.
+
+Two backends are available, selected by Config.CACHE_BACKEND:
+
+* ``memory``: a per-process LRU with per-entry TTL.
+* ``file``: entries stored as JSON in Config.CACHE_DIR and shared by every
+  worker process on the host. Tags are generation stamps stored as files.
+  Each entry records the stamps it was written under, so invalidating a tag
+  in one worker makes the entry stale in all of them. The entries hold
+  patient records, so the directory must be set explicitly; it is created
+  with mode 0700 and refused if another user owns it or can get into it.
+"""
+import copy
+import functools
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from config import Config
+from database import on_commit
+
+
+class _Counters:
+    """Hit/miss/eviction counters shared by the backends."""
+
+    FIELDS = ('hits', 'misses', 'sets', 'evictions', 'expirations', 'invalidations')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def incr(self, field, amount=1):
+        with self._lock:
+            self._counts[field] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry TTL and a tag -> keys index."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.counters = _Counters()
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self._tags = {}                # tag -> set of keys
+        self._generations = {}         # tag -> clock value of its last invalidation
+        self._base_generation = 0      # generation of tags not in _generations
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def generations(self, tags):
+        """Snapshot of the tags' generations, taken before the cached value is computed."""
+        with self._lock:
+            return {tag: self._generations.get(tag, self._base_generation) for tag in tags}
+
+    def get(self, key):
+        """Returns (True, value) on a hit and (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._remove(key)
+                self.counters.incr('expirations')
+                entry = None
+            if entry is None:
+                self.counters.incr('misses')
+                return False, None
+            self._entries.move_to_end(key)
+        self.counters.incr('hits')
+        return True, copy.deepcopy(entry[0])
+
+    def set(self, key, value, ttl, generations):
+        value = copy.deepcopy(value)
+        tags = tuple(generations)
+        with self._lock:
+            # Invalidated while the value was being computed: it may already be stale
+            if any(self._generations.get(tag, self._base_generation) != generation
+                   for tag, generation in generations.items()):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.counters.incr('evictions')
+        self.counters.incr('sets')
+
+    def invalidate(self, tag):
+        with self._lock:
+            self._clock += 1
+            self._generations[tag] = self._clock
+            if len(self._generations) > 4 * self.max_entries:
+                # Forget old generations; the new base differs from every snapshot in flight
+                self._clock += 1
+                self._generations.clear()
+                self._base_generation = self._clock
+            keys = self._tags.pop(tag, ())
+            for key in list(keys):
+                self._remove(key)
+        self.counters.incr('invalidations')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._clock += 1
+            self._generations.clear()
+            self._base_generation = self._clock
+
+    def size(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        # Called with the lock held
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+def _encode(value):
+    # The types database rows carry besides JSON's own, tagged so they decode back
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"$timedelta": value.total_seconds()}
+    if isinstance(value, Decimal):
+        return {"$decimal": str(value)}
+    raise TypeError(f"Cannot cache a value of type {type(value).__name__}")
+
+
+def _decode(obj):
+    if len(obj) == 1:
+        (tag, value), = obj.items()
+        if tag == '$datetime':
+            return datetime.fromisoformat(value)
+        if tag == '$date':
+            return date.fromisoformat(value)
+        if tag == '$timedelta':
+            return timedelta(seconds=value)
+        if tag == '$decimal':
+            return Decimal(value)
+    return obj
+
+
+def _private_directory(directory):
+    """Creates ``directory`` with mode 0700, or checks that an existing one is as private."""
+    if not directory:
+        raise ValueError("CACHE_DIR must be set for the file cache backend")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        raise PermissionError(f"Cache directory {directory} is owned by another user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(directory, 0o700)
+
+
+class FileBackend:
+    """Cache shared between worker processes through files in a local directory."""
+
+    name = 'file'
+
+    def __init__(self, directory, max_entries=10000, prune_every=500):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self.counters = _Counters()
+        self._entries_dir = os.path.join(directory, 'entries')
+        self._tags_dir = os.path.join(directory, 'tags')
+        _private_directory(directory)
+        os.makedirs(self._entries_dir, mode=0o700, exist_ok=True)
+        os.makedirs(self._tags_dir, mode=0o700, exist_ok=True)
+        self._sets_since_prune = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(value):
+        return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self._entries_dir, self._digest(key))
+
+    def _tag_path(self, tag):
+        return os.path.join(self._tags_dir, self._digest(tag))
+
+    def _generation(self, tag):
+        try:
+            with open(self._tag_path(tag)) as stamp:
+                return stamp.read()
+        except FileNotFoundError:
+            return ''
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'w') as out:
+                out.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get(self, key):
+        path = self._entry_path(key)
+        try:
+            with open(path) as entry_file:
+                stored_key, value, expires_at, generations = json.load(entry_file, object_hook=_decode)
+        except (FileNotFoundError, ValueError):
+            self.counters.incr('misses')
+            return False, None
+
+        if stored_key != key:
+            self.counters.incr('misses')
+            return False, None
+        if expires_at < time.time():
+            self._unlink(path)
+            self.counters.incr('expirations')
+            self.counters.incr('misses')
+            return False, None
+        if any(self._generation(tag) != generation for tag, generation in generations.items()):
+            self._unlink(path)
+            self.counters.incr('misses')
+            return False, None
+
+        try:
+            os.utime(path)  # Recency for LRU pruning
+        except FileNotFoundError:
+            pass
+        self.counters.incr('hits')
+        return True, value
+
+    def generations(self, tags):
+        return {tag: self._generation(tag) for tag in tags}
+
+    def set(self, key, value, ttl, generations):
+        # Stamps taken before the value was computed: an invalidation in between
+        # makes this entry stale on its first read
+        payload = json.dumps([key, value, time.time() + ttl, generations], default=_encode)
+        self._write_atomic(self._entry_path(key), payload)
+        self.counters.incr('sets')
+        with self._lock:
+            self._sets_since_prune += 1
+            prune = self._sets_since_prune >= self.prune_every
+            if prune:
+                self._sets_since_prune = 0
+        if prune:
+            self.prune()
+
+    def invalidate(self, tag):
+        # A fresh random stamp rather than a counter, so concurrent
+        # invalidations never need a read-modify-write
+        self._write_atomic(self._tag_path(tag), uuid.uuid4().hex)
+        self.counters.incr('invalidations')
+
+    def prune(self):
+        """Drops the least recently used entries beyond max_entries."""
+        with os.scandir(self._entries_dir) as entries:
+            files = [(entry.stat().st_mtime, entry.path) for entry in entries if entry.is_file()]
+        excess = len(files) - self.max_entries
+        if excess > 0:
+            files.sort()
+            for _, path in files[:excess]:
+                self._unlink(path)
+            self.counters.incr('evictions', excess)
+
+    def clear(self):
+        with os.scandir(self._entries_dir) as entries:
+            for entry in entries:
+                self._unlink(entry.path)
+
+    def size(self):
+        return len(os.listdir(self._entries_dir))
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class NullBackend:
+    """Caching switched off: every lookup misses and nothing is stored."""
+
+    name = 'none'
+
+    def __init__(self):
+        self.counters = _Counters()
+
+    def get(self, key):
+        self.counters.incr('misses')
+        return False, None
+
+    def generations(self, tags):
+        return {}
+
+    def set(self, key, value, ttl, generations):
+        pass
+
+    def invalidate(self, tag):
+        pass
+
+    def clear(self):
+        pass
+
+    def size(self):
+        return 0
+
+
+def create_backend(name, max_entries=None, directory=None):
+    max_entries = max_entries or Config.CACHE_MAX_ENTRIES
+    if name == 'memory':
+        return MemoryBackend(max_entries)
+    if name == 'file':
+        return FileBackend(directory or Config.CACHE_DIR, max_entries)
+    if name == 'none':
+        return NullBackend()
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+class Cache:
+    """Facade the models use; the backend can be swapped at app start-up."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def configure(self, backend):
+        self.backend = backend
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            try:
+                self.backend.invalidate(tag)
+            except Exception as e:
+                print(f"Error invalidating cache tag {tag}: {e}")
+
+    def stats(self):
+        stats = self.backend.counters.snapshot()
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        stats['backend'] = self.backend.name
+        stats['entries'] = self.backend.size()
+        return stats
+
+    def cached(self, ttl=None, tags=None):
+        """Decorator caching a function's result by its arguments.
+
+        ``tags`` is called with the same arguments and returns the tags the
+        result depends on. None results are not cached, so errors are retried.
+        Inside a request the entry is written only once the unit of work has
+        committed: the read may see the request's own uncommitted rows.
+        """
+        def decorator(func):
+            prefix = f"{func.__module__}.{func.__qualname__}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = f"{prefix}:{args!r}:{sorted(kwargs.items())!r}"
+                try:
+                    hit, value = self.backend.get(key)
+                except Exception as e:
+                    print(f"Error reading cache: {e}")
+                    hit, value = False, None
+                if hit:
+                    return value
+
+                backend = self.backend
+                try:
+                    generations = backend.generations(tags(*args, **kwargs) if tags else ())
+                except Exception as e:
+                    print(f"Error reading cache tags: {e}")
+                    return func(*args, **kwargs)
+
+                value = func(*args, **kwargs)
+                if value is not None:
+                    entry = copy.deepcopy(value)  # The caller may change its copy before the commit
+
+                    def fill():
+                        try:
+                            backend.set(key, entry, ttl or Config.CACHE_DEFAULT_TTL, generations)
+                        except Exception as e:
+                            print(f"Error writing cache: {e}")
+                    on_commit(fill)
+                return value
+            return wrapper
+        return decorator
+
+
+cache = Cache(create_backend(Config.CACHE_BACKEND))
+cached = cache.cached
+
+
+def init_app(app):
+    """Gives each app a fresh backend built from its config."""
+    cache.configure(create_backend(
+        app.config.get('CACHE_BACKEND', Config.CACHE_BACKEND),
+        app.config.get('CACHE_MAX_ENTRIES'),
+        app.config.get('CACHE_DIR'),
+    ))
@@ -1,13 +1,24 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=env_path)
 
+DEFAULT_SECRET_KEY = 'default-secret-key'  # Public, so tokens.init_app only accepts it in development
+
 class Config:
     # Flask Configuration
-    SECRET_KEY = os.getenv('SECRET_KEY', 'default-secret-key')  # A default secret key for development
+    SECRET_KEY = os.getenv('SECRET_KEY', DEFAULT_SECRET_KEY)  # A default secret key for development
+    DEVELOPMENT = os.getenv('FLASK_ENV') == 'development'  # Allows the default SECRET_KEY while AUTH_REQUIRED is off
+
+    # Storage backend (app/storage): 'mysql', or 'sqlite' to run without a database server
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mysql')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'medtrack.db'))  # ':memory:' for a throwaway database
+    SQLITE_SCHEMA = os.getenv('SQLITE_SCHEMA', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'database', 'sqlite', 'schema.sql'))
+    SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 5))  # Seconds a writer waits for the database lock
 
     # MySQL Database Configuration
     DB_HOST = os.getenv('DB_HOST', 'localhost')
@@ -15,4 +26,98 @@ class Config:
     DB_PASSWORD = os.getenv('DB_PASSWORD')
     DB_NAME = os.getenv('DB_NAME')
     DB_ROOT_PASSWORD = os.getenv('DB_ROOT_PASSWORD')  # Only if root access is needed
-    DB_UNIX_SOCKET = os.getenv('DB_UNIX_SOCKET', None)  # Optional socket connection
\ No newline at end of file
+    DB_UNIX_SOCKET = os.getenv('DB_UNIX_SOCKET', None)  # Optional socket connection
+
+    # Connection pool used by database.get_db_connection
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))  # Connections kept open per worker process
+    DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))  # Extra connections allowed under load
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+    DB_POOL_MAX_IDLE_TIME = float(os.getenv('DB_POOL_MAX_IDLE_TIME', 300))  # Seconds before an idle connection is replaced
+    DB_POOL_RECYCLE = float(os.getenv('DB_POOL_RECYCLE', 3600))  # Max age in seconds; keep below MySQL wait_timeout
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'  # Health-check connections on checkout
+    QUERY_COUNT_HEADER = os.getenv('QUERY_COUNT_HEADER', 'false').lower() == 'true'  # Report statements per request in X-DB-Query-Count
+
+    # Request and query metrics served from /metrics (app/metrics.py)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_MAX_STATEMENTS = int(os.getenv('METRICS_MAX_STATEMENTS', 200))  # Distinct query fingerprints before new ones count as "other"
+
+    # Slow-query log with EXPLAIN plans (app/slowlog.py, summarised by scripts/slow_queries.py)
+    SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', 'true').lower() == 'true'
+    SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.2))  # Seconds, execute plus fetches
+    SLOW_QUERY_THROTTLE = float(os.getenv('SLOW_QUERY_THROTTLE', 60))  # Seconds between entries for one fingerprint
+    SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'  # Capture the plan on a background connection
+    SLOW_QUERY_LOG_PATH = os.getenv('SLOW_QUERY_LOG_PATH', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'slow_queries.jsonl'))
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))  # Rotate after this size
+    SLOW_QUERY_LOG_BACKUPS = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', 5))  # Rotated files kept
+
+    # Per-request profiling (app/profiling.py), listed under /api/system/profiles
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILER = os.getenv('PROFILER', 'cprofile')  # 'cprofile' (.pstats) or 'sampling' (.collapsed flamegraph stacks)
+    PROFILING_HEADER = os.getenv('PROFILING_HEADER', 'X-Profile')
+    PROFILING_KEY = os.getenv('PROFILING_KEY', '')  # Header value that requests a profile; empty disables the header
+    PROFILING_SAMPLE_RATE = int(os.getenv('PROFILING_SAMPLE_RATE', 0))  # Profile 1 in N requests; 0 only on request
+    PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', 0.005))  # Seconds between stack samples
+    PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'medtrack-profiles'))
+    PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', 50))  # Older profiles are deleted
+
+    # Operator endpoints under /api/system, registered when metrics or profiling is enabled
+    SYSTEM_HEADER = os.getenv('SYSTEM_HEADER', 'X-System-Key')
+    SYSTEM_KEY = os.getenv('SYSTEM_KEY', '')  # Header value every /api/system request must carry; empty refuses them all
+
+    # Schema migrations applied by app/migrate.py
+    MIGRATIONS_DIR = os.getenv('MIGRATIONS_DIR', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'database', 'migrations'))
+
+    # In-memory availability bitmaps (app/availability.py), one copy per worker process
+    AVAILABILITY_INDEX_ENABLED = os.getenv('AVAILABILITY_INDEX_ENABLED', 'false').lower() == 'true'  # Range and earliest lookups lag other workers' bookings by up to AVAILABILITY_INDEX_REFRESH seconds
+    AVAILABILITY_INDEX_DAYS = int(os.getenv('AVAILABILITY_INDEX_DAYS', 3 * 366))  # Days from today kept in memory
+    AVAILABILITY_INDEX_REFRESH = float(os.getenv('AVAILABILITY_INDEX_REFRESH', 300))  # Seconds between full reloads
+
+    # Limits for /api/appointments/availability range lookups
+    AVAILABILITY_RANGE_MAX_DAYS = int(os.getenv('AVAILABILITY_RANGE_MAX_DAYS', 62))
+    AVAILABILITY_RANGE_MAX_HOSPITALS = int(os.getenv('AVAILABILITY_RANGE_MAX_HOSPITALS', 50))
+
+    # Earliest-available-slot search (/api/appointments/earliest)
+    EARLIEST_SLOTS_MAX = int(os.getenv('EARLIEST_SLOTS_MAX', 50))  # Largest limit a client may ask for
+    EARLIEST_SLOTS_HORIZON_DAYS = int(os.getenv('EARLIEST_SLOTS_HORIZON_DAYS', 3 * 366))  # How far ahead to search
+    EARLIEST_SLOTS_MERGE_MAX_HOSPITALS = int(os.getenv('EARLIEST_SLOTS_MERGE_MAX_HOSPITALS', 10))  # Per-hospital merge up to this many
+
+    # Booking retries on deadlock / lock wait timeout
+    BOOKING_MAX_RETRIES = int(os.getenv('BOOKING_MAX_RETRIES', 3))
+    BOOKING_RETRY_BACKOFF = float(os.getenv('BOOKING_RETRY_BACKOFF', 0.01))  # Seconds, multiplied by the attempt number
+
+    # Read-through cache for model reads (app/cache.py)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')  # 'memory', 'file' (shared by workers) or 'none'
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+    CACHE_DEFAULT_TTL = float(os.getenv('CACHE_DEFAULT_TTL', 60))  # Seconds
+    CACHE_DIR = os.getenv('CACHE_DIR', '')  # Required by the file backend: a private directory, created 0700
+
+    # Hospital directory search (/api/appointments/hospitals/search)
+    HOSPITAL_SEARCH_REFRESH = float(os.getenv('HOSPITAL_SEARCH_REFRESH', 30))  # Seconds between incremental refreshes
+    HOSPITAL_SEARCH_MAX_LIMIT = int(os.getenv('HOSPITAL_SEARCH_MAX_LIMIT', 50))
+
+    # Nearest-hospital lookups (/api/appointments/hospitals/nearby)
+    GEO_INDEX_REFRESH = float(os.getenv('GEO_INDEX_REFRESH', 60))  # Seconds between checks for changed hospitals
+    NEARBY_MAX_RESULTS = int(os.getenv('NEARBY_MAX_RESULTS', 50))
+
+    # Password hashing (app/passwords.py)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # werkzeug method string; outdated hashes are upgraded on login
+    PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', 16))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))  # Hashing processes per web worker; 0 hashes inline
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))  # Queued + running hashes before answering 503
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))  # Seconds to wait for a hash
+
+    # Bloom filter of registered emails checked before login queries (app/bloom.py)
+    EMAIL_FILTER_ENABLED = os.getenv('EMAIL_FILTER_ENABLED', 'true').lower() == 'true'
+    EMAIL_FILTER_ERROR_RATE = float(os.getenv('EMAIL_FILTER_ERROR_RATE', 0.001))
+    EMAIL_FILTER_CATCHUP_INTERVAL = float(os.getenv('EMAIL_FILTER_CATCHUP_INTERVAL', 1.0))  # Seconds between catch-ups on a miss
+
+    # Signed access tokens (app/tokens.py)
+    PREVIOUS_SECRET_KEYS = os.getenv('PREVIOUS_SECRET_KEYS', '')  # Comma-separated keys that still verify after rotation
+    TOKEN_TTL = int(os.getenv('TOKEN_TTL', 3600))  # Seconds
+    AUTH_REQUIRED = os.getenv('AUTH_REQUIRED', 'false').lower() == 'true'  # Reject requests without a valid token
+
+    # Where bookable slots come from: 'table' reads Timeslots rows, 'schedule'
+    # generates them from Hospital_Schedules / Schedule_Exceptions (app/schedule.py)
+    TIMESLOT_SOURCE = os.getenv('TIMESLOT_SOURCE', 'table')
+    SCHEDULE_REFRESH = float(os.getenv('SCHEDULE_REFRESH', 60))  # Seconds between schedule reloads
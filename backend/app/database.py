@@ -1,12 +1,310 @@
-import mysql.connector
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context, jsonify
 from config import Config
+import metrics
+import slowlog
+from pool import ConnectionPool
+from storage import get_backend
+
+_pool = None
+_pool_lock = threading.Lock()
+_savepoint_ids = itertools.count(1)
+
+def create_connection(**options):
+    """Opens a new, unpooled connection from the configured storage backend.
+
+    Extra keyword arguments are passed to the backend, e.g.
+    allow_local_infile=True for MySQL bulk loads.
+    """
+    return get_backend().connect(**options)
+
+def _ping(connection):
+    get_backend().ping(connection)
+
+def get_pool():
+    """Returns this process's connection pool, creating it on first use."""
+    global _pool
+    pool = _pool
+    # A pool inherited across fork() (e.g. gunicorn --preload) must not be shared
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool(
+                create_connection,
+                size=Config.DB_POOL_SIZE,
+                max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+                timeout=Config.DB_POOL_TIMEOUT,
+                max_idle_time=Config.DB_POOL_MAX_IDLE_TIME,
+                recycle=Config.DB_POOL_RECYCLE,
+                pre_ping=Config.DB_POOL_PRE_PING,
+                ping=_ping,
+            )
+        return _pool
+
+class CountingCursor:
+    """Cursor proxy that counts the statements a unit of work runs.
+
+    It also times each statement's execute and fetch calls and counts the
+    rows fetched, reporting them to metrics and the slow-query log when the
+    statement is done: on the next execute() or on close().
+    """
+
+    def __init__(self, cursor, owner):
+        self._cursor = cursor
+        self._owner = owner
+        self._statement = None
+        self._params = None
+        self._many = False
+        self._seconds = 0.0
+        self._rows = 0
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._rows += 1
+            yield row
+
+    def _timed(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._seconds += time.perf_counter() - started
+
+    def _start(self, operation, params, many=False):
+        self._owner.queries += 1
+        self._finish()
+        self._statement, self._params, self._many = operation, params, many
+
+    def _finish(self):
+        if self._statement is not None:
+            metrics.record_query(self._statement, self._seconds, self._rows)
+            slowlog.record_query(self._statement, self._params, self._seconds, self._rows, self._many)
+            self._statement, self._params, self._seconds, self._rows = None, None, 0.0, 0
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._start(operation, params)
+        return self._timed(self._cursor.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._start(operation, seq_params, many=True)
+        return self._timed(self._cursor.executemany, operation, seq_params, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._timed(self._cursor.fetchmany, *args, **kwargs)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+
+class RequestConnection:
+    """The connection of a request-scoped unit of work.
+
+    Models keep calling commit() and close() after each statement; both are
+    deferred so that every model call made while handling one request shares a
+    single connection and a single transaction.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.after_commit = []
+        self.queries = 0
+        self.failed = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._connection.cursor(*args, **kwargs), self)
+
+    def commit(self):
+        pass  # Committed once when the request finishes
+
+    def close(self):
+        pass  # Returned to the pool when the request finishes
+
+    def rollback(self):
+        """Rolls back the whole unit of work, which then never commits.
+
+        Statements run later in the request would otherwise be committed
+        without the ones rolled back here. To undo a single statement, run it
+        inside savepoint().
+        """
+        self.failed = True
+        self._connection.rollback()
+
+    def finish(self, commit):
+        """Commits or rolls back the unit of work and hands the connection back."""
+        commit = commit and not self.failed
+        try:
+            if commit:
+                self._connection.commit()
+            else:
+                self._connection.rollback()
+        finally:
+            self._connection.close()
+        if commit:
+            _run_callbacks(self.after_commit)
+
+
+def _run_callbacks(callbacks):
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"Error in on-commit callback: {e}")
+
 
 def get_db_connection():
-    """Creates and returns a new database connection using the configuration settings."""
-    return mysql.connector.connect(
-        host=Config.DB_HOST,
-        user=Config.DB_USER,
-        password=Config.DB_PASSWORD,
-        database=Config.DB_NAME,
-        unix_socket=Config.DB_UNIX_SOCKET  # Uses the socket if specified, otherwise defaults to TCP
-    )
+    """Returns the current unit of work's connection, or a pooled one outside Flask.
+
+    Inside an app/request context every call returns the same connection, so a
+    request opens one connection and runs one transaction. Elsewhere (scripts,
+    tests) a connection is checked out of the pool; close() hands it back.
+    """
+    if has_app_context():
+        unit_of_work = g.get('_db_unit_of_work')
+        if unit_of_work is None:
+            unit_of_work = g._db_unit_of_work = RequestConnection(get_pool().acquire())
+        return unit_of_work
+    return get_pool().acquire()
+
+class TransactionLostError(Exception):
+    """The server rolled back the whole transaction, taking earlier statements with it."""
+
+
+def _execute(connection, statement):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(statement)
+    finally:
+        cursor.close()
+
+@contextmanager
+def savepoint(connection):
+    """Runs the block inside a savepoint of the connection's transaction.
+
+    If the block raises, only its own statements are rolled back before the
+    error propagates, so the caller can retry them without losing the rest of
+    the request's unit of work. A deadlock makes InnoDB roll back the whole
+    transaction, savepoint included. Retrying is still safe when nothing ran
+    before the block; otherwise the unit of work is rolled back and
+    TransactionLostError raised.
+    """
+    name = f"medtrack_sp{next(_savepoint_ids)}"
+    ran_before = getattr(connection, 'queries', 0)
+    # Savepoint statements are not the unit of work's, so they skip its counting cursor
+    raw = connection._connection if isinstance(connection, RequestConnection) else connection
+    if not raw.in_transaction:
+        _execute(raw, "BEGIN")  # Releasing a savepoint that began the transaction would commit it
+    _execute(raw, f"SAVEPOINT {name}")
+    try:
+        yield
+    except Exception as e:
+        try:
+            _execute(raw, f"ROLLBACK TO SAVEPOINT {name}")
+        except Exception:
+            if ran_before:
+                connection.rollback()
+                raise TransactionLostError(f"Transaction rolled back by the server: {e}") from e
+        raise
+    _execute(raw, f"RELEASE SAVEPOINT {name}")
+
+def release_connection():
+    """Commits the current unit of work now and hands its connection back to the pool.
+
+    For requests about to wait on something slow that needs no database,
+    such as password hashing, so the wait does not hold a pooled connection.
+    The next get_db_connection() starts a new unit of work.
+    """
+    unit_of_work = g.pop('_db_unit_of_work', None) if has_app_context() else None
+    if unit_of_work is None:
+        return
+    g._db_released_queries = g.get('_db_released_queries', 0) + unit_of_work.queries
+    unit_of_work.finish(commit=True)
+
+def on_commit(callback):
+    """Runs ``callback`` once the current unit of work has committed.
+
+    Use it for side effects (in-memory indexes, caches) that must only reflect
+    committed writes. Outside a unit of work the model has already committed,
+    so the callback runs straight away.
+    """
+    unit_of_work = g.get('_db_unit_of_work') if has_app_context() else None
+    if unit_of_work is None:
+        _run_callbacks([callback])
+    else:
+        unit_of_work.after_commit.append(callback)
+
+def _commit_unit_of_work(response):
+    unit_of_work = g.pop('_db_unit_of_work', None)
+    if Config.QUERY_COUNT_HEADER:
+        queries = g.get('_db_released_queries', 0) + (unit_of_work.queries if unit_of_work else 0)
+        response.headers['X-DB-Query-Count'] = str(queries)
+    if unit_of_work is None:
+        return response
+    # Commit before the response leaves, so a failed commit is reported as an error
+    try:
+        unit_of_work.finish(commit=response.status_code < 500)
+    except Exception as e:
+        print(f"Error committing request transaction: {e}")
+        response = jsonify({"error": "Internal server error"})
+        response.status_code = 500
+    return response
+
+def _end_unit_of_work(exc):
+    unit_of_work = g.pop('_db_unit_of_work', None)
+    if unit_of_work is None:
+        return
+    # Only reached when the request failed before a response was made, or for
+    # app contexts pushed outside a request (CLI commands, scripts)
+    try:
+        unit_of_work.finish(commit=exc is None)
+    except Exception as e:
+        print(f"Error ending unit of work: {e}")
+
+def init_app(app):
+    """Binds the request-scoped unit of work to the app's request lifecycle."""
+    app.after_request(_commit_unit_of_work)
+    app.teardown_appcontext(_end_unit_of_work)
+
+def is_duplicate_key_error(error):
+    """True when a statement was rejected by a unique or primary key."""
+    return get_backend().is_duplicate_key_error(error)
+
+def duplicate_key_name(error):
+    """The name of the unique index a duplicate key error names, or None."""
+    return get_backend().duplicate_key_name(error)
+
+def is_missing_table_error(error):
+    """True when a statement names a table that does not exist (e.g. before its migration ran)."""
+    return get_backend().is_missing_table_error(error)
+
+def is_retryable_error(error):
+    """True for deadlocks and lock wait timeouts, where retrying the transaction can succeed."""
+    return get_backend().is_retryable_error(error)
+
+def get_pool_stats():
+    """Returns in-use/idle counts, wait times and timeouts for the connection pool."""
+    return get_pool().stats()
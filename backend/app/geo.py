@@ -0,0 +1,198 @@
+"""In-memory nearest-hospital index.
+
+Hospital coordinates are converted to points on the unit sphere and stored in
+an implicit k-d tree: one flat list, recursively split at the median of the
+axis with the widest spread. Straight-line (chord) distance between unit
+vectors orders points exactly like great-circle distance, so a plain
+Euclidean k-nearest-neighbour search gives the nearest hospitals without
+any special handling for the poles or the antimeridian. A query touches
+O(log n + k) nodes rather than every hospital.
+
+The tree is immutable; a refresh builds a new one and swaps it in when
+Hospitals has changed since the last load.
+"""
+import heapq
+import math
+import threading
+import time
+
+from config import Config
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _unit_vector(latitude, longitude):
+    lat, lng = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km):
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+class _KDTree:
+    """Implicit k-d tree: the subtree over points[lo:hi] is rooted at (lo + hi) // 2."""
+
+    __slots__ = ('points', 'axes')
+
+    def __init__(self, points):
+        # points: list of (x, y, z, payload)
+        self.points = list(points)
+        self.axes = [0] * len(self.points)
+        self._build(0, len(self.points))
+
+    def _build(self, lo, hi):
+        if hi - lo <= 1:
+            return
+        section = self.points[lo:hi]
+        axis = max(range(3), key=lambda a: max(p[a] for p in section) - min(p[a] for p in section))
+        section.sort(key=lambda p: p[axis])
+        self.points[lo:hi] = section
+        mid = (lo + hi) // 2
+        self.axes[mid] = axis
+        self._build(lo, mid)
+        self._build(mid + 1, hi)
+
+    def nearest(self, target, k, max_chord=None, accept=None):
+        """Up to ``k`` (chord, payload) pairs closest to ``target``, nearest first.
+
+        ``accept`` filters payloads during the search, so rejected points
+        never take a slot that a farther, accepted point should have.
+        """
+        best = []  # max-heap of (-squared chord, tie-breaker, payload)
+        limit = max_chord * max_chord if max_chord is not None else float('inf')
+        points, axes = self.points, self.axes
+        tx, ty, tz = target
+
+        def visit(lo, hi):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            point = points[mid]
+            distance = (point[0] - tx) ** 2 + (point[1] - ty) ** 2 + (point[2] - tz) ** 2
+            bound = -best[0][0] if len(best) == k else limit
+            if distance <= bound and (accept is None or accept(point[3])):
+                entry = (-distance, -mid, point[3])
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                else:
+                    heapq.heapreplace(best, entry)
+            if hi - lo == 1:
+                return
+            axis = axes[mid]
+            difference = target[axis] - point[axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if difference < 0 else ((mid + 1, hi), (lo, mid))
+            visit(*near)
+            bound = -best[0][0] if len(best) == k else limit
+            if difference * difference <= bound:
+                visit(*far)
+
+        if k > 0:
+            visit(0, len(points))
+        return [(math.sqrt(-d), payload) for d, _, payload in sorted(best, reverse=True)]
+
+    def __len__(self):
+        return len(self.points)
+
+
+class GeoIndex:
+    """Nearest-hospital lookups over Hospitals.latitude / longitude."""
+
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval
+        self.ready = False
+        self.refreshed_at = None
+        self.build_seconds = None
+        self.builds = 0
+
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._version = None
+        self._tree = _KDTree([])
+
+    def _table_version(self, cursor):
+        cursor.execute("SELECT COUNT(*) AS hospitals, MAX(updated_at) AS changed FROM Hospitals")
+        row = cursor.fetchone()
+        return (row['hospitals'], row['changed'])
+
+    def load(self, connection, force=True):
+        """Rebuilds the tree, unless ``force`` is off and Hospitals is unchanged since the last build."""
+        cursor = connection.cursor(dictionary=True)
+        try:
+            version = self._table_version(cursor)
+            if not force and self.ready and version == self._version:
+                self.refreshed_at = time.monotonic()
+                return self
+            cursor.execute("""
+                SELECT hospital_id, name, address, phone_number, latitude, longitude
+                FROM Hospitals
+                WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            """)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        started = time.monotonic()
+        points = []
+        for row in rows:
+            row['latitude'], row['longitude'] = float(row['latitude']), float(row['longitude'])
+            points.append(_unit_vector(row['latitude'], row['longitude']) + (row,))
+        tree = _KDTree(points)
+        with self._lock:
+            self._tree = tree
+            self._version = version
+            self.ready = True
+            self.refreshed_at = time.monotonic()
+            self.build_seconds = round(self.refreshed_at - started, 3)
+            self.builds += 1
+        return self
+
+    def needs_refresh(self):
+        return (self.refresh_interval is not None and self.refreshed_at is not None and
+                not self._refreshing and time.monotonic() - self.refreshed_at > self.refresh_interval)
+
+    def nearest(self, latitude, longitude, k, max_km=None, accept=None):
+        """The ``k`` nearest hospitals as row dicts with an added ``distance_km``."""
+        max_chord = km_to_chord(max_km) if max_km is not None else None
+        found = self._tree.nearest(_unit_vector(latitude, longitude), k, max_chord,
+                                   None if accept is None else lambda row: accept(row['hospital_id']))
+        return [dict(row, distance_km=round(chord_to_km(chord), 3)) for chord, row in found]
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "hospitals": len(self._tree),
+            "builds": self.builds,
+            "build_seconds": self.build_seconds,
+        }
+
+
+geo_index = GeoIndex(refresh_interval=Config.GEO_INDEX_REFRESH)
+
+
+def refresh_in_background():
+    """Rebuilds the tree on a daemon thread if Hospitals changed; lookups keep using the old one."""
+    from database import create_connection
+
+    with geo_index._lock:
+        if geo_index._refreshing:
+            return None
+        geo_index._refreshing = True
+
+    def run():
+        connection = create_connection()
+        try:
+            geo_index.load(connection, force=False)
+        except Exception as e:
+            print(f"Error refreshing hospital geo index: {e}")
+        finally:
+            geo_index._refreshing = False
+            connection.close()
+
+    thread = threading.Thread(target=run, name='geo-index-refresh', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,284 @@
+"""In-memory hospital directory search.
+
+Hospital names and addresses are split into lower-cased words. Every word
+prefix up to PREFIX_LENGTH characters maps to the hospitals containing it, so
+a typeahead keystroke is a dict lookup rather than a scan. Word trigrams back
+substring matching. Results come out in (name, hospital_id) order, which is
+also the keyset used for pagination: a page cursor encodes the last key
+returned and the next page starts right after it.
+
+The index is loaded once and then refreshed incrementally from
+Hospitals.updated_at. Deleted rows have no updated_at to find, so a refresh
+also compares the count and the sum of hospital ids with the index's; any
+difference (a delete, even alongside an insert) forces a full reload.
+"""
+import base64
+import json
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_right, insort
+
+from config import Config
+
+PREFIX_LENGTH = 6
+# Matches smaller than this are sorted directly; larger ones are read off the
+# name-ordered list, which stops as soon as a page is full
+SORT_THRESHOLD = 256
+
+_WORD = re.compile(r'[a-z0-9]+')
+_EMPTY = frozenset()
+
+
+def _normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _words(text):
+    return _WORD.findall(_normalize(text))
+
+
+def _trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        name_key, hospital_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return str(name_key), int(hospital_id)
+    except (TypeError, UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class HospitalSearchIndex:
+    """Prefix and trigram postings over hospital names and addresses."""
+
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval
+        self.ready = False
+        self.refreshed_at = None
+        self.watermark = None
+        self.full_loads = 0
+        self.incremental_updates = 0
+
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._reset()
+
+    def _reset(self):
+        self._docs = {}       # hospital_id -> row dict
+        self._keys = {}       # hospital_id -> (name key, hospital_id)
+        self._words = {}      # hospital_id -> tuple of words
+        self._order = []      # sorted keys
+        self._prefixes = {}   # prefix -> set of hospital_ids
+        self._grams = {}      # trigram -> set of hospital_ids
+
+    # Loading
+
+    SELECT = "SELECT hospital_id, name, address, phone_number, updated_at FROM Hospitals"
+
+    def load(self, connection):
+        """Replaces the whole index with the current Hospitals table."""
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute(self.SELECT)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(row)
+            self._order.sort()
+            self.watermark = max((row['updated_at'] for row in rows if row.get('updated_at')), default=None)
+            self.ready = True
+            self.refreshed_at = time.monotonic()
+            self.full_loads += 1
+        return self
+
+    def refresh(self, connection):
+        """Applies hospitals changed since the last load; returns how many rows changed."""
+        if not self.ready:
+            self.load(connection)
+            return len(self._docs)
+        cursor = connection.cursor(dictionary=True)
+        try:
+            # Ids are never reused, so a delete plus an insert still changes the sum
+            cursor.execute("SELECT COUNT(*) AS hospitals, COALESCE(SUM(hospital_id), 0) AS id_sum FROM Hospitals")
+            totals = cursor.fetchone()
+            count = totals['hospitals']
+            same_ids = count == len(self._docs) and totals['id_sum'] == sum(self._docs)
+            rows = []
+            if same_ids and self.watermark is not None:
+                # >= rather than >: updated_at has one-second resolution and
+                # re-applying a row is harmless
+                cursor.execute(self.SELECT + " WHERE updated_at >= %s", (self.watermark,))
+                rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        if not same_ids or self.watermark is None:
+            self.load(connection)
+            return count
+        changed = 0
+        with self._lock:
+            for row in rows:
+                if self._docs.get(row['hospital_id']) != self._project(row):
+                    self._upsert(row)
+                    changed += 1
+                if row.get('updated_at') and row['updated_at'] > self.watermark:
+                    self.watermark = row['updated_at']
+            self.refreshed_at = time.monotonic()
+            self.incremental_updates += changed
+        return changed
+
+    def needs_refresh(self):
+        return (self.refresh_interval is not None and self.refreshed_at is not None and
+                not self._refreshing and time.monotonic() - self.refreshed_at > self.refresh_interval)
+
+    # Maintenance
+
+    @staticmethod
+    def _project(row):
+        return {field: row.get(field) for field in ('hospital_id', 'name', 'address', 'phone_number')}
+
+    def upsert(self, row):
+        """Adds or replaces one hospital without touching the database."""
+        with self._lock:
+            self._upsert(row)
+
+    def remove(self, hospital_id):
+        with self._lock:
+            self._remove(int(hospital_id))
+
+    def _upsert(self, row):
+        self._remove(row['hospital_id'])
+        self._add(row)
+        insort(self._order, self._keys[row['hospital_id']])
+
+    def _add(self, row):
+        # Callers keep self._order sorted
+        doc = self._project(row)
+        hospital_id = doc['hospital_id']
+        words = tuple(dict.fromkeys(_words(doc['name']) + _words(doc['address'])))
+        self._docs[hospital_id] = doc
+        self._keys[hospital_id] = key = (_normalize(doc['name']), hospital_id)
+        self._words[hospital_id] = words
+        self._order.append(key)
+        for word in words:
+            for length in range(1, min(len(word), PREFIX_LENGTH) + 1):
+                self._prefixes.setdefault(word[:length], set()).add(hospital_id)
+            for gram in _trigrams(word):
+                self._grams.setdefault(gram, set()).add(hospital_id)
+
+    def _remove(self, hospital_id):
+        if hospital_id not in self._docs:
+            return
+        key = self._keys.pop(hospital_id)
+        del self._order[bisect_right(self._order, key) - 1]
+        del self._docs[hospital_id]
+        for word in self._words.pop(hospital_id):
+            for length in range(1, min(len(word), PREFIX_LENGTH) + 1):
+                self._discard(self._prefixes, word[:length], hospital_id)
+            for gram in _trigrams(word):
+                self._discard(self._grams, gram, hospital_id)
+
+    @staticmethod
+    def _discard(postings, token, hospital_id):
+        ids = postings.get(token)
+        if ids is not None:
+            ids.discard(hospital_id)
+            if not ids:
+                del postings[token]
+
+    # Search
+
+    def _term_matches(self, term, substring):
+        """Hospitals with a word starting with (or, for substring, containing) ``term``."""
+        if substring and len(term) >= 3:
+            grams = sorted((self._grams.get(gram, _EMPTY) for gram in _trigrams(term)), key=len)
+            candidates = grams[0].intersection(*grams[1:])
+            return {h for h in candidates if any(term in word for word in self._words[h])}
+        ids = self._prefixes.get(term[:PREFIX_LENGTH], _EMPTY)
+        if len(term) <= PREFIX_LENGTH:
+            return ids
+        return {h for h in ids if any(word.startswith(term) for word in self._words[h])}
+
+    def search(self, query, limit, after=None, substring=False):
+        """One page of hospitals matching every word of ``query``, in name order.
+
+        ``after`` is the key of the last hospital on the previous page. Returns
+        (rows, next_key); next_key is None on the last page.
+        """
+        terms = list(dict.fromkeys(_words(query)))
+        with self._lock:
+            matches = None
+            for ids in sorted((self._term_matches(term, substring) for term in terms), key=len):
+                matches = ids if matches is None else matches & ids
+                if not matches:
+                    return [], None
+
+            if matches is not None and len(matches) <= SORT_THRESHOLD:
+                keys = sorted(self._keys[h] for h in matches)
+                start = bisect_right(keys, after) if after else 0
+                page = keys[start:start + limit + 1]
+            else:
+                page = []
+                start = bisect_right(self._order, after) if after else 0
+                for position in range(start, len(self._order)):
+                    key = self._order[position]
+                    if matches is None or key[1] in matches:
+                        page.append(key)
+                        if len(page) > limit:
+                            break
+
+            rows = [dict(self._docs[hospital_id]) for _, hospital_id in page[:limit]]
+        return rows, (page[limit - 1] if len(page) > limit else None)
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "hospitals": len(self._docs),
+            "prefixes": len(self._prefixes),
+            "trigrams": len(self._grams),
+            "full_loads": self.full_loads,
+            "incremental_updates": self.incremental_updates,
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+        }
+
+
+hospital_index = HospitalSearchIndex(refresh_interval=Config.HOSPITAL_SEARCH_REFRESH)
+
+
+def refresh_in_background():
+    """Applies Hospitals changes on a daemon thread; searches keep using the current index."""
+    from database import create_connection
+    from cache import cache
+
+    with hospital_index._lock:
+        if hospital_index._refreshing:
+            return None
+        hospital_index._refreshing = True
+
+    def run():
+        connection = create_connection()
+        try:
+            if hospital_index.refresh(connection):
+                cache.invalidate('hospitals')
+        except Exception as e:
+            print(f"Error refreshing hospital search index: {e}")
+        finally:
+            hospital_index._refreshing = False
+            connection.close()
+
+    thread = threading.Thread(target=run, name='hospital-search-refresh', daemon=True)
+    thread.start()
+    return thread
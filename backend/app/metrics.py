@@ -0,0 +1,232 @@
+"""Request and query metrics, served from /metrics in Prometheus text format.
+
+Recording takes no lock: every thread writes counters and histograms into
+its own shard, and a scrape merges the shards. Shards of threads that have
+exited are folded into one retired shard, so per-request threads do not pile
+up.
+
+Metrics:
+    medtrack_http_requests_total{route,method,status}
+    medtrack_http_request_duration_seconds{route,method}       histogram
+    medtrack_db_queries_total{statement}
+    medtrack_db_query_duration_seconds{statement}              histogram
+    medtrack_db_query_rows_total{statement}                    rows fetched
+
+``statement`` is the query's fingerprint: whitespace collapsed and literals,
+placeholders and IN lists replaced by ?. After Config.METRICS_MAX_STATEMENTS
+distinct fingerprints, new ones are counted under "other". Query latency
+covers execute() and the fetch calls, as seen from the cursors of request
+units of work (database.CountingCursor).
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+
+from flask import Response, g, request
+
+from config import Config
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'medtrack_http_requests_total': ('counter', "HTTP requests by route, method and status."),
+    'medtrack_http_request_duration_seconds': ('histogram', "HTTP request latency by route and method."),
+    'medtrack_db_queries_total': ('counter', "Statements executed within requests, by fingerprint."),
+    'medtrack_db_query_duration_seconds': ('histogram', "Statement latency including fetches, by fingerprint."),
+    'medtrack_db_query_rows_total': ('counter', "Rows fetched, by statement fingerprint."),
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Shard:
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> per-bucket counts, +Inf count, sum
+
+
+class MetricsRegistry:
+    """Counters and histograms sharded per thread, merged on collect()."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []  # (thread, shard)
+        self._retired = _Shard()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def inc(self, name, labels=(), amount=1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    @staticmethod
+    def _merge(target, shard):
+        for key, value in list(shard.counters.items()):
+            target.counters[key] = target.counters.get(key, 0) + value
+        for key, histogram in list(shard.histograms.items()):
+            merged = target.histograms.get(key)
+            if merged is None:
+                target.histograms[key] = list(histogram)
+            else:
+                for i, value in enumerate(histogram):
+                    merged[i] += value
+
+    def collect(self):
+        """Returns one shard holding the totals of every thread."""
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    self._merge(self._retired, shard)
+            self._shards = live
+            total = _Shard()
+            self._merge(total, self._retired)
+            for _, shard in live:
+                self._merge(total, shard)
+        return total
+
+    def reset(self):
+        with self._lock:
+            for _, shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+            self._retired = _Shard()
+
+    def render(self):
+        """The collected metrics in Prometheus text exposition format."""
+        total = self.collect()
+        series = {}
+        for (name, labels), value in total.counters.items():
+            series.setdefault(name, []).append((labels, value))
+        for (name, labels), histogram in total.histograms.items():
+            series.setdefault(name, []).append((labels, histogram))
+
+        lines = []
+        for name in sorted(series):
+            kind, description = METRICS.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series[name], key=lambda item: item[0]):
+                if kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), value):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Normalises a statement so executions with different values share one series."""
+    text = ' '.join(sql.split())
+    text = _STRINGS.sub('?', text)
+    text = text.replace('%s', '?')
+    text = _NUMBERS.sub('?', text)
+    return _IN_LISTS.sub('IN (?+)', text)
+
+
+registry = MetricsRegistry()
+
+_statements = set()
+_statements_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4096)
+def statement_label(sql):
+    """The ``statement`` label for ``sql``, or "other" once the fingerprint cap is reached."""
+    text = fingerprint(sql)
+    with _statements_lock:
+        if text not in _statements:
+            if len(_statements) >= Config.METRICS_MAX_STATEMENTS:
+                return 'other'
+            _statements.add(text)
+    return text
+
+
+def record_query(sql, seconds, rows):
+    """Records one statement's execute and fetch time and the rows it returned."""
+    if not Config.METRICS_ENABLED:
+        return
+    labels = (('statement', statement_label(sql)),)
+    registry.inc('medtrack_db_queries_total', labels)
+    registry.observe('medtrack_db_query_duration_seconds', labels, seconds)
+    if rows:
+        registry.inc('medtrack_db_query_rows_total', labels, rows)
+
+
+def _start_timer():
+    g._metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    registry.inc('medtrack_http_requests_total',
+                 (('route', route), ('method', request.method), ('status', str(response.status_code))))
+    registry.observe('medtrack_http_request_duration_seconds',
+                     (('route', route), ('method', request.method)), time.perf_counter() - started)
+    return response
+
+
+def metrics_endpoint():
+    """Serves every metric in Prometheus text format."""
+    return Response(registry.render(), mimetype=CONTENT_TYPE)
+
+
+def init_app(app):
+    """Times every request and serves /metrics when METRICS_ENABLED is set."""
+    if not app.config.get('METRICS_ENABLED', Config.METRICS_ENABLED):
+        return
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint, methods=['GET'])
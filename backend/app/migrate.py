@@ -0,0 +1,185 @@
+"""Versioned schema migrations.
+
+Migrations live in Config.MIGRATIONS_DIR as pairs of files named
+``<version>_<name>.up.sql`` and ``<version>_<name>.down.sql``. Applied versions
+are recorded in the ``schema_migrations`` table, so an existing database can be
+upgraded in place instead of being rebuilt from init.sql.
+
+Usage (from the backend directory):
+    python app/migrate.py status
+    python app/migrate.py up [--to VERSION]
+    python app/migrate.py down [--steps N | --to VERSION]
+"""
+import argparse
+import os
+import re
+import sys
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from config import Config
+from database import create_connection
+
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.(up|down)\.sql$')
+
+MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+class Migration:
+    """One versioned schema change with its up and (optional) down script."""
+
+    def __init__(self, version, name):
+        self.version = version
+        self.name = name
+        self.up_path = None
+        self.down_path = None
+
+    def __repr__(self):
+        return f"Migration({self.version:04d}_{self.name})"
+
+
+def discover_migrations(directory=None):
+    """Returns the migrations found in the directory, ordered by version."""
+    directory = directory or Config.MIGRATIONS_DIR
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version, name, direction = int(match.group(1)), match.group(2), match.group(3)
+        migration = migrations.setdefault(version, Migration(version, name))
+        if migration.name != name:
+            raise ValueError(f"Migration version {version} is used by both {migration.name} and {name}")
+        setattr(migration, f"{direction}_path", os.path.join(directory, filename))
+
+    for migration in migrations.values():
+        if migration.up_path is None:
+            raise ValueError(f"{migration!r} has no up script")
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def split_statements(sql):
+    """Splits a script into statements on semicolons that end a line; drops -- comments."""
+    statements, current = [], []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('--'):
+            continue
+        current.append(line)
+        if stripped.endswith(';'):
+            statement = '\n'.join(current).strip().rstrip(';').strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    trailing = '\n'.join(current).strip()
+    if trailing:
+        statements.append(trailing)
+    return statements
+
+
+def _run_script(cursor, path):
+    with open(path) as script:
+        for statement in split_statements(script.read()):
+            cursor.execute(statement)
+
+
+def applied_versions(connection):
+    """Returns the set of migration versions already applied to the database."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(MIGRATIONS_TABLE)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def migrate_up(connection, migrations, target=None, verbose=True):
+    """Applies pending migrations up to and including ``target``; returns those applied."""
+    applied = applied_versions(connection)
+    pending = [m for m in migrations if m.version not in applied and (target is None or m.version <= target)]
+    cursor = connection.cursor()
+    try:
+        for migration in pending:
+            if verbose:
+                print(f"Applying {migration.version:04d}_{migration.name}")
+            _run_script(cursor, migration.up_path)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (migration.version, migration.name)
+            )
+            connection.commit()
+    finally:
+        cursor.close()
+    return pending
+
+
+def migrate_down(connection, migrations, steps=1, target=None, verbose=True):
+    """Reverts the newest applied migrations, either ``steps`` of them or down to ``target``."""
+    applied = applied_versions(connection)
+    candidates = [m for m in reversed(migrations) if m.version in applied]
+    if target is not None:
+        to_revert = [m for m in candidates if m.version > target]
+    else:
+        to_revert = candidates[:steps]
+
+    cursor = connection.cursor()
+    try:
+        for migration in to_revert:
+            if migration.down_path is None:
+                raise ValueError(f"{migration!r} cannot be reverted: no down script")
+            if verbose:
+                print(f"Reverting {migration.version:04d}_{migration.name}")
+            _run_script(cursor, migration.down_path)
+            cursor.execute("DELETE FROM schema_migrations WHERE version = %s", (migration.version,))
+            connection.commit()
+    finally:
+        cursor.close()
+    return to_revert
+
+
+def print_status(connection, migrations):
+    applied = applied_versions(connection)
+    for migration in migrations:
+        state = 'applied' if migration.version in applied else 'pending'
+        print(f"{migration.version:04d}_{migration.name:<40} {state}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply or revert MedTrack schema migrations.")
+    parser.add_argument('--dir', default=None, help="Migrations directory (defaults to Config.MIGRATIONS_DIR)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help="List migrations and whether they are applied")
+    up = commands.add_parser('up', help="Apply pending migrations")
+    up.add_argument('--to', type=int, default=None, help="Stop after this version")
+    down = commands.add_parser('down', help="Revert applied migrations")
+    down.add_argument('--steps', type=int, default=1, help="Number of migrations to revert")
+    down.add_argument('--to', type=int, default=None, help="Revert everything newer than this version")
+    args = parser.parse_args(argv)
+
+    if Config.STORAGE_BACKEND != 'mysql':
+        sys.exit(f"Migrations are MySQL scripts; the {Config.STORAGE_BACKEND} schema is created "
+                 f"from {Config.SQLITE_SCHEMA} on first connection")
+
+    migrations = discover_migrations(args.dir)
+    connection = create_connection()
+    try:
+        if args.command == 'status':
+            print_status(connection, migrations)
+        elif args.command == 'up':
+            applied = migrate_up(connection, migrations, target=args.to)
+            print(f"{len(applied)} migration(s) applied")
+        else:
+            reverted = migrate_down(connection, migrations, steps=args.steps, target=args.to)
+            print(f"{len(reverted)} migration(s) reverted")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,5 +2,6 @@
 
 from .user import User  # Import the User class from user.py
 from .medical import MedicalRecord  # Import the MedicalRecord class from medical.py
+from .hospital import Hospital
 
-__all__ = ['User', 'MedicalRecord']
+__all__ = ['User', 'MedicalRecord', 'Hospital']
@@ -1,24 +1,93 @@
 import sys, os
+import heapq
+import time
+from itertools import islice
 from datetime import timedelta
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database import get_db_connection
+from database import get_db_connection, on_commit, savepoint, duplicate_key_name, is_duplicate_key_error, is_retryable_error
+from config import Config
+from availability import availability_index, warm_in_background
+from cache import cache, cached
+from schedule import current_schedule
 from datetime import datetime
+
+# Correlated check that slot ``t`` has no Scheduled appointment. It probes
+# Appointments by exact (hospital_id, appointment_time) so the hospital/time
+# index answers each slot; wrapping appointment_time in TIME()/DATE() would
+# force a scan of the hospital's appointments.
+SLOT_IS_FREE = """
+    NOT EXISTS (
+        SELECT 1
+        FROM Appointments a
+        WHERE a.hospital_id = t.hospital_id
+          AND a.appointment_time = TIMESTAMP(t.timeslot_date, t.timeslot_time)
+          AND a.status = 'Scheduled'
+    )
+"""
+
+SLOT_TAKEN_MESSAGE = "This time slot is no longer available. Please choose a different time."
+USER_CONFLICT_MESSAGE = "Appointment conflicts with an existing one. Please choose a different time."
+
+def _conflict_message(error):
+    """Why a unique slot index from migration 0005 rejected a Scheduled appointment."""
+    if duplicate_key_name(error) == 'uq_appointments_user_slot':
+        return USER_CONFLICT_MESSAGE
+    return SLOT_TAKEN_MESSAGE
+
+def _scheduled_times(connection, hospital_ids, start_date, end_date):
+    """Scheduled appointment times per hospital for days in [start_date, end_date].
+
+    ``hospital_ids`` None means every hospital. Used with generated
+    (TIMESLOT_SOURCE=schedule) slots, where only bookings are stored.
+    """
+    hospital_filter, params = '', []
+    if hospital_ids is not None:
+        hospital_filter = f"hospital_id IN ({', '.join(['%s'] * len(hospital_ids))}) AND"
+        params.extend(hospital_ids)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT hospital_id, appointment_time
+            FROM Appointments
+            WHERE {hospital_filter} appointment_time >= %s AND appointment_time < %s
+              AND status = 'Scheduled'
+        """, (*params, datetime.combine(start_date, datetime.min.time()),
+              datetime.combine(end_date + timedelta(days=1), datetime.min.time())))
+        booked = {}
+        for hospital_id, when in cursor.fetchall():
+            booked.setdefault(hospital_id, set()).add(when)
+        return booked
+    finally:
+        cursor.close()
+
 class Appointment:
     
     @staticmethod
-    def get_appointment_id(user_id):
-        """Retrieve the appointment_id for a user's upcoming appointment."""
+    def get_appointment_id(user_id, appointment_time=None, hospital_id=None):
+        """Retrieve the appointment_id of a user's Scheduled appointment.
+
+        With ``appointment_time`` and ``hospital_id`` that exact booking,
+        otherwise the user's next upcoming one.
+        """
         connection = get_db_connection()
         cursor = connection.cursor(dictionary=True)
         try:
-            cursor.execute("""
-                SELECT appointment_id
-                FROM Appointments
-                WHERE user_id = %s AND status = 'Scheduled' AND appointment_time > NOW()
-                ORDER BY appointment_time ASC
-                LIMIT 1
-            """, (user_id,))
+            if appointment_time and hospital_id:
+                cursor.execute("""
+                    SELECT appointment_id
+                    FROM Appointments
+                    WHERE user_id = %s AND appointment_time = %s AND hospital_id = %s AND status = 'Scheduled'
+                    LIMIT 1
+                """, (user_id, appointment_time, hospital_id))
+            else:
+                cursor.execute("""
+                    SELECT appointment_id
+                    FROM Appointments
+                    WHERE user_id = %s AND status = 'Scheduled' AND appointment_time > NOW()
+                    ORDER BY appointment_time ASC
+                    LIMIT 1
+                """, (user_id,))
             result = cursor.fetchone()
             return result['appointment_id'] if result else None
         except Exception as e:
@@ -30,6 +99,7 @@ class Appointment:
 
 
     @staticmethod
+    @cached(ttl=30, tags=lambda user_id: [f"user:{user_id}"])
     def get_upcoming_appointment(user_id):
         """Retrieve the next upcoming appointment for a user."""
         connection = get_db_connection()
@@ -71,30 +141,28 @@ ORDER BY
     @staticmethod
     def get_available_times(selected_date, hospital_id):
         """Retrieve available times for a given day for booking appointments."""
+        if availability_index.ready:
+            if availability_index.needs_refresh():
+                warm_in_background()
+            times = Appointment._available_times_from_index(selected_date, hospital_id)
+            if times is not None:
+                return [{'timeslot_time': slot_time} for slot_time in times]
+
+        if Config.TIMESLOT_SOURCE == 'schedule':
+            return Appointment._available_times_from_schedule(selected_date, hospital_id)
+
         connection = get_db_connection()
         cursor = connection.cursor(dictionary=True)
         
         try:
-            cursor.execute("""
-            SELECT DISTINCT t.timeslot_time 
-        FROM Timeslots t
-        LEFT JOIN Appointments a 
-            ON t.hospital_id = a.hospital_id 
-            AND t.timeslot_time = TIME(a.appointment_time) 
-            AND DATE(a.appointment_time) = %s -- Correct date format
-        WHERE t.hospital_id = %s
-        AND t.timeslot_date = %s -- Correct date format
-        AND (a.appointment_id IS NULL OR a.status = 'Cancelled') -- Include only available or cancelled appointments
-        AND NOT EXISTS (
-            SELECT 1
-            FROM Appointments a2
-            WHERE a2.hospital_id = t.hospital_id
-                AND TIME(a2.appointment_time) = t.timeslot_time
-                AND DATE(a2.appointment_time) = t.timeslot_date
-                AND a2.status = 'Scheduled'
-        )
-
-        """, (selected_date, hospital_id, selected_date))
+            cursor.execute(f"""
+                SELECT DISTINCT t.timeslot_time
+                FROM Timeslots t
+                WHERE t.hospital_id = %s
+                  AND t.timeslot_date = %s
+                  AND {SLOT_IS_FREE}
+                ORDER BY t.timeslot_time
+            """, (hospital_id, selected_date))
             
             available_times = cursor.fetchall()
             
@@ -113,6 +181,297 @@ ORDER BY
             cursor.close()
             connection.close()
 
+    @staticmethod
+    def hospitals_with_availability(selected_date):
+        """Set of hospital ids with at least one free slot on a day, or None on error."""
+        if Config.TIMESLOT_SOURCE == 'schedule':
+            availability = Appointment._availability_range_from_schedule(None, selected_date, selected_date, True)
+            return None if availability is None else {h for h, days in availability.items() if days}
+
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT DISTINCT t.hospital_id
+                FROM Timeslots t
+                WHERE t.timeslot_date = %s
+                  AND {SLOT_IS_FREE}
+            """, (selected_date,))
+            return {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error fetching hospitals with availability: {e}")
+            return None
+        finally:
+            cursor.close()
+            connection.close()
+
+    @staticmethod
+    def get_availability_range(hospital_ids, start_date, end_date, counts_only=False):
+        """Retrieve free slots for several hospitals over an inclusive date range.
+
+        Returns {hospital_id: {'YYYY-MM-DD': ['H:MM:SS', ...]}}, or free-slot
+        counts per day with ``counts_only``. Days without free slots are left out.
+        """
+        if availability_index.ready:
+            if availability_index.needs_refresh():
+                warm_in_background()
+            availability = Appointment._availability_range_from_index(hospital_ids, start_date, end_date, counts_only)
+            if availability is not None:
+                return availability
+
+        if Config.TIMESLOT_SOURCE == 'schedule':
+            return Appointment._availability_range_from_schedule(hospital_ids, start_date, end_date, counts_only)
+
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        placeholders = ', '.join(['%s'] * len(hospital_ids))
+
+        try:
+            if counts_only:
+                cursor.execute(f"""
+                    SELECT t.hospital_id, t.timeslot_date, COUNT(DISTINCT t.timeslot_time) AS free_slots
+                    FROM Timeslots t
+                    WHERE t.hospital_id IN ({placeholders})
+                      AND t.timeslot_date BETWEEN %s AND %s
+                      AND {SLOT_IS_FREE}
+                    GROUP BY t.hospital_id, t.timeslot_date
+                """, (*hospital_ids, start_date, end_date))
+            else:
+                cursor.execute(f"""
+                    SELECT DISTINCT t.hospital_id, t.timeslot_date, t.timeslot_time
+                    FROM Timeslots t
+                    WHERE t.hospital_id IN ({placeholders})
+                      AND t.timeslot_date BETWEEN %s AND %s
+                      AND {SLOT_IS_FREE}
+                    ORDER BY t.hospital_id, t.timeslot_date, t.timeslot_time
+                """, (*hospital_ids, start_date, end_date))
+
+            availability = {hospital_id: {} for hospital_id in hospital_ids}
+            for row in cursor.fetchall():
+                days = availability.setdefault(row['hospital_id'], {})
+                day = row['timeslot_date'].isoformat()
+                if counts_only:
+                    days[day] = row['free_slots']
+                else:
+                    days.setdefault(day, []).append(str(row['timeslot_time']))
+            return availability
+
+        except Exception as e:
+            print(f"Error fetching availability range: {e}")
+            return None
+
+        finally:
+            cursor.close()
+            connection.close()
+
+    @staticmethod
+    def _availability_range_from_index(hospital_ids, start_date, end_date, counts_only):
+        """Answer a range lookup from the bitmap index; None if any day falls outside it."""
+        availability = {}
+        for hospital_id in hospital_ids:
+            days = availability[hospital_id] = {}
+            day = start_date
+            while day <= end_date:
+                if counts_only:
+                    mask = availability_index.free_mask(hospital_id, day)
+                    if mask is None:
+                        return None
+                    if mask:
+                        days[day.isoformat()] = bin(mask).count('1')
+                else:
+                    times = availability_index.available_times(hospital_id, day)
+                    if times is None:
+                        return None
+                    if times:
+                        days[day.isoformat()] = times
+                day += timedelta(days=1)
+        return availability
+
+    @staticmethod
+    def find_earliest_available(after, limit, hospital_ids=None, horizon_days=None):
+        """Retrieve the first ``limit`` free slots after ``after``, across all or some hospitals.
+
+        Returns a list of {'hospital_id', 'appointment_time'} in time order, or
+        None on error.
+        """
+        until = after.date() + timedelta(days=horizon_days or Config.EARLIEST_SLOTS_HORIZON_DAYS)
+        if availability_index.ready:
+            if availability_index.needs_refresh():
+                warm_in_background()
+            slots = availability_index.earliest_free(after, limit, hospital_ids, until)
+            if slots is not None:
+                return [{'hospital_id': hospital_id, 'appointment_time': when.strftime('%Y-%m-%d %H:%M:%S')}
+                        for when, hospital_id in slots]
+
+        if Config.TIMESLOT_SOURCE == 'schedule':
+            return Appointment._earliest_from_schedule(after, limit, hospital_ids, until)
+
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        after_date, after_time = after.date(), after.strftime('%H:%M:%S')
+        # Slots strictly after ``after`` and before the horizon
+        window = """
+            t.timeslot_date >= %s AND t.timeslot_date < %s
+            AND (t.timeslot_date > %s OR t.timeslot_time > %s)
+        """
+        window_params = (after_date, until, after_date, after_time)
+
+        try:
+            if hospital_ids and len(hospital_ids) <= Config.EARLIEST_SLOTS_MERGE_MAX_HOSPITALS:
+                # A few hospitals: read each one's first slots off its
+                # (hospital_id, timeslot_date, timeslot_time) index range, then merge
+                branches = [f"""
+                    SELECT * FROM (
+                        SELECT t.hospital_id, t.timeslot_date, t.timeslot_time
+                        FROM Timeslots t
+                        WHERE t.hospital_id = %s AND {window} AND {SLOT_IS_FREE}
+                        ORDER BY t.timeslot_date, t.timeslot_time
+                        LIMIT %s
+                    ) branch_{n}
+                """ for n in range(len(hospital_ids))]
+                query = " UNION ALL ".join(branches)
+                params = []
+                for hospital_id in hospital_ids:
+                    params.extend((hospital_id, *window_params, limit))
+                cursor.execute(f"""
+                    SELECT * FROM ({query}) merged
+                    ORDER BY timeslot_date, timeslot_time, hospital_id
+                    LIMIT %s
+                """, (*params, limit))
+            else:
+                # Anywhere (or many hospitals): walk the chronological
+                # (timeslot_date, timeslot_time, hospital_id) index and stop at the limit
+                hospital_filter = ''
+                params = list(window_params)
+                if hospital_ids:
+                    hospital_filter = f"AND t.hospital_id IN ({', '.join(['%s'] * len(hospital_ids))})"
+                    params.extend(hospital_ids)
+                cursor.execute(f"""
+                    SELECT t.hospital_id, t.timeslot_date, t.timeslot_time
+                    FROM Timeslots t
+                    WHERE {window} {hospital_filter} AND {SLOT_IS_FREE}
+                    ORDER BY t.timeslot_date, t.timeslot_time, t.hospital_id
+                    LIMIT %s
+                """, (*params, limit))
+
+            slots = []
+            for row in cursor.fetchall():
+                when = datetime.combine(row['timeslot_date'], datetime.min.time()) + row['timeslot_time']
+                slots.append({'hospital_id': row['hospital_id'], 'appointment_time': when.strftime('%Y-%m-%d %H:%M:%S')})
+            return slots
+
+        except Exception as e:
+            print(f"Error finding earliest available slots: {e}")
+            return None
+
+        finally:
+            cursor.close()
+            connection.close()
+
+    @staticmethod
+    def _available_times_from_index(selected_date, hospital_id):
+        """The index's open slots for a day minus that day's bookings in the database.
+
+        Other workers' bookings and cancellations only reach this process's
+        index on its next reload, so the booked half is always read fresh.
+        None when the index can't answer and the query path should.
+        """
+        try:
+            day = datetime.strptime(selected_date, '%Y-%m-%d').date()
+            hospital_id = int(hospital_id)
+        except (TypeError, ValueError):
+            return None  # Malformed input: let the query path report it
+        if not availability_index.covers(day):
+            return None
+        connection = get_db_connection()
+        try:
+            booked = _scheduled_times(connection, [hospital_id], day, day).get(hospital_id, set())
+        except Exception as e:
+            print(f"Error fetching booked times: {e}")
+            return None
+        finally:
+            connection.close()
+        return availability_index.available_times(hospital_id, day, booked)
+
+    @staticmethod
+    def _available_times_from_schedule(selected_date, hospital_id):
+        """get_available_times over generated slots: the day's rules minus its bookings."""
+        connection = get_db_connection()
+        try:
+            day = datetime.strptime(selected_date, '%Y-%m-%d').date()
+            hospital_id = int(hospital_id)
+            booked = _scheduled_times(connection, [hospital_id], day, day).get(hospital_id, set())
+            midnight = datetime.combine(day, datetime.min.time())
+            return [{'timeslot_time': str(timedelta(seconds=seconds))}
+                    for seconds in current_schedule().slot_times(hospital_id, day)
+                    if midnight + timedelta(seconds=seconds) not in booked]
+        except Exception as e:
+            print(f"Error fetching available times: {e}")
+            return []
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _availability_range_from_schedule(hospital_ids, start_date, end_date, counts_only):
+        """get_availability_range over generated slots; ``hospital_ids`` None means all hospitals."""
+        connection = get_db_connection()
+        try:
+            schedule = current_schedule()
+            booked = _scheduled_times(connection, hospital_ids, start_date, end_date)
+            availability = {}
+            for hospital_id in (schedule.hospital_ids if hospital_ids is None else hospital_ids):
+                taken = booked.get(hospital_id, ())
+                days = availability[hospital_id] = {}
+                for when in schedule.iter_slots(hospital_id, start_date, end_date + timedelta(days=1)):
+                    if when in taken:
+                        continue
+                    day = when.date().isoformat()
+                    if counts_only:
+                        days[day] = days.get(day, 0) + 1
+                    else:
+                        days.setdefault(day, []).append(str(when - datetime.combine(when.date(), datetime.min.time())))
+            return availability
+        except Exception as e:
+            print(f"Error fetching availability range: {e}")
+            return None
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _earliest_from_schedule(after, limit, hospital_ids, until):
+        """find_earliest_available over generated slots.
+
+        Bookings are fetched a window at a time, starting with a week and
+        doubling, so a search that is satisfied early never reads far ahead.
+        """
+        connection = get_db_connection()
+        try:
+            schedule = current_schedule()
+            hospitals = [int(h) for h in hospital_ids] if hospital_ids else schedule.hospital_ids
+
+            def free_slots(hospital_id, start, end, taken):
+                for when in schedule.iter_slots(hospital_id, start, end):
+                    if when > after and when not in taken:
+                        yield when, hospital_id
+
+            slots = []
+            window_start, window_days = after.date(), 7
+            while len(slots) < limit and window_start < until:
+                window_end = min(until, window_start + timedelta(days=window_days))
+                booked = _scheduled_times(connection, hospitals if hospital_ids else None,
+                                          window_start, window_end - timedelta(days=1))
+                streams = [free_slots(hospital_id, window_start, window_end, booked.get(hospital_id, ()))
+                           for hospital_id in hospitals]
+                slots.extend(islice(heapq.merge(*streams), limit - len(slots)))
+                window_start, window_days = window_end, window_days * 2
+            return [{'hospital_id': hospital_id, 'appointment_time': when.strftime('%Y-%m-%d %H:%M:%S')}
+                    for when, hospital_id in slots]
+        except Exception as e:
+            print(f"Error finding earliest available slots: {e}")
+            return None
+        finally:
+            connection.close()
+
     @staticmethod
     def book_appointment(user_id, appointment_time, hospital_id):
         """Book an appointment for a specific date and time, preventing double booking."""
@@ -129,24 +488,32 @@ ORDER BY
                     "success": False,
                     "message": "Cannot book an appointment in the past. Please choose a future time."
                 }
-            # Check if the user already has an appointment at the same time, regardless of the hospital
-            cursor.execute("""
-                SELECT appointment_id FROM Appointments
-                WHERE appointment_time = %s AND user_id = %s AND status = 'Scheduled'
-            """, (appointment_time, user_id))
-            
-            if cursor.fetchone():  # If a conflicting appointment exists
-                return {
-                    "success": False,
-                    "message": "Appointment conflicts with an existing one. Please choose a different time."
-                }
-            
-            # Proceed to book the appointment if no conflicts are found
-            cursor.execute("""
-                INSERT INTO Appointments (user_id, appointment_time, hospital_id, status)
-                VALUES (%s, %s, %s, 'Scheduled')
-            """, (user_id, appointment_time, hospital_id))
-            connection.commit()
+            # A single INSERT is the whole check: the unique slot indexes from
+            # migration 0005 reject a second Scheduled appointment for the same
+            # hospital slot or for the same user at that time, so concurrent
+            # requests cannot double-book between a check and the insert.
+            # The savepoint lets a retry undo only the INSERT, not the rest of
+            # the request's unit of work.
+            attempt = 0
+            while True:
+                try:
+                    with savepoint(connection):
+                        cursor.execute("""
+                            INSERT INTO Appointments (user_id, appointment_time, hospital_id, status)
+                            VALUES (%s, %s, %s, 'Scheduled')
+                        """, (user_id, appointment_time, hospital_id))
+                    connection.commit()
+                    break
+                except Exception as e:
+                    if is_duplicate_key_error(e):
+                        return {"success": False, "message": _conflict_message(e)}
+                    if not is_retryable_error(e) or attempt >= Config.BOOKING_MAX_RETRIES:
+                        raise
+                    # Back off briefly and try again
+                    attempt += 1
+                    time.sleep(Config.BOOKING_RETRY_BACKOFF * attempt)
+            on_commit(lambda: availability_index.mark_booked(hospital_id, appointment_datetime))
+            on_commit(lambda: cache.invalidate(f"user:{user_id}", f"hospital:{hospital_id}"))
             
             return {
                 "success": True,
@@ -165,14 +532,15 @@ ORDER BY
             connection.close()
 
     @staticmethod
-    def reschedule_appointment(appointment_id, new_time):
-        """Reschedule an appointment to a new time."""
+    def reschedule_appointment(appointment_id, new_time, user_id=None):
+        """Reschedule an appointment to a new time; returns {"success", "message"}."""
+        failed = {"success": False, "message": "Failed to reschedule appointment"}
         connection = get_db_connection()
         cursor = connection.cursor(dictionary=True)
         try:
             # Check if the appointment exists and is scheduled
             cursor.execute("""
-                SELECT status
+                SELECT status, user_id, hospital_id, appointment_time
                 FROM Appointments
                 WHERE appointment_id = %s
             """, (appointment_id,))
@@ -180,36 +548,51 @@ ORDER BY
 
             if not appointment or appointment['status'] != 'Scheduled':
                 print(f"Appointment ID {appointment_id} not found or not scheduled.")
-                return False
+                return failed
+            if user_id is not None and appointment['user_id'] != int(user_id):
+                print(f"Appointment ID {appointment_id} does not belong to user {user_id}.")
+                return failed
 
-            # Update the appointment time
-            cursor.execute("""
-                UPDATE Appointments
-                SET appointment_time = %s
-                WHERE appointment_id = %s AND status = 'Scheduled'
-            """, (new_time, appointment_id))
+            # Update the appointment time; the same unique slot indexes as
+            # booking reject a slot someone else holds
+            try:
+                with savepoint(connection):
+                    cursor.execute("""
+                        UPDATE Appointments
+                        SET appointment_time = %s
+                        WHERE appointment_id = %s AND status = 'Scheduled'
+                    """, (new_time, appointment_id))
+            except Exception as e:
+                if is_duplicate_key_error(e):
+                    return {"success": False, "message": _conflict_message(e)}
+                raise
             connection.commit()
             if cursor.rowcount > 0:
-                return True
+                def move_slot():
+                    availability_index.mark_free(appointment['hospital_id'], appointment['appointment_time'])
+                    availability_index.mark_booked(appointment['hospital_id'], new_time)
+                    cache.invalidate(f"user:{appointment['user_id']}", f"hospital:{appointment['hospital_id']}")
+                on_commit(move_slot)
+                return {"success": True, "message": "Appointment successfully rescheduled"}
             
             print(f"Failed to reschedule appointment ID {appointment_id}.")
-            return False
+            return failed
         except Exception as e:
             print(f"Error rescheduling appointment: {e}")
-            return False
+            return failed
         finally:
             cursor.close()
             connection.close()
 
     @staticmethod
-    def cancel_appointment(appointment_id):
+    def cancel_appointment(appointment_id, user_id=None):
         """Cancel an appointment."""
         connection = get_db_connection()
         cursor = connection.cursor(dictionary=True)
         try:
             # Check if the appointment exists and is scheduled
             cursor.execute("""
-                SELECT status
+                SELECT status, user_id, hospital_id, appointment_time
                 FROM Appointments
                 WHERE appointment_id = %s
             """, (appointment_id,))
@@ -218,6 +601,9 @@ ORDER BY
             if not appointment or appointment['status'] != 'Scheduled':
                 print(f"Appointment ID {appointment_id} not found or not scheduled.")
                 return False
+            if user_id is not None and appointment['user_id'] != int(user_id):
+                print(f"Appointment ID {appointment_id} does not belong to user {user_id}.")
+                return False
 
             # Cancel the appointment
             cursor.execute("""
@@ -228,6 +614,8 @@ ORDER BY
             
             if cursor.rowcount > 0:
                 connection.commit()
+                on_commit(lambda: availability_index.mark_free(appointment['hospital_id'], appointment['appointment_time']))
+                on_commit(lambda: cache.invalidate(f"user:{appointment['user_id']}", f"hospital:{appointment['hospital_id']}"))
                 return True
 
             print(f"Failed to cancel appointment ID {appointment_id}.")
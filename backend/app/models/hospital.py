@@ -0,0 +1,78 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import get_db_connection
+from cache import cached
+from hospital_search import hospital_index, refresh_in_background
+import geo
+from availability import availability_index
+from models.appointment import Appointment
+
+class Hospital:
+    SEARCH_FIELDS = ('hospital_id', 'name', 'address', 'phone_number')
+
+    @staticmethod
+    @cached(ttl=300, tags=lambda: ['hospitals'])
+    def get_hospitals():
+        """Retrieve every hospital a user can choose from."""
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT hospital_id, name, address, phone_number FROM Hospitals")
+            return cursor.fetchall()
+        except Exception as e:
+            print(f"Error fetching hospitals: {e}")
+            return None
+        finally:
+            cursor.close()
+            connection.close()
+
+    @staticmethod
+    def search(query, limit, after=None, substring=False):
+        """Search hospitals by name and address words from the in-memory index.
+
+        Returns (rows, next_key) as HospitalSearchIndex.search does, or None if
+        the index could not be loaded.
+        """
+        if not hospital_index.ready:
+            connection = get_db_connection()
+            try:
+                hospital_index.load(connection)
+            except Exception as e:
+                print(f"Error loading hospital search index: {e}")
+                return None
+            finally:
+                connection.close()
+        elif hospital_index.needs_refresh():
+            refresh_in_background()
+        return hospital_index.search(query, limit, after, substring)
+
+    @staticmethod
+    def nearby(latitude, longitude, k, selected_date=None, max_km=None):
+        """The ``k`` hospitals nearest to a point, each with its ``distance_km``.
+
+        With ``selected_date`` only hospitals with a free slot that day are
+        returned. Returns None if the lookup could not be made.
+        """
+        if not geo.geo_index.ready:
+            connection = get_db_connection()
+            try:
+                geo.geo_index.load(connection)
+            except Exception as e:
+                print(f"Error loading hospital geo index: {e}")
+                return None
+            finally:
+                connection.close()
+        elif geo.geo_index.needs_refresh():
+            geo.refresh_in_background()
+
+        accept = None
+        if selected_date is not None:
+            if availability_index.covers(selected_date):
+                accept = lambda hospital_id: bool(availability_index.free_mask(hospital_id, selected_date))
+            else:
+                available = Appointment.hospitals_with_availability(selected_date)
+                if available is None:
+                    return None
+                accept = available.__contains__
+        return geo.geo_index.nearest(latitude, longitude, k, max_km, accept)
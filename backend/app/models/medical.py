@@ -1,7 +1,11 @@
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database import get_db_connection
+from database import get_db_connection, on_commit
+from cache import cache, cached
+
+def _user_tags(user_id, *args, **kwargs):
+    return [f"user:{user_id}"]
 
 class MedicalRecord:
     @staticmethod
@@ -10,23 +14,32 @@ class MedicalRecord:
         return date.strftime('%Y-%m-%d')
     
     @staticmethod
+    @cached(tags=_user_tags)
     def get_prior_appointments(user_id):
-        """Fetches all prior completed appointments with notes for the user."""
+        """Fetches all prior completed appointments for the user, newest first, or None on error."""
         db = get_db_connection()
-        cursor = db.cursor()
-        query = """
-            SELECT appointment_date, notes
-            FROM appointments
-            WHERE user_id = %s AND status = 'completed'
-            ORDER BY appointment_date DESC
-        """
-        cursor.execute(query, (user_id,))
-        return cursor.fetchall()
+        cursor = db.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT a.appointment_id, a.appointment_time, h.hospital_id, h.name AS hospital_name
+                FROM Appointments a
+                JOIN Hospitals h ON a.hospital_id = h.hospital_id
+                WHERE a.user_id = %s AND a.status = 'Completed'
+                ORDER BY a.appointment_time DESC
+            """, (user_id,))
+            return cursor.fetchall()
+        except Exception as e:
+            print(f"Error fetching prior appointments: {e}")
+            return None
+        finally:
+            cursor.close()
+            db.close()
 
 
     @staticmethod
+    @cached(tags=_user_tags)
     def get_prior_conditions(user_id):
-        """Fetches prior conditions or surgeries for the user """
+        """Fetches prior conditions or surgeries for the user, or None on error."""
         db = get_db_connection()
         cursor = db.cursor(dictionary=True)
         try:
@@ -47,7 +60,7 @@ class MedicalRecord:
         except Exception as e:
             print(f"Error fetching conditions: {e}")
             cursor.reset()
-            return []
+            return None
         finally:
             cursor.reset()
             if cursor:
@@ -56,8 +69,9 @@ class MedicalRecord:
                 db.close()
 
     @staticmethod
+    @cached(tags=_user_tags)
     def get_medications(user_id):
-        """Fetches medications for the user"""
+        """Fetches medications for the user, or None on error."""
         db = get_db_connection()
         cursor = db.cursor(dictionary=True)
         try:
@@ -77,15 +91,16 @@ class MedicalRecord:
             return medications 
         except Exception as e:
             print (f"Error fetching medications: {e} ")
-            return []
+            return None
         finally:
             cursor.close()
             db.close()
 
         
     @staticmethod
+    @cached(tags=_user_tags)
     def get_medical_history(user_id):
-        """Fetches medical history records for a specific user."""
+        """Fetches medical history records for a specific user, or None on error."""
         db = get_db_connection()
         cursor = db.cursor(dictionary=True)
         try:
@@ -105,7 +120,57 @@ class MedicalRecord:
             return medicalhistory
         except Exception as e:
             print(f"Error fetching medical history: {e}")
-            return []
+            return None
+        finally:
+            cursor.close()
+            db.close()
+
+    SUMMARY_SECTIONS = ('conditions', 'medications', 'history')
+
+    @staticmethod
+    @cached(tags=_user_tags)
+    def get_summary(user_id, sections=SUMMARY_SECTIONS):
+        """Fetches the requested medical history sections for a user over one connection.
+
+        The Medical_History row is read once: it yields the history_id for the
+        child tables and is itself the 'history' section.
+        """
+        summary = {section: [] for section in sections}
+        db = get_db_connection()
+        cursor = db.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT history_id, doctor_notes, lab_results, report_date
+                FROM Medical_History
+                WHERE user_id = %s
+            """, (user_id,))
+            history = cursor.fetchone()
+            if not history:
+                return summary
+            history_id = history.pop('history_id')
+
+            if 'history' in summary:
+                summary['history'] = [history]
+            if 'conditions' in summary:
+                cursor.execute("""
+                    SELECT condition_name, condition_description, diagnosed_date
+                    FROM Conditions
+                    WHERE history_id = %s
+                    ORDER BY diagnosed_date DESC
+                """, (history_id,))
+                summary['conditions'] = cursor.fetchall()
+            if 'medications' in summary:
+                cursor.execute("""
+                    SELECT medication_name, dosage, start_date, end_date
+                    FROM Medications
+                    WHERE history_id = %s
+                    ORDER BY start_date DESC
+                """, (history_id,))
+                summary['medications'] = cursor.fetchall()
+            return summary
+        except Exception as e:
+            print(f"Error fetching medical summary: {e}")
+            return None
         finally:
             cursor.close()
             db.close()
@@ -122,6 +187,7 @@ class MedicalRecord:
                 (user_id, details, date)
             )
             connection.commit()
+            on_commit(lambda: cache.invalidate(f"user:{user_id}"))
             return True
         except Exception as e:
             print(f"Error adding medical record: {e}")
@@ -1,12 +1,15 @@
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database import get_db_connection
+from database import get_db_connection, on_commit, is_duplicate_key_error
+from cache import cache
+from config import Config
+from bloom import email_filter
 
 class User:
     @staticmethod
     def create_user(email, password_hash):
-        """Inserts a new user into the Users table."""
+        """Inserts a new user; the unique email index rejects existing users in the same statement."""
         connection = get_db_connection()
         cursor = connection.cursor()
         
@@ -16,22 +19,25 @@ class User:
                 (email, password_hash)
             )
             connection.commit()
-            return True
+            on_commit(lambda: email_filter.add(email))
+            return {"success": True, "user_id": cursor.lastrowid}
         except Exception as e:
+            if is_duplicate_key_error(e):
+                return {"success": False, "message": "User already exists"}
             print(f"Error creating user: {e}")
-            return False
+            return {"success": False, "message": "An error occurred while creating the user"}
         finally:
             cursor.close()
             connection.close()
 
     @staticmethod
     def get_user_by_email(email):
-        """Fetches a user from the Users table by email."""
+        """Fetches the id and password hash of the user with this email."""
         connection = get_db_connection()
         cursor = connection.cursor(dictionary=True)
         
         try:
-            cursor.execute("SELECT * FROM Users WHERE email = %s", (email,))
+            cursor.execute("SELECT user_id, password_hash FROM Users WHERE email = %s", (email,))
             user = cursor.fetchone()
             return user
         except Exception as e:
@@ -41,6 +47,41 @@ class User:
             cursor.close()
             connection.close()
 
+    @staticmethod
+    def may_exist(email):
+        """Whether a user may have this email, judged by the email Bloom filter.
+
+        True can be a false positive. False is only a strong hint: users
+        created by other workers reach the filter at the next catch-up, and
+        one whose id committed after a higher id may never reach it before a
+        reload. Use it to skip optional work, never to decide that a user
+        does not exist. Errs towards True when the filter is disabled, still
+        loading or cannot be refreshed.
+        """
+        if not Config.EMAIL_FILTER_ENABLED:
+            return True
+        if not email_filter.ready:
+            email_filter.warm_in_background()  # Retries a failed startup load; this request does not wait
+            return True
+        if email_filter.might_contain(email):
+            return True
+        if not email_filter.catch_up_due():
+            email_filter.record_skipped_lookup()
+            return False
+
+        connection = get_db_connection()
+        try:
+            email_filter.catch_up(connection)
+        except Exception as e:
+            print(f"Error refreshing email filter: {e}")
+            return True
+        finally:
+            connection.close()
+        if email_filter.might_contain(email):
+            return True
+        email_filter.record_skipped_lookup()
+        return False
+
     @staticmethod
     def update_user_password(user_id, new_password_hash):
         """Updates the password hash for a user."""
@@ -53,6 +94,7 @@ class User:
                 (new_password_hash, user_id)
             )
             connection.commit()
+            on_commit(lambda: cache.invalidate(f"user:{user_id}"))
             return True
         except Exception as e:
             print(f"Error updating user password: {e}")
@@ -0,0 +1,207 @@
+"""Password hashing off the request thread.
+
+werkzeug's scrypt/pbkdf2 hashing is deliberately CPU-heavy and holds the GIL,
+so hashing inline stalls every other request in the worker. Hashes are
+computed in a small process pool instead. At most
+Config.PASSWORD_HASH_MAX_PENDING hashes may be queued or running: beyond
+that, callers get HashingBusyError straight away (reported as 503) instead
+of joining an ever-growing queue while a login storm is under way.
+
+Stored hashes carry their method with every parameter spelled out, e.g.
+``scrypt:32768:8:1$salt$hash``. When it differs from
+Config.PASSWORD_HASH_METHOD, with werkzeug's defaults filled in, the hash is
+outdated and login re-hashes the password with the current parameters.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+from config import Config
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing queue is full, a hash does not finish in time or the pool broke."""
+
+
+def full_method(method):
+    """``method`` as werkzeug stores it in a hash, e.g. 'pbkdf2' -> 'pbkdf2:sha256:600000'."""
+    name, *params = method.split(':')
+    if name == 'scrypt' and not params:
+        params = [str(2 ** 15), '8', '1']
+    elif name == 'pbkdf2':
+        params = params + ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)][len(params):]
+    return ':'.join([name] + params)
+
+
+def _timed(func, *args):
+    # Runs in the worker process; returns the result with the CPU time it took
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def _hash(password, method, salt_length):
+    return _timed(generate_password_hash, password, method, salt_length)
+
+
+def _verify(password_hash, password):
+    return _timed(check_password_hash, password_hash, password)
+
+
+class PasswordHasher:
+    """Bounded process pool for hashing and verifying passwords.
+
+    With ``workers=0`` hashing runs inline on the calling thread, which keeps
+    development servers and tests free of child processes.
+    """
+
+    def __init__(self, workers, max_pending, method, salt_length=16, timeout=None, samples=1000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.method = method
+        self.salt_length = salt_length
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._counts = dict.fromkeys(('hashed', 'verified', 'rehashed', 'rejected', 'timeouts'), 0)
+        self._peak_pending = 0
+        self._latency = deque(maxlen=samples)   # seconds from submit to result
+        self._compute = deque(maxlen=samples)   # seconds spent hashing in the worker
+
+    def _get_executor(self):
+        # Called with the lock held. A forked worker process must not reuse its parent's pool.
+        if self._executor is None or self._pid != os.getpid():
+            # spawn rather than fork: the web worker has threads (DB pool, index warm-ups)
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, func, *args):
+        started = time.perf_counter()
+        if self.workers <= 0:
+            result, compute = func(*args)
+        else:
+            with self._lock:
+                if self._pending >= self.max_pending:
+                    self._counts['rejected'] += 1
+                    raise HashingBusyError(f"{self._pending} password hashes already pending")
+                executor = self._get_executor()
+                try:
+                    future = executor.submit(func, *args)
+                except BrokenProcessPool as e:
+                    self._executor = None  # Start a fresh pool next time
+                    raise HashingBusyError("Password hashing pool is restarting") from e
+                except Exception:
+                    self._executor = None
+                    raise
+                self._pending += 1
+                self._peak_pending = max(self._peak_pending, self._pending)
+            future.add_done_callback(self._done)
+            try:
+                result, compute = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                with self._lock:
+                    self._counts['timeouts'] += 1
+                raise HashingBusyError(f"Password hash took longer than {self.timeout}s")
+            except BrokenProcessPool as e:
+                # A hashing process died (e.g. killed for memory); the pool cannot be reused
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                raise HashingBusyError("Password hashing pool is restarting") from e
+        with self._lock:
+            self._latency.append(time.perf_counter() - started)
+            self._compute.append(compute)
+        return result
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def hash(self, password):
+        """Hashes a password with the configured method."""
+        password_hash = self._run(_hash, password, self.method, self.salt_length)
+        self._count('hashed')
+        return password_hash
+
+    def verify(self, password_hash, password):
+        result = self._run(_verify, password_hash, password)
+        self._count('verified')
+        return result
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with parameters other than the configured ones."""
+        return full_method(password_hash.split('$', 1)[0]) != full_method(self.method)
+
+    def rehash_if_needed(self, password_hash, password):
+        """A fresh hash if ``password_hash`` is outdated, else None. Call only after verify succeeded."""
+        if not self.needs_rehash(password_hash):
+            return None
+        new_hash = self.hash(password)
+        self._count('rehashed')
+        return new_hash
+
+    def _count(self, field):
+        with self._lock:
+            self._counts[field] += 1
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return {
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+            "p95_ms": round(ordered[max(0, int(len(ordered) * 0.95) - 1)] * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats.update({
+                "method": self.method,
+                "workers": self.workers,
+                "pending": self._pending,
+                "peak_pending": self._peak_pending,
+                "max_pending": self.max_pending,
+            })
+            latency, compute = list(self._latency), list(self._compute)
+        stats["latency"] = self._summary(latency)
+        stats["hash_time"] = self._summary(compute)
+        return stats
+
+
+def _create_hasher(config):
+    return PasswordHasher(
+        workers=config.get('PASSWORD_HASH_WORKERS', Config.PASSWORD_HASH_WORKERS),
+        max_pending=config.get('PASSWORD_HASH_MAX_PENDING', Config.PASSWORD_HASH_MAX_PENDING),
+        method=config.get('PASSWORD_HASH_METHOD', Config.PASSWORD_HASH_METHOD),
+        salt_length=config.get('PASSWORD_SALT_LENGTH', Config.PASSWORD_SALT_LENGTH),
+        timeout=config.get('PASSWORD_HASH_TIMEOUT', Config.PASSWORD_HASH_TIMEOUT),
+    )
+
+
+hasher = _create_hasher({})
+
+
+def init_app(app):
+    """Rebuilds the shared hasher from the app's config."""
+    global hasher
+    previous, hasher = hasher, _create_hasher(app.config)
+    previous.shutdown()
@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class _PoolEntry:
+    """A raw connection plus the bookkeeping the pool needs to age it out."""
+
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+
+
+class PooledConnection:
+    """Proxy handed out by the pool; close() returns the connection instead of closing it."""
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        if self._entry is None:
+            raise AttributeError(f"Connection already returned to the pool ({name})")
+        return getattr(self._entry.connection, name)
+
+    def is_connected(self):
+        return self._entry is not None and self._entry.connection.is_connected()
+
+    def close(self):
+        """Hands the connection back to the pool. Safe to call more than once."""
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool.release(entry)
+
+    def invalidate(self):
+        """Closes the underlying connection for good, e.g. after a fatal error."""
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool.discard(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections.
+
+    ``size`` connections are kept around once opened; up to ``max_overflow``
+    extra connections are opened under load and closed again when returned.
+    Idle connections older than ``max_idle_time`` seconds, or opened more than
+    ``recycle`` seconds ago, are replaced on checkout. With ``pre_ping`` each
+    checkout is health-checked with ``ping`` before it is handed out.
+    """
+
+    def __init__(self, creator, size=5, max_overflow=10, timeout=30,
+                 max_idle_time=300, recycle=3600, pre_ping=True, ping=None, reset=None):
+        self.creator = creator
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.max_idle_time = max_idle_time
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.ping = ping or (lambda connection: connection.ping())
+        self.reset = reset or (lambda connection: connection.rollback())
+        self.pid = os.getpid()
+
+        self._idle = deque()
+        self._opened = 0
+        self._disposed = False
+        self._cond = threading.Condition(threading.Lock())
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._ping_failures = 0
+
+    @property
+    def capacity(self):
+        return self.size + self.max_overflow
+
+    def acquire(self):
+        """Checks out a connection, opening or waiting for one as needed."""
+        started = time.monotonic()
+        deadline = started + self.timeout if self.timeout is not None else None
+        waited = False
+
+        while True:
+            entry = None
+            create = False
+            with self._cond:
+                while True:
+                    if self._disposed:
+                        raise RuntimeError("Connection pool has been disposed")
+                    entry = self._pop_fresh_idle()
+                    if entry is not None:
+                        break
+                    if self._opened < self.capacity:
+                        self._opened += 1
+                        create = True
+                        break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available within {self.timeout}s "
+                            f"(size={self.size}, max_overflow={self.max_overflow})"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if create:
+                try:
+                    entry = _PoolEntry(self.creator())
+                except Exception:
+                    with self._cond:
+                        self._opened -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+            elif self.pre_ping and not self._is_alive(entry):
+                self._close_entry(entry)
+                continue
+
+            entry.last_used = time.monotonic()
+            with self._cond:
+                self._checkouts += 1
+                if waited:
+                    wait_time = entry.last_used - started
+                    self._waits += 1
+                    self._wait_time_total += wait_time
+                    self._wait_time_max = max(self._wait_time_max, wait_time)
+            return PooledConnection(self, entry)
+
+    def release(self, entry):
+        """Takes a connection back, rolling back anything left uncommitted."""
+        try:
+            self.reset(entry.connection)
+        except Exception:
+            self.discard(entry)
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            # Overflow connections are closed once the pool is back at its steady size
+            if not self._disposed and len(self._idle) < self.size:
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+        self._close_entry(entry)
+
+    def discard(self, entry):
+        """Closes a connection without returning it to the idle set."""
+        self._close_entry(entry)
+
+    def dispose(self):
+        """Closes every idle connection and refuses further checkouts."""
+        with self._cond:
+            self._disposed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_entry(entry)
+
+    def stats(self):
+        """Returns a snapshot of pool usage counters for sizing and monitoring."""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "opened": self._opened,
+                "in_use": self._opened - idle,
+                "idle": idle,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time_total, 6),
+                "wait_time_max": round(self._wait_time_max, 6),
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "ping_failures": self._ping_failures,
+            }
+
+    def _pop_fresh_idle(self):
+        # Called with the lock held. Most recently used first, so that surplus
+        # connections at the other end of the deque are the ones that idle out.
+        now = time.monotonic()
+        while self._idle:
+            entry = self._idle.pop()
+            expired = (
+                (self.recycle is not None and now - entry.created_at > self.recycle) or
+                (self.max_idle_time is not None and now - entry.last_used > self.max_idle_time)
+            )
+            if not expired:
+                return entry
+            self._recycled += 1
+            self._opened -= 1
+            self._close_quietly(entry.connection)
+        return None
+
+    def _is_alive(self, entry):
+        try:
+            self.ping(entry.connection)
+            return True
+        except Exception:
+            with self._cond:
+                self._ping_failures += 1
+            return False
+
+    def _close_entry(self, entry):
+        self._close_quietly(entry.connection)
+        with self._cond:
+            self._opened -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,204 @@
+"""Opt-in per-request profiling.
+
+With Config.PROFILING_ENABLED set, a request is profiled when:
+* it carries the Config.PROFILING_HEADER header with the value of
+  Config.PROFILING_KEY. Without a key the header is ignored, so clients
+  cannot slow the server down at will;
+* or it is picked by sampling, 1 in Config.PROFILING_SAMPLE_RATE requests.
+
+Config.PROFILER picks how:
+    cprofile  deterministic cProfile; writes a .pstats file
+              (python -m pstats FILE, snakeviz FILE)
+    sampling  samples the request thread's stack every
+              Config.PROFILING_INTERVAL seconds; writes a .collapsed file of
+              folded stacks (flamegraph.pl FILE > out.svg, speedscope)
+
+Files go to Config.PROFILING_DIR. Their names carry the time, method,
+status, duration and route, and only the newest Config.PROFILING_MAX_FILES
+are kept. The X-Profile-Id response header names the file of a profiled
+request. /api/system/profiles lists the files and serves them for download.
+"""
+import cProfile
+import hmac
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+
+from config import Config
+
+PROFILERS = ('cprofile', 'sampling')
+EXTENSIONS = {'cprofile': '.pstats', 'sampling': '.collapsed'}
+
+_NAME = re.compile(
+    r'^(?P<created>\d{8}T\d{6}\d{6})_(?P<method>[A-Z]+)_(?P<status>\d{3})_(?P<duration_ms>\d+)ms_'
+    r'(?P<route>[\w.-]*)(?P<ext>\.pstats|\.collapsed)$'
+)
+_SLUG = re.compile(r'[^\w.-]+')
+
+_requests = itertools.count(1)
+
+
+class SamplingProfiler:
+    """Records the stack of one thread at a fixed interval, as folded stacks."""
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def enable(self):
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump_stats(self, path):
+        with open(path, 'w') as out:
+            for stack, count in self.stacks.most_common():
+                out.write(f"{stack} {count}\n")
+
+
+class ProfileStore:
+    """The directory of profile files, pruned to the newest ``max_files``."""
+
+    def __init__(self, directory, max_files=50):
+        self.directory = directory
+        self.max_files = max_files
+
+    def filename(self, method, status, seconds, route, profiler):
+        created = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        slug = _SLUG.sub('_', route).strip('_')
+        return f"{created}_{method}_{status}_{round(seconds * 1000)}ms_{slug}{EXTENSIONS[profiler]}"
+
+    def save(self, profile, method, status, seconds, route, profiler):
+        """Writes ``profile`` and returns its file name."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = self.filename(method, status, seconds, route, profiler)
+        profile.dump_stats(os.path.join(self.directory, name))
+        self.prune()
+        return name
+
+    def _names(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if _NAME.match(name))
+
+    def prune(self):
+        names = self._names()
+        for name in names[:max(0, len(names) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def list(self, limit=None):
+        """Metadata of the stored profiles, newest first."""
+        profiles = []
+        for name in reversed(self._names()):
+            match = _NAME.match(name)
+            profiles.append({
+                "name": name,
+                "created": datetime.strptime(match['created'], '%Y%m%dT%H%M%S%f').isoformat(timespec='milliseconds'),
+                "method": match['method'],
+                "status": int(match['status']),
+                "duration_ms": int(match['duration_ms']),
+                "route": match['route'],
+                "profiler": 'cprofile' if match['ext'] == '.pstats' else 'sampling',
+                "bytes": os.path.getsize(os.path.join(self.directory, name)),
+            })
+            if limit and len(profiles) >= limit:
+                break
+        return profiles
+
+    def path(self, name):
+        """Full path of a stored profile, or None for names that are not profiles."""
+        if not _NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+
+store = ProfileStore(Config.PROFILING_DIR, Config.PROFILING_MAX_FILES)
+
+
+def _wanted():
+    key = Config.PROFILING_KEY
+    given = request.headers.get(Config.PROFILING_HEADER)
+    if key and given is not None and hmac.compare_digest(given.encode(), key.encode()):
+        return True
+    rate = Config.PROFILING_SAMPLE_RATE
+    return rate > 0 and next(_requests) % rate == 0
+
+
+def _start_profile():
+    if request.endpoint and request.endpoint.startswith('system.'):
+        return  # Listing or downloading profiles is not worth profiling
+    if not _wanted():
+        return
+    if Config.PROFILER == 'sampling':
+        profile = SamplingProfiler(Config.PROFILING_INTERVAL)
+    else:
+        profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError as e:  # Another profiler (e.g. a debugger or coverage) owns this thread
+        print(f"Error starting request profile: {e}")
+        return
+    g._profile = (profile, time.perf_counter())
+
+
+def _finish_profile(response):
+    started = g.pop('_profile', None)
+    if started is None:
+        return response
+    profile, began = started
+    profile.disable()
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    try:
+        name = store.save(profile, request.method, response.status_code, time.perf_counter() - began, route,
+                          'sampling' if isinstance(profile, SamplingProfiler) else 'cprofile')
+        response.headers['X-Profile-Id'] = name
+    except Exception as e:
+        print(f"Error saving request profile: {e}")
+    return response
+
+
+def _discard_profile(exc):
+    started = g.pop('_profile', None)
+    if started is not None:
+        started[0].disable()  # The request failed before a response was made
+
+
+def init_app(app):
+    """Profiles selected requests when PROFILING_ENABLED is set."""
+    if not app.config.get('PROFILING_ENABLED', Config.PROFILING_ENABLED):
+        return
+    if Config.PROFILER not in PROFILERS:
+        raise ValueError(f"Unknown profiler: {Config.PROFILER} (expected one of {', '.join(PROFILERS)})")
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_discard_profile)
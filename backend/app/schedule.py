@@ -0,0 +1,167 @@
+"""Rule-based virtual timeslots.
+
+Instead of one Timeslots row per hospital, day and hour, each hospital has
+weekly opening hours (Hospital_Schedules) and dated exceptions for holidays,
+closures and special hours (Schedule_Exceptions). Both tables are small, so
+they are loaded whole and slots are computed on the fly: a day's slots are
+a ``range(opens, closes, slot)`` over its rules, memoized by rule, so
+generating a year of slots for a hospital is mostly tuple lookups.
+
+Used when Config.TIMESLOT_SOURCE is 'schedule'.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from config import Config
+
+
+def _seconds(value):
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+@lru_cache(maxsize=1024)
+def _expand(windows):
+    """Sorted slot start times, in seconds, for ((opens, closes, slot_seconds), ...)."""
+    times = set()
+    for opens, closes, slot in windows:
+        times.update(range(opens, closes - slot + 1, slot))
+    return tuple(sorted(times))
+
+
+class ScheduleBook:
+    """Weekly templates and dated exceptions for every hospital."""
+
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval
+        self.ready = False
+        self.loaded_at = None
+
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._templates = {}   # hospital_id -> weekday -> [(valid_from, valid_until, window)]
+        self._exceptions = {}  # (hospital_id or None, date) -> tuple of windows; () = closed
+
+    def load(self, connection):
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute("""
+                SELECT hospital_id, weekday, opens_at, closes_at, slot_minutes, valid_from, valid_until
+                FROM Hospital_Schedules
+            """)
+            templates = {}
+            for row in cursor.fetchall():
+                window = (_seconds(row['opens_at']), _seconds(row['closes_at']), row['slot_minutes'] * 60)
+                templates.setdefault(row['hospital_id'], {}).setdefault(row['weekday'], []).append(
+                    (row['valid_from'], row['valid_until'], window))
+
+            cursor.execute("""
+                SELECT hospital_id, exception_date, opens_at, closes_at, slot_minutes
+                FROM Schedule_Exceptions
+            """)
+            exceptions = {}
+            for row in cursor.fetchall():
+                windows = exceptions.setdefault((row['hospital_id'], row['exception_date']), ())
+                if row['opens_at'] is not None and row['closes_at'] is not None:
+                    slot = (row['slot_minutes'] or 60) * 60
+                    exceptions[(row['hospital_id'], row['exception_date'])] = windows + (
+                        (_seconds(row['opens_at']), _seconds(row['closes_at']), slot),)
+        finally:
+            cursor.close()
+
+        with self._lock:
+            self._templates = templates
+            self._exceptions = exceptions
+            self.ready = True
+            self.loaded_at = time.monotonic()
+        return self
+
+    def needs_refresh(self):
+        return (self.refresh_interval is not None and self.loaded_at is not None and
+                not self._refreshing and time.monotonic() - self.loaded_at > self.refresh_interval)
+
+    # Slot generation
+
+    @property
+    def hospital_ids(self):
+        return list(self._templates)
+
+    def _windows(self, hospital_id, day):
+        exceptions = self._exceptions
+        windows = exceptions.get((hospital_id, day))
+        if windows is None:
+            windows = exceptions.get((None, day))
+        if windows is not None:
+            return windows
+        rules = self._templates.get(hospital_id, {}).get(day.weekday(), ())
+        return tuple(window for valid_from, valid_until, window in rules
+                     if (valid_from is None or valid_from <= day) and (valid_until is None or day <= valid_until))
+
+    def slot_times(self, hospital_id, day):
+        """Sorted slot start times (seconds since midnight) for a hospital on a day."""
+        return _expand(self._windows(hospital_id, day))
+
+    def iter_slots(self, hospital_id, start, end):
+        """Yields each slot as a datetime, in order, for days in [start, end)."""
+        day = start
+        while day < end:
+            times = self.slot_times(hospital_id, day)
+            if times:
+                midnight = datetime.combine(day, datetime.min.time())
+                for seconds in times:
+                    yield midnight + timedelta(seconds=seconds)
+            day += timedelta(days=1)
+
+    def distinct_times(self):
+        """Every slot start time any rule can produce, for sizing the availability bitmaps."""
+        windows = [window for weekdays in self._templates.values()
+                   for rules in weekdays.values() for _, _, window in rules]
+        windows.extend(window for exception in self._exceptions.values() for window in exception)
+        return sorted(set(_expand(tuple(windows))))
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "hospitals": len(self._templates),
+            "rules": sum(len(rules) for weekdays in self._templates.values() for rules in weekdays.values()),
+            "exceptions": len(self._exceptions),
+            "expansions_cached": _expand.cache_info().currsize,
+        }
+
+
+schedule_book = ScheduleBook(refresh_interval=Config.SCHEDULE_REFRESH)
+
+
+def current_schedule():
+    """The loaded schedule book, loading it on first use and refreshing it when stale."""
+    from database import create_connection
+
+    if schedule_book.ready and not schedule_book.needs_refresh():
+        return schedule_book
+    if schedule_book.ready:
+        with schedule_book._lock:
+            if schedule_book._refreshing:
+                return schedule_book
+            schedule_book._refreshing = True
+
+        def run():
+            connection = create_connection()
+            try:
+                schedule_book.load(connection)
+            except Exception as e:
+                print(f"Error refreshing hospital schedules: {e}")
+            finally:
+                schedule_book._refreshing = False
+                connection.close()
+
+        threading.Thread(target=run, name='schedule-refresh', daemon=True).start()
+        return schedule_book
+
+    connection = create_connection()
+    try:
+        return schedule_book.load(connection)
+    finally:
+        connection.close()
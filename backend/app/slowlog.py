@@ -0,0 +1,244 @@
+"""Slow-query log: statements over a threshold, with their EXPLAIN plan, as JSON lines.
+
+database.CountingCursor reports every finished statement of a request unit
+of work. The ones that took at least Config.SLOW_QUERY_THRESHOLD seconds,
+counting execute and fetches, are written to Config.SLOW_QUERY_LOG_PATH.
+That file is rotated by size. Each line holds:
+* the statement's fingerprint (metrics.fingerprint);
+* the shapes of its parameters, as types and lengths, never values, since
+  they can be patient data;
+* duration, rows fetched, and the route and model function that ran it;
+* the plan: EXPLAIN FORMAT=JSON on MySQL, EXPLAIN QUERY PLAN on SQLite.
+
+One fingerprint is logged at most once per Config.SLOW_QUERY_THROTTLE
+seconds. Repeats in between are counted in the next entry's "suppressed".
+EXPLAIN runs on a background thread with its own connection, so the request
+that was slow does not wait for it. When that thread falls behind, entries
+are written without a plan.
+
+scripts/slow_queries.py summarises the log.
+"""
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+
+from config import Config
+from metrics import fingerprint
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIPPED_FILES = {os.path.join(_APP_DIR, 'database.py'), os.path.abspath(__file__)}
+
+
+def param_shape(value):
+    """Type (and length, for strings) of one bound parameter."""
+    if value is None:
+        return 'null'
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    if isinstance(value, (list, tuple)):
+        return [param_shape(item) for item in value]
+    return type(value).__name__
+
+
+def params_shape(params, many=False):
+    if params is None:
+        return None
+    if many:
+        rows = list(params)
+        return {"rows": len(rows), "row": param_shape(rows[0]) if rows else None}
+    if isinstance(params, dict):
+        return {key: param_shape(value) for key, value in params.items()}
+    return param_shape(params)
+
+
+def _caller():
+    """path:function of the first frame outside the database layer, e.g. models/medical.py:get_medications."""
+    frame = sys._getframe(2)
+    while frame is not None and os.path.abspath(frame.f_code.co_filename) in _SKIPPED_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return None
+    path = os.path.abspath(frame.f_code.co_filename)
+    if path.startswith(_APP_DIR + os.sep):
+        path = os.path.relpath(path, _APP_DIR)
+    return f"{path}:{frame.f_code.co_name}"
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (timedelta, Decimal)):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode(errors='replace')
+    return repr(value)
+
+
+def explain(connection, statement, params):
+    """The plan of ``statement``: MySQL's JSON plan, or SQLite's query plan rows."""
+    cursor = connection.cursor()
+    try:
+        if getattr(connection, 'dialect', 'mysql') == 'sqlite':
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN FORMAT=JSON {statement}", params)
+        return json.loads(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    """Throttled JSONL writer for slow statements; EXPLAINs them on a worker thread."""
+
+    def __init__(self, path, threshold, throttle=60.0, max_bytes=10 * 1024 * 1024, backups=5,
+                 explain=True, queue_size=100):
+        self.path = path
+        self.threshold = threshold
+        self.throttle = throttle
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.explain = explain
+        self.logged = 0
+        self.suppressed = 0
+        self.explain_dropped = 0
+
+        self._lock = threading.Lock()
+        self._last_logged = {}  # fingerprint -> (monotonic time, repeats since)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._logger = None
+        self._worker = None
+
+    def _get_logger(self):
+        if self._logger is None:
+            with self._lock:
+                if self._logger is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    logger = logging.getLogger(f"medtrack.slow_queries.{id(self)}")
+                    logger.propagate = False
+                    logger.setLevel(logging.INFO)
+                    handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups)
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    logger.addHandler(handler)
+                    self._logger = logger
+        return self._logger
+
+    def _admit(self, key):
+        """True when ``key`` was not logged within the throttle window; returns repeats skipped."""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_logged.get(key)
+            if last is not None and now - last[0] < self.throttle:
+                self._last_logged[key] = (last[0], last[1] + 1)
+                self.suppressed += 1
+                return None
+            self._last_logged[key] = (now, 0)
+            return last[1] if last is not None else 0
+
+    def record(self, statement, params, seconds, rows, many=False):
+        """Logs ``statement`` if it was slow and its fingerprint is not throttled."""
+        if seconds < self.threshold:
+            return False
+        text = fingerprint(statement)
+        suppressed = self._admit(text)
+        if suppressed is None:
+            return False
+        entry = {
+            "time": datetime.now().isoformat(timespec='milliseconds'),
+            "fingerprint": text,
+            "duration_ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "params": params_shape(params, many),
+            "source": _caller(),
+            "route": request.url_rule.rule if has_request_context() and request.url_rule is not None else None,
+            "suppressed": suppressed,
+        }
+        if self.explain and not many:
+            try:
+                self._queue.put_nowait((entry, statement, params))
+                self._ensure_worker()
+                return True
+            except queue.Full:
+                self.explain_dropped += 1
+                entry["explain_error"] = "EXPLAIN queue full"
+        self._write(entry)
+        return True
+
+    def _write(self, entry):
+        self._get_logger().info(json.dumps(entry, default=_json_default))
+        with self._lock:
+            self.logged += 1
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='slow-query-explain', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        from database import create_connection
+
+        while True:
+            entry, statement, params = self._queue.get()
+            try:
+                connection = create_connection()
+                try:
+                    entry["explain"] = explain(connection, statement, params)
+                finally:
+                    connection.close()
+            except Exception as e:
+                entry["explain_error"] = str(e)
+            try:
+                self._write(entry)
+            except Exception as e:
+                print(f"Error writing slow query log: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Waits until every queued entry has been explained and written."""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "threshold": self.threshold,
+                "logged": self.logged,
+                "suppressed": self.suppressed,
+                "explain_pending": self._queue.qsize(),
+                "explain_dropped": self.explain_dropped,
+                "fingerprints": len(self._last_logged),
+            }
+
+
+slow_query_log = SlowQueryLog(
+    Config.SLOW_QUERY_LOG_PATH,
+    Config.SLOW_QUERY_THRESHOLD,
+    throttle=Config.SLOW_QUERY_THROTTLE,
+    max_bytes=Config.SLOW_QUERY_LOG_MAX_BYTES,
+    backups=Config.SLOW_QUERY_LOG_BACKUPS,
+    explain=Config.SLOW_QUERY_EXPLAIN,
+)
+
+
+def record_query(statement, params, seconds, rows, many=False):
+    """Hands a finished statement to the slow-query log when it is enabled."""
+    if not Config.SLOW_QUERY_LOG_ENABLED or seconds < slow_query_log.threshold:
+        return
+    try:
+        slow_query_log.record(statement, params, seconds, rows, many)
+    except Exception as e:
+        print(f"Error recording slow query: {e}")
@@ -0,0 +1,55 @@
+"""Storage backends.
+
+database.create_connection() asks the configured backend for connections, so
+models stay backend-agnostic. Every backend hands out connections that behave
+like mysql-connector's:
+* %s placeholders and cursor(dictionary=True);
+* lastrowid, rowcount and fetchmany;
+* DATE, DATETIME and TIME values as date, datetime and timedelta.
+
+Each backend also classifies its own errors, for is_duplicate_key_error and
+is_retryable_error.
+
+Config.STORAGE_BACKEND selects one:
+    mysql   a MySQL server (production; the default)
+    sqlite  an embedded SQLite file at Config.SQLITE_PATH, so the API, tests
+            and benchmarks run without any external service
+"""
+import threading
+
+from config import Config
+
+BACKENDS = ('mysql', 'sqlite')
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def _create(name):
+    if name == 'mysql':
+        from storage.mysql import MySQLBackend
+        return MySQLBackend()
+    if name == 'sqlite':
+        from storage.sqlite import SQLiteBackend
+        return SQLiteBackend(Config.SQLITE_PATH, Config.SQLITE_SCHEMA, busy_timeout=Config.SQLITE_BUSY_TIMEOUT)
+    raise ValueError(f"Unknown storage backend: {name} (expected one of {', '.join(BACKENDS)})")
+
+
+def get_backend(name=None):
+    """Returns the backend named ``name``, or Config.STORAGE_BACKEND's, creating it on first use."""
+    name = name or Config.STORAGE_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        with _lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = _backends[name] = _create(name)
+    return backend
+
+
+def reset_backends():
+    """Forgets created backends, e.g. after Config changes in tests."""
+    with _lock:
+        for backend in _backends.values():
+            backend.close()
+        _backends.clear()
@@ -0,0 +1,43 @@
+"""MySQL backend: mysql-connector connections to Config.DB_HOST."""
+import re
+
+import mysql.connector
+from mysql.connector import errorcode
+
+from config import Config
+
+
+class MySQLBackend:
+    name = 'mysql'
+
+    def connect(self, **options):
+        """Opens a new connection; extra options go to mysql.connector.connect."""
+        return mysql.connector.connect(
+            host=Config.DB_HOST,
+            user=Config.DB_USER,
+            password=Config.DB_PASSWORD,
+            database=Config.DB_NAME,
+            unix_socket=Config.DB_UNIX_SOCKET,  # Uses the socket if specified, otherwise defaults to TCP
+            consume_results=True,  # Connections are shared within a request, so never leave rows unread
+            **options
+        )
+
+    def ping(self, connection):
+        connection.ping(reconnect=False)
+
+    def is_duplicate_key_error(self, error):
+        return getattr(error, 'errno', None) == errorcode.ER_DUP_ENTRY
+
+    def duplicate_key_name(self, error):
+        """The index named by "Duplicate entry '...' for key '[Table.]index'", or None."""
+        match = re.search(r"for key '(?:[^'.]*\.)?([^']+)'", getattr(error, 'msg', None) or str(error))
+        return match.group(1) if match else None
+
+    def is_missing_table_error(self, error):
+        return getattr(error, 'errno', None) == errorcode.ER_NO_SUCH_TABLE
+
+    def is_retryable_error(self, error):
+        return getattr(error, 'errno', None) in (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+    def close(self):
+        pass
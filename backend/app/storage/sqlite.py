@@ -0,0 +1,250 @@
+"""Embedded SQLite backend.
+
+The database file at Config.SQLITE_PATH is created on first use from
+database/sqlite/schema.sql, the SQLite form of init.sql plus every migration.
+Use ':memory:' for a private in-memory database shared by this process's
+connections.
+
+Connections mimic mysql-connector, so models run unchanged:
+* %s placeholders, cursor(dictionary=True), lastrowid, rowcount, fetchmany
+  and reset() all work as they do there;
+* DATE, DATETIME/TIMESTAMP and TIME columns come back as date, datetime and
+  timedelta, and those types are stored as sortable ISO text;
+* the MySQL functions the models use (NOW(), CURDATE() and
+  TIMESTAMP(date, time)) are rewritten to SQLite's;
+* unique index violations raise DuplicateKeyError, whose message names the
+  index the way MySQL's "Duplicate entry ... for key" does.
+
+The file runs in WAL mode, so readers never wait for the writer. Writers
+queue on the database lock for up to ``busy_timeout`` seconds. After that
+the "database is locked" error counts as retryable.
+"""
+import itertools
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+
+def _adapt_timedelta(value):
+    total = int(value.total_seconds())
+    sign, total = ('-', -total) if total < 0 else ('', total)
+    return f"{sign}{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+
+
+def _convert_time(value):
+    text = value.decode()
+    sign = -1 if text.startswith('-') else 1
+    hours, minutes, seconds = text.lstrip('-').split(':')
+    return sign * timedelta(hours=int(hours), minutes=int(minutes), seconds=float(seconds))
+
+
+def _convert_datetime(value):
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' ', 'seconds'))
+sqlite3.register_adapter(timedelta, _adapt_timedelta)
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('DATETIME', _convert_datetime)
+sqlite3.register_converter('TIMESTAMP', _convert_datetime)
+sqlite3.register_converter('TIME', _convert_time)
+
+_FUNCTIONS = [
+    (re.compile(r'\bNOW\(\)', re.IGNORECASE), "datetime('now', 'localtime')"),
+    (re.compile(r'\bCURDATE\(\)', re.IGNORECASE), "date('now', 'localtime')"),
+    (re.compile(r'\bTIMESTAMP\(\s*([\w.]+)\s*,\s*([\w.]+)\s*\)', re.IGNORECASE), r"(\1 || ' ' || \2)"),
+]
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """Rewrites a MySQL-dialect statement for SQLite."""
+    for pattern, replacement in _FUNCTIONS:
+        sql = pattern.sub(replacement, sql)
+    return sql.replace('%s', '?').replace('%%', '%')
+
+
+class DuplicateKeyError(sqlite3.IntegrityError):
+    """A unique index rejected the row; ``key`` is the index name."""
+
+    def __init__(self, key, detail):
+        super().__init__(f"Duplicate entry for key '{key}' ({detail})")
+        self.key = key
+
+
+class SQLiteCursor:
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+        self._dictionary = dictionary
+
+    def _run(self, method, operation, params):
+        try:
+            return method(translate(operation), params)
+        except sqlite3.IntegrityError as e:
+            raise self._connection.backend.duplicate_key_error(e) from e
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._run(self._cursor.execute, operation, params or ())
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._run(self._cursor.executemany, operation, seq_params)
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return (self._row(row) for row in self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def reset(self, free=True):
+        pass  # Rows are never left pending on the server
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    dialect = 'sqlite'
+
+    def __init__(self, raw, backend):
+        self.raw = raw
+        self.backend = backend
+        self._open = True
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self, dictionary=dictionary)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def ping(self, reconnect=False):
+        self.raw.execute("SELECT 1")
+
+    def is_connected(self):
+        return self._open
+
+    def close(self):
+        self._open = False
+        self.raw.close()
+
+
+class SQLiteBackend:
+    name = 'sqlite'
+    _memory_ids = itertools.count()
+
+    def __init__(self, path, schema_path, busy_timeout=5.0):
+        self.schema_path = schema_path
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        self._unique_keys = None  # "Table.col, Table.col" -> index name
+        self._keeper = None
+        if path == ':memory:':
+            # Shared cache lets every connection of this backend see one database
+            self.target, self.uri = f"file:medtrack-{next(self._memory_ids)}?mode=memory&cache=shared", True
+            self._keeper = self._open()  # The database lives while one connection is open
+        else:
+            self.target, self.uri = path, False
+
+    def _open(self):
+        raw = sqlite3.connect(self.target, uri=self.uri, timeout=self.busy_timeout,
+                              detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        raw.execute("PRAGMA foreign_keys = ON")
+        return raw
+
+    def connect(self, **options):
+        """Opens a connection, creating the schema first if the database is empty."""
+        raw = self._open()
+        if self._unique_keys is None:
+            with self._lock:
+                if self._unique_keys is None:
+                    self._prepare(raw)
+        return SQLiteConnection(raw, self)
+
+    def _prepare(self, raw):
+        if not self.uri:
+            raw.execute("PRAGMA journal_mode = WAL")
+        exists = raw.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Users'").fetchone()
+        if not exists:
+            with open(self.schema_path) as schema:
+                raw.executescript(schema.read())
+        self._unique_keys = self._read_unique_keys(raw)
+
+    @staticmethod
+    def _read_unique_keys(raw):
+        keys = {}
+        tables = [row[0] for row in raw.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            for index in raw.execute(f"PRAGMA index_list(`{table}`)").fetchall():
+                name, unique = index[1], index[2]
+                if unique:
+                    columns = [row[2] for row in raw.execute(f"PRAGMA index_info(`{name}`)")]
+                    keys[', '.join(f"{table}.{column}" for column in columns)] = name
+        return keys
+
+    def duplicate_key_error(self, error):
+        """Turns SQLite's "UNIQUE constraint failed: T.a, T.b" into a DuplicateKeyError."""
+        message = str(error)
+        prefix = 'UNIQUE constraint failed: '
+        if not message.startswith(prefix):
+            return error
+        columns = message[len(prefix):]
+        return DuplicateKeyError(self._unique_keys.get(columns, 'PRIMARY'), columns)
+
+    def ping(self, connection):
+        connection.ping()
+
+    def is_duplicate_key_error(self, error):
+        return isinstance(error, DuplicateKeyError)
+
+    def duplicate_key_name(self, error):
+        return error.key if isinstance(error, DuplicateKeyError) else None
+
+    def is_missing_table_error(self, error):
+        return isinstance(error, sqlite3.OperationalError) and 'no such table' in str(error)
+
+    def is_retryable_error(self, error):
+        return isinstance(error, sqlite3.OperationalError) and 'locked' in str(error)
+
+    def close(self):
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
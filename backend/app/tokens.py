@@ -0,0 +1,177 @@
+"""Stateless, HMAC-signed access tokens.
+
+A token is ``<kid>.<payload>.<signature>``. The payload is base64url JSON
+holding the user id (``sub``), an expiry (``exp``) and a random token id
+(``jti``). The signature is HMAC-SHA256 over ``<kid>.<payload>``.
+Verification is a dictionary lookup, one HMAC and a JSON decode, with no
+database round trip.
+
+Keys: new tokens are signed with Config.SECRET_KEY. Keys listed in
+Config.PREVIOUS_SECRET_KEYS still verify, so rotating the secret does not log
+everyone out. ``kid`` is a short fingerprint of the signing key, which lets
+verification pick the right key without trying them all. The default
+SECRET_KEY is public, so init_app refuses it outside development.
+
+Revocation (logout) is an in-memory set of token ids kept until the tokens
+expire. It is per worker process, so keep TOKEN_TTL short.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from config import Config, DEFAULT_SECRET_KEY
+
+
+class TokenError(ValueError):
+    """The token is malformed, forged, expired or revoked."""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def key_id(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]
+
+
+class TokenSigner:
+    def __init__(self, secret_key, previous_keys=(), ttl=3600, leeway=30, max_revoked=100000):
+        self.ttl = ttl
+        self.leeway = leeway
+        self.max_revoked = max_revoked
+        self.kid = key_id(secret_key)
+        self._keys = {key_id(key): key.encode('utf-8') for key in previous_keys if key}
+        self._keys[self.kid] = secret_key.encode('utf-8')
+        self._revoked = {}  # jti -> exp
+        self._lock = threading.Lock()
+
+    def _sign(self, kid, payload):
+        return _b64encode(hmac.new(self._keys[kid], f"{kid}.{payload}".encode('ascii'), hashlib.sha256).digest())
+
+    def issue(self, user_id, ttl=None):
+        """Returns (token, expires_at) for a user."""
+        now = int(time.time())
+        claims = {"sub": int(user_id), "iat": now, "exp": now + (ttl or self.ttl), "jti": secrets.token_urlsafe(12)}
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+        return f"{self.kid}.{payload}.{self._sign(self.kid, payload)}", claims["exp"]
+
+    def verify(self, token):
+        """Returns the token's claims or raises TokenError."""
+        try:
+            kid, payload, signature = token.split('.')
+        except (AttributeError, ValueError):
+            raise TokenError("Malformed token")
+        if not token.isascii():  # Neither signing nor compare_digest takes other characters
+            raise TokenError("Malformed token")
+        if kid not in self._keys:
+            raise TokenError("Unknown signing key")
+        if not hmac.compare_digest(signature, self._sign(kid, payload)):
+            raise TokenError("Bad signature")
+        try:
+            claims = json.loads(_b64decode(payload))
+        except (ValueError, UnicodeDecodeError):
+            raise TokenError("Malformed token")
+        if claims.get("exp", 0) + self.leeway < time.time():
+            raise TokenError("Token expired")
+        if claims.get("jti") in self._revoked:
+            raise TokenError("Token revoked")
+        return claims
+
+    def revoke(self, claims):
+        """Rejects a verified token's id until the token would have expired anyway."""
+        with self._lock:
+            self._revoked[claims["jti"]] = claims["exp"]
+            if len(self._revoked) > self.max_revoked:
+                self._prune()
+
+    def _prune(self):
+        # Called with the lock held: expired tokens fail verification anyway
+        now = time.time() - self.leeway
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp >= now}
+        while len(self._revoked) > self.max_revoked:
+            # Still too many: forget the ones expiring soonest
+            del self._revoked[min(self._revoked, key=self._revoked.get)]
+
+    def stats(self):
+        return {"kid": self.kid, "verification_keys": len(self._keys), "revoked": len(self._revoked)}
+
+
+def _secret_key(config):
+    return config.get('SECRET_KEY') or Config.SECRET_KEY or DEFAULT_SECRET_KEY
+
+
+def _create_signer(config):
+    previous = config.get('PREVIOUS_SECRET_KEYS', Config.PREVIOUS_SECRET_KEYS)
+    return TokenSigner(
+        _secret_key(config),
+        [key.strip() for key in previous.split(',')] if isinstance(previous, str) else previous,
+        ttl=config.get('TOKEN_TTL', Config.TOKEN_TTL),
+    )
+
+
+signer = _create_signer({})
+
+# Endpoints reachable without a token even when AUTH_REQUIRED is on
+PUBLIC_ENDPOINTS = {'auth.login', 'auth.signup', 'static', 'metrics'}
+
+
+def _authenticate():
+    """before_request hook: verifies a bearer token and sets g.user_id."""
+    g.user_id = None
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        try:
+            claims = signer.verify(header[len('Bearer '):].strip())
+        except TokenError as e:
+            if request.endpoint in PUBLIC_ENDPOINTS:
+                return None  # A stale token stored by the client must not stop it logging in again
+            return jsonify({"error": str(e)}), 401
+        g.user_id = claims["sub"]
+        g.token_claims = claims
+    elif (Config.AUTH_REQUIRED and request.method != 'OPTIONS'
+          and request.endpoint not in PUBLIC_ENDPOINTS):
+        return jsonify({"error": "Authentication required"}), 401
+    return None
+
+
+def current_user_id(requested=None):
+    """The authenticated user's id.
+
+    Without a token, falls back to the ``user_id`` the client sent unless
+    AUTH_REQUIRED is on. That keeps existing clients working until they
+    send tokens.
+    """
+    user_id = g.get('user_id')
+    if user_id is not None:
+        return user_id
+    return None if Config.AUTH_REQUIRED else requested
+
+
+def _check_secret_key(app):
+    if _secret_key(app.config) != DEFAULT_SECRET_KEY:
+        return
+    if Config.AUTH_REQUIRED or not (Config.DEVELOPMENT or app.debug or app.testing):
+        # Anyone who has read the repository could sign tokens for any user
+        raise RuntimeError("Set SECRET_KEY: the default key is public and may only be used in development")
+
+
+def init_app(app):
+    """Builds the signer from the app's keys and verifies tokens before every request.
+
+    Raises RuntimeError when SECRET_KEY is unset or the public default,
+    unless the app runs in development or testing with AUTH_REQUIRED off.
+    """
+    global signer
+    _check_secret_key(app)
+    signer = _create_signer(app.config)
+    app.before_request(_authenticate)
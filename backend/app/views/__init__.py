@@ -4,5 +4,6 @@ from .auth import auth_bp  # Import the blueprint from auth.py
 from .dashboard import dashboard_bp  # Import the blueprint from dashboard.py
 from .medical_history import medical_history_bp
 from .appointments import appointments_bp
+from .system import system_bp
 
-__all__ = ['auth_bp', 'dashboard_bp','appointments_bp','medical_history_bp'] #just added new 
+__all__ = ['auth_bp', 'dashboard_bp','appointments_bp','medical_history_bp','system_bp'] #just added new 
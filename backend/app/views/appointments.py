@@ -2,48 +2,98 @@ from flask import Blueprint, request, jsonify
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from database import get_db_connection
+from config import Config
 from models.appointment import Appointment  
+from models.hospital import Hospital
+from hospital_search import encode_cursor, decode_cursor
+from tokens import current_user_id
 from datetime import datetime, date
 
 appointments_bp = Blueprint('appointments', __name__)
 
+def _parse_id_list(values):
+    """Parses repeated and/or comma-separated id query parameters into unique ints."""
+    ids = []
+    for value in values:
+        for part in value.split(','):
+            if part.strip():
+                hospital_id = int(part)
+                if hospital_id not in ids:
+                    ids.append(hospital_id)
+    return ids
+
 @appointments_bp.route('/hospitals', methods=['GET'])
 def get_hospitals():
     """Retrieve a list of hospitals for the user to choose from."""
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("SELECT hospital_id, name, address, phone_number FROM Hospitals")
-        hospitals = cursor.fetchall()
-        return jsonify(hospitals), 200
-    
-    except Exception as e:
-        print(f"Error fetching hospitals: {e}")
+    hospitals = Hospital.get_hospitals()
+    if hospitals is None:
         return jsonify({"error": "Failed to retrieve hospitals"}), 500
-    
-    finally:
-        cursor.close()
-        connection.close()
+    return jsonify(hospitals), 200
+
+@appointments_bp.route('/hospitals/search', methods=['GET'])
+def search_hospitals():
+    """Typeahead search over hospital names and addresses, one keyset page at a time."""
+    query = request.args.get('q', '')
+    fields = [f for f in request.args.get('fields', 'hospital_id,name').split(',') if f]
+    try:
+        limit = int(request.args.get('limit', 10))
+        after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+    if not 1 <= limit <= Config.HOSPITAL_SEARCH_MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {Config.HOSPITAL_SEARCH_MAX_LIMIT}"}), 400
+    if not fields or any(f not in Hospital.SEARCH_FIELDS for f in fields):
+        return jsonify({"error": f"fields must be chosen from {', '.join(Hospital.SEARCH_FIELDS)}"}), 400
+
+    result = Hospital.search(query, limit, after, substring=request.args.get('match') == 'substring')
+    if result is None:
+        return jsonify({"error": "Failed to search hospitals"}), 500
+    rows, next_key = result
+    return jsonify({
+        "results": [{f: row[f] for f in fields} for row in rows],
+        "next_cursor": encode_cursor(next_key) if next_key else None,
+    }), 200
+
+@appointments_bp.route('/hospitals/nearby', methods=['GET'])
+def nearby_hospitals():
+    """The hospitals nearest to a point, optionally only those with a free slot on a date."""
+    try:
+        latitude = float(request.args['lat'])
+        longitude = float(request.args['lng'])
+        k = int(request.args.get('k', 5))
+        max_km = float(request.args['max_km']) if request.args.get('max_km') else None
+        selected_date = (datetime.strptime(request.args['date'], '%Y-%m-%d').date()
+                         if request.args.get('date') else None)
+    except (KeyError, ValueError):
+        return jsonify({"error": "Expected lat and lng, optional k, max_km and date in YYYY-MM-DD format"}), 400
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return jsonify({"error": "lat/lng out of range"}), 400
+    if not 1 <= k <= Config.NEARBY_MAX_RESULTS:
+        return jsonify({"error": f"k must be between 1 and {Config.NEARBY_MAX_RESULTS}"}), 400
+
+    hospitals = Hospital.nearby(latitude, longitude, k, selected_date, max_km)
+    if hospitals is None:
+        return jsonify({"error": "Failed to find nearby hospitals"}), 500
+    return jsonify(hospitals), 200
 
 @appointments_bp.route('/upcoming', methods=['GET'])
 def get_upcoming_appointment():
-    """Retrieve the next upcoming appointment for the logged-in user."""
-    user_id = request.args.get('user_id')
-    appointment = Appointment.get_upcoming_appointment(user_id)  
+    """Retrieve the upcoming appointments of the logged-in user, soonest first."""
+    user_id = current_user_id(request.args.get('user_id'))
+    appointments = Appointment.get_upcoming_appointment(user_id)  
     
-    if appointment:
-        # Explicitly format the datetime object to ISO 8601 format
-        if 'appointment_time' in appointment:
+    if appointments:
+        # Explicitly format the datetime objects to ISO 8601 format
+        for appointment in appointments:
             appointment['appointment_time'] = appointment['appointment_time'].strftime('%Y-%m-%d %H:%M:%S')
-        return jsonify(appointment), 200
+        return jsonify(appointments), 200
     else:
         return jsonify({"message": "No upcoming appointments"}), 200
     
 @appointments_bp.route('/available-times', methods=['GET'])
 def get_available_times():
     """Retrieve available times for a given day for booking appointments."""
-    user_id = request.args.get('user_id')
+    user_id = current_user_id(request.args.get('user_id'))
     selected_date = request.args.get('date')
     hospital_id = request.args.get('hospital_id')
     
@@ -51,11 +101,58 @@ def get_available_times():
     return jsonify(available_times), (200 if available_times else 500)
 
 
+@appointments_bp.route('/availability', methods=['GET'])
+def get_availability_range():
+    """Retrieve free slots, or free-slot counts, per day for hospitals across a date range."""
+    try:
+        hospital_ids = _parse_id_list(request.args.getlist('hospital_id'))
+        start_date = datetime.strptime(request.args.get('start', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.args.get('end', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({"error": "Expected hospital_id and start/end dates in YYYY-MM-DD format"}), 400
+
+    view = request.args.get('view', 'times')
+    if not hospital_ids or view not in ('times', 'counts'):
+        return jsonify({"error": "Missing required parameters"}), 400
+    if end_date < start_date or (end_date - start_date).days >= Config.AVAILABILITY_RANGE_MAX_DAYS:
+        return jsonify({"error": f"Date range must span 1 to {Config.AVAILABILITY_RANGE_MAX_DAYS} days"}), 400
+    if len(hospital_ids) > Config.AVAILABILITY_RANGE_MAX_HOSPITALS:
+        return jsonify({"error": f"At most {Config.AVAILABILITY_RANGE_MAX_HOSPITALS} hospitals per request"}), 400
+
+    availability = Appointment.get_availability_range(hospital_ids, start_date, end_date, counts_only=(view == 'counts'))
+    if availability is None:
+        return jsonify({"error": "Failed to retrieve availability"}), 500
+    return jsonify({
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "view": view,
+        "hospitals": {str(hospital_id): days for hospital_id, days in availability.items()},
+    }), 200
+
+@appointments_bp.route('/earliest', methods=['GET'])
+def get_earliest_available():
+    """Retrieve the soonest free slots after a given time, anywhere or in the given hospitals."""
+    try:
+        after = request.args.get('after')
+        after = datetime.strptime(after, '%Y-%m-%d %H:%M:%S') if after else datetime.now()
+        limit = int(request.args.get('limit', 5))
+        hospital_ids = _parse_id_list(request.args.getlist('hospital_id')) or None
+    except ValueError:
+        return jsonify({"error": "Expected after as YYYY-MM-DD HH:MM:SS and integer limit/hospital_id"}), 400
+
+    if limit < 1 or limit > Config.EARLIEST_SLOTS_MAX:
+        return jsonify({"error": f"limit must be between 1 and {Config.EARLIEST_SLOTS_MAX}"}), 400
+
+    slots = Appointment.find_earliest_available(max(after, datetime.now()), limit, hospital_ids)
+    if slots is None:
+        return jsonify({"error": "Failed to search available slots"}), 500
+    return jsonify(slots), 200
+
 @appointments_bp.route('/book', methods=['POST'])
 def book_appointment():
     """Book an appointment for a specific date and time."""
     data = request.json
-    user_id = data.get('user_id')
+    user_id = current_user_id(data.get('user_id'))
     print(user_id)
     appointment_time = data.get('appointment_time')  # Expected format: YYYY-MM-DD HH:MM:SS
     print(appointment_time)
@@ -82,11 +179,11 @@ def reschedule_appointment():
         if not appointment_id or not new_time:
             return jsonify({"error": "Missing required parameters"}), 400
 
-        success = Appointment.reschedule_appointment(appointment_id, new_time)
-        if success:
-            return jsonify({"message": "Appointment successfully rescheduled"}), 200
+        result = Appointment.reschedule_appointment(appointment_id, new_time, current_user_id())
+        if result['success']:
+            return jsonify({"message": result['message']}), 200
         else:
-            return jsonify({"error": "Failed to reschedule appointment"}), 500
+            return jsonify({"error": result['message']}), 500
     except Exception as e:
         print(f"Error in reschedule route: {e}")
         return jsonify({"error": "Internal server error"}), 500
@@ -102,7 +199,7 @@ def cancel_appointment():
         if not appointment_id:
             return jsonify({"error": "Missing required parameters"}), 400
 
-        success = Appointment.cancel_appointment(appointment_id)
+        success = Appointment.cancel_appointment(appointment_id, current_user_id())
         if success:
             return jsonify({"message": "Appointment successfully cancelled"}), 200
         else:
@@ -116,7 +213,7 @@ def cancel_appointment():
 def get_appointment_id():
     """Retrieve the appointment ID based on user, date, time, and hospital."""
     try:
-        user_id = request.args.get('user_id')
+        user_id = current_user_id(request.args.get('user_id'))
         appointment_time = request.args.get('appointment_time')  # Expected format: YYYY-MM-DD HH:MM:SS
         hospital_id = request.args.get('hospital_id')
 
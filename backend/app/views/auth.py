@@ -1,14 +1,21 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, request, jsonify, g
 import sys,os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database import get_db_connection  # Import the database connection function
+from database import get_db_connection, release_connection  # Import the database connection function
 
 from models.user import User  # Import the User model for database interactions
+import passwords
+from passwords import HashingBusyError
+import tokens
 
 auth_bp = Blueprint('auth', __name__)
 
+def _hashing_unavailable():
+    response = jsonify({"error": "Too many sign-in requests, please try again shortly"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
     """Handles user signup by creating a new user record."""
@@ -19,17 +26,23 @@ def signup():
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
 
-    # Check if the user already exists
-    existing_user = User.get_user_by_email(email)
-    if existing_user:
+    # Skip the costly hash for emails that are already registered. A filter
+    # miss is not proof, so the unique index on the insert stays the real check.
+    if User.may_exist(email) and User.get_user_by_email(email) is not None:
         return jsonify({"error": "User already exists"}), 400
+    release_connection()  # Not held while hashing
 
-    # Hash the password and create the new user
-    hashed_password = generate_password_hash(password)
-    if User.create_user(email, hashed_password):
+    # Hash the password and create the new user; an existing email fails the insert
+    try:
+        hashed_password = passwords.hasher.hash(password)
+    except HashingBusyError:
+        return _hashing_unavailable()
+    result = User.create_user(email, hashed_password)
+    if result["success"]:
         return jsonify({"message": "User created successfully"}), 201
-    else:
-        return jsonify({"error": "An error occurred while creating the user"}), 500
+    if result["message"] == "User already exists":
+        return jsonify({"error": result["message"]}), 400
+    return jsonify({"error": result["message"]}), 500
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
@@ -41,15 +54,45 @@ def login():
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
 
-    # Retrieve the user by email
+    # Retrieve the user by email. The email filter cannot stand in for this:
+    # users committed by other workers reach it late, or never when ids
+    # commit out of order.
     user = User.get_user_by_email(email)
     if user is None:
         return jsonify({"error": "User not found"}), 404
 
+    # Hashing can take seconds under load; don't hold a pooled connection meanwhile.
+    # A password upgrade below checks out a fresh one.
+    release_connection()
+
     # Check if the provided password matches the stored hash
-    if check_password_hash(user['password_hash'], password):
+    try:
+        verified = passwords.hasher.verify(user['password_hash'], password)
+    except HashingBusyError:
+        return _hashing_unavailable()
+
+    if verified:
+        # Upgrade hashes made with older parameters while the plain password is at hand
+        try:
+            new_hash = passwords.hasher.rehash_if_needed(user['password_hash'], password)
+        except HashingBusyError:
+            new_hash = None  # Not worth failing the login over; try again next time
+        if new_hash:
+            User.update_user_password(user['user_id'], new_hash)
+        token, expires_at = tokens.signer.issue(user['user_id'])
         return jsonify({"message": "Login successful",
-                        "userID" : user['user_id']}), 200
+                        "userID" : user['user_id'],
+                        "token": token,
+                        "expires_at": expires_at}), 200
 
     else:
-        return jsonify({"error": "Invalid credentials"}), 401
\ No newline at end of file
+        return jsonify({"error": "Invalid credentials"}), 401
+
+@auth_bp.route('/logout', methods=['POST'])
+def logout():
+    """Revokes the bearer token the request was made with."""
+    claims = g.get('token_claims')
+    if claims is None:
+        return jsonify({"error": "Authentication required"}), 401
+    tokens.signer.revoke(claims)
+    return jsonify({"message": "Logged out"}), 200
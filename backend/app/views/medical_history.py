@@ -1,32 +1,63 @@
 from flask import Blueprint, jsonify, request
 from models.medical import MedicalRecord
+from tokens import current_user_id
 #from models.medical import MedicalRecord
 
 medical_history_bp = Blueprint('medical_history', __name__)
 
 @medical_history_bp.route('/appointments', methods=['GET'])
 def get_appointments():
-    user_id = request.args.get('user_id')
-    medical_record = MedicalRecord(user_id)
-    appointments = medical_record.get_prior_appointments()
+    user_id = current_user_id(request.args.get('user_id'))
+    appointments = MedicalRecord.get_prior_appointments(user_id)
+    if appointments is None:
+        return jsonify({"error": "Failed to retrieve appointments"}), 500
     return jsonify(appointments), 200
 
 @medical_history_bp.route('/conditions', methods=['GET']) 
 def get_conditions():
-    user_id = request.args.get('user_id')
+    user_id = current_user_id(request.args.get('user_id'))
     #medical_record = MedicalRecord(user_id)
     conditions = MedicalRecord.get_prior_conditions(user_id)
+    if conditions is None:
+        return jsonify({"error": "Failed to retrieve conditions"}), 500
     return jsonify(conditions), 200
 
 @medical_history_bp.route('/medications',methods=['GET'])
 def get_medications():
-    user_id = request.args.get('user_id')
+    user_id = current_user_id(request.args.get('user_id'))
     medications = MedicalRecord.get_medications(user_id)
+    if medications is None:
+        return jsonify({"error": "Failed to retrieve medications"}), 500
     return jsonify(medications), 200
 
 @medical_history_bp.route('/',methods=['GET'])
 def get_medical_history():
-    user_id = request.args.get('user_id')
+    user_id = current_user_id(request.args.get('user_id'))
     medicalhistory = MedicalRecord.get_medical_history(user_id)
     print("API Response:", medicalhistory)
-    return jsonify(medicalhistory), 200
\ No newline at end of file
+    if medicalhistory is None:
+        return jsonify({"error": "Failed to retrieve medical history"}), 500
+    return jsonify(medicalhistory), 200
+
+@medical_history_bp.route('/summary', methods=['GET'])
+def get_summary():
+    """Conditions, medications and history reports for a user in one response.
+
+    Pass ?fields=conditions,medications to fetch only the sections a view renders.
+    """
+    user_id = current_user_id(request.args.get('user_id'))
+    if not user_id:
+        return jsonify({"error": "Missing required parameters"}), 400
+
+    fields = request.args.get('fields')
+    sections = [field.strip() for field in fields.split(',') if field.strip()] if fields else MedicalRecord.SUMMARY_SECTIONS
+    unknown = [section for section in sections if section not in MedicalRecord.SUMMARY_SECTIONS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    # One canonical tuple per set of sections, so each set is cached under one key
+    sections = tuple(section for section in MedicalRecord.SUMMARY_SECTIONS if section in sections)
+    summary = MedicalRecord.get_summary(user_id, sections)
+    if summary is None:
+        return jsonify({"error": "Failed to retrieve medical history"}), 500
+    return jsonify(summary), 200
@@ -0,0 +1,84 @@
+from flask import Blueprint, jsonify, request, send_file
+import hmac
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config import Config
+from database import get_pool_stats
+from availability import availability_index
+from cache import cache
+from hospital_search import hospital_index
+from geo import geo_index
+import passwords
+from bloom import email_filter
+from schedule import schedule_book
+from slowlog import slow_query_log
+import profiling
+
+system_bp = Blueprint('system', __name__)
+
+@system_bp.before_request
+def require_operator_key():
+    """Refuse requests that do not carry the operator key."""
+    key = Config.SYSTEM_KEY
+    given = request.headers.get(Config.SYSTEM_HEADER, '')
+    if not key or not hmac.compare_digest(given.encode(), key.encode()):
+        return jsonify({"error": "Operator key required"}), 403
+
+@system_bp.route('/pool', methods=['GET'])
+def pool_stats():
+    """Report connection pool usage so the pool can be sized per worker."""
+    return jsonify(get_pool_stats()), 200
+
+@system_bp.route('/availability-index', methods=['GET'])
+def availability_index_stats():
+    """Report whether the availability index is warm and how much memory it holds."""
+    return jsonify(availability_index.stats()), 200
+
+@system_bp.route('/cache', methods=['GET'])
+def cache_stats():
+    """Report cache hits, misses and evictions for the configured backend."""
+    return jsonify(cache.stats()), 200
+
+@system_bp.route('/hospital-search', methods=['GET'])
+def hospital_search_stats():
+    """Report the hospital search index size and how it has been refreshed."""
+    return jsonify(hospital_index.stats()), 200
+
+@system_bp.route('/geo-index', methods=['GET'])
+def geo_index_stats():
+    """Report how many hospitals the nearest-hospital index holds."""
+    return jsonify(geo_index.stats()), 200
+
+@system_bp.route('/passwords', methods=['GET'])
+def password_hashing_stats():
+    """Report password hashing latency and how many hashes are queued."""
+    return jsonify(passwords.hasher.stats()), 200
+
+@system_bp.route('/email-filter', methods=['GET'])
+def email_filter_stats():
+    """Report the email Bloom filter size and how many signup duplicate-email lookups it avoided."""
+    return jsonify(email_filter.stats()), 200
+
+@system_bp.route('/schedule', methods=['GET'])
+def schedule_stats():
+    """Report the loaded schedule rules used to generate slots."""
+    return jsonify(schedule_book.stats()), 200
+
+@system_bp.route('/slow-queries', methods=['GET'])
+def slow_query_stats():
+    """Report how many slow statements were logged, throttled or left without a plan."""
+    return jsonify(slow_query_log.stats()), 200
+
+@system_bp.route('/profiles', methods=['GET'])
+def list_profiles():
+    """List recent request profiles, newest first."""
+    limit = request.args.get('limit', type=int)
+    return jsonify(profiling.store.list(limit)), 200
+
+@system_bp.route('/profiles/<name>', methods=['GET'])
+def download_profile(name):
+    """Download one profile file (.pstats or .collapsed)."""
+    path = profiling.store.path(name)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, as_attachment=True, download_name=name)
@@ -0,0 +1,212 @@
+"""Benchmark Appointment.get_available_times as the Appointments table grows.
+
+Creates a block of benchmark hospitals with one user each and a day of
+timeslots, then grows Appointments through each requested size and times the
+availability lookup at every step. With the sargable query and the
+(hospital_id, appointment_time) slot index latency should stay flat from 10k
+to 10M rows; pass --legacy to time the old TIME()/DATE() query too.
+
+Run from the backend directory against a scratch database:
+    python benchmarks/bench_available_times.py --sizes 10000,100000,1000000,10000000
+
+Everything the benchmark inserts is deleted again unless --keep is given.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys, os
+import time
+from datetime import date, datetime, timedelta
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+from database import create_connection
+from models.appointment import Appointment
+
+BENCH_EMAIL = 'bench-available-times@medtrack.invalid'
+BENCH_HOSPITAL_PREFIX = 'Bench Hospital '
+SLOT_HOURS = range(8, 18)
+
+LEGACY_QUERY = """
+    SELECT DISTINCT t.timeslot_time
+    FROM Timeslots t
+    LEFT JOIN Appointments a
+        ON t.hospital_id = a.hospital_id
+        AND t.timeslot_time = TIME(a.appointment_time)
+        AND DATE(a.appointment_time) = %s
+    WHERE t.hospital_id = %s
+    AND t.timeslot_date = %s
+    AND (a.appointment_id IS NULL OR a.status = 'Cancelled')
+    AND NOT EXISTS (
+        SELECT 1
+        FROM Appointments a2
+        WHERE a2.hospital_id = t.hospital_id
+            AND TIME(a2.appointment_time) = t.timeslot_time
+            AND DATE(a2.appointment_time) = t.timeslot_date
+            AND a2.status = 'Scheduled'
+    )
+"""
+
+
+def setup(connection, hospitals, target_date):
+    """Creates one benchmark user per hospital, the hospitals and one day of slots."""
+    cursor = connection.cursor()
+    user_ids, hospital_ids = [], []
+    for n in range(hospitals):
+        cursor.execute("INSERT INTO Users (email, password_hash) VALUES (%s, %s)", (f"{n}-{BENCH_EMAIL}", 'x'))
+        user_ids.append(cursor.lastrowid)
+        cursor.execute(
+            "INSERT INTO Hospitals (name, address, phone_number) VALUES (%s, %s, %s)",
+            (f"{BENCH_HOSPITAL_PREFIX}{n}", f"{n} Benchmark Way", None)
+        )
+        hospital_ids.append(cursor.lastrowid)
+    cursor.executemany(
+        "INSERT INTO Timeslots (hospital_id, timeslot_time, timeslot_date) VALUES (%s, %s, %s)",
+        [(hospital_ids[0], f"{hour:02d}:00:00", target_date) for hour in SLOT_HOURS]
+    )
+    connection.commit()
+    cursor.close()
+    return user_ids, hospital_ids
+
+
+def grow_appointments(connection, user_ids, hospital_ids, count, rng, scheduled, batch_size=10000):
+    """Inserts ``count`` appointments spread over the hospitals and three years of hours.
+
+    Roughly 60% are Scheduled, but never two for the same hospital slot: the
+    slot uniqueness indexes would reject them. Each hospital's rows belong to
+    its own user, so user slots never collide either.
+    """
+    cursor = connection.cursor()
+    start = datetime.combine(date.today(), datetime.min.time())
+    remaining = count
+    while remaining > 0:
+        batch = []
+        for _ in range(min(batch_size, remaining)):
+            n = rng.randrange(len(hospital_ids))
+            when = start + timedelta(days=rng.randrange(3 * 365), hours=rng.choice(SLOT_HOURS))
+            status = rng.choice(('Cancelled', 'Completed'))
+            if rng.random() < 0.6 and (n, when) not in scheduled:
+                scheduled.add((n, when))
+                status = 'Scheduled'
+            batch.append((user_ids[n], when, hospital_ids[n], status))
+        cursor.executemany(
+            "INSERT INTO Appointments (user_id, appointment_time, hospital_id, status) VALUES (%s, %s, %s, %s)",
+            batch
+        )
+        connection.commit()
+        remaining -= len(batch)
+    cursor.close()
+
+
+def time_calls(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def legacy_lookup(connection, selected_date, hospital_id):
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(LEGACY_QUERY, (selected_date, hospital_id, selected_date))
+    cursor.fetchall()
+    cursor.close()
+
+
+def explain(connection, selected_date, hospital_id):
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("""
+        EXPLAIN SELECT DISTINCT t.timeslot_time
+        FROM Timeslots t
+        WHERE t.hospital_id = %s AND t.timeslot_date = %s
+          AND NOT EXISTS (
+              SELECT 1 FROM Appointments a
+              WHERE a.hospital_id = t.hospital_id
+                AND a.appointment_time = TIMESTAMP(t.timeslot_date, t.timeslot_time)
+                AND a.status = 'Scheduled'
+          )
+    """, (hospital_id, selected_date))
+    plan = cursor.fetchall()
+    cursor.close()
+    return [{k: row.get(k) for k in ('table', 'type', 'key', 'rows')} for row in plan]
+
+
+def cleanup(connection, user_ids, hospital_ids):
+    cursor = connection.cursor()
+    users = ', '.join(['%s'] * len(user_ids))
+    hospitals = ', '.join(['%s'] * len(hospital_ids))
+    cursor.execute(f"DELETE FROM Appointments WHERE user_id IN ({users})", user_ids)
+    cursor.execute(f"DELETE FROM Timeslots WHERE hospital_id IN ({hospitals})", hospital_ids)
+    cursor.execute(f"DELETE FROM Hospitals WHERE hospital_id IN ({hospitals})", hospital_ids)
+    cursor.execute(f"DELETE FROM Users WHERE user_id IN ({users})", user_ids)
+    connection.commit()
+    cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000,10000000',
+                        help="Comma-separated Appointments row counts to measure at")
+    parser.add_argument('--hospitals', type=int, default=100, help="Benchmark hospitals to spread rows over")
+    parser.add_argument('--iterations', type=int, default=200, help="Lookups timed per size")
+    parser.add_argument('--legacy', action='store_true', help="Also time the pre-rewrite query")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', dest='json_path', help="Write results to this JSON file")
+    parser.add_argument('--keep', action='store_true', help="Leave the benchmark rows in place")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    rng = random.Random(args.seed)
+    target_date = (date.today() + timedelta(days=30)).isoformat()
+
+    connection = create_connection()
+    user_ids, hospital_ids = setup(connection, args.hospitals, target_date)
+    target_hospital = hospital_ids[0]
+    scheduled = set()
+    results = []
+    try:
+        inserted = 0
+        for size in sizes:
+            grow_appointments(connection, user_ids, hospital_ids, size - inserted, rng, scheduled)
+            inserted = size
+            cursor = connection.cursor()
+            cursor.execute("ANALYZE TABLE Appointments")
+            cursor.fetchall()
+            cursor.close()
+
+            row = {"appointments": size}
+            row["sargable"] = time_calls(
+                lambda: Appointment.get_available_times(target_date, target_hospital), args.iterations)
+            if args.legacy:
+                row["legacy"] = time_calls(
+                    lambda: legacy_lookup(connection, target_date, target_hospital), max(1, args.iterations // 10))
+            results.append(row)
+
+            line = f"{size:>12,} rows  sargable p50 {row['sargable']['p50_ms']:>8.3f} ms  p95 {row['sargable']['p95_ms']:>8.3f} ms"
+            if args.legacy:
+                line += f"  | legacy p50 {row['legacy']['p50_ms']:>10.3f} ms"
+            print(line)
+
+        plan = explain(connection, target_date, target_hospital)
+        print("Plan:", plan)
+        growth = results[-1]["sargable"]["p50_ms"] / max(results[0]["sargable"]["p50_ms"], 1e-9)
+        print(f"p50 growth from {sizes[0]:,} to {sizes[-1]:,} rows: {growth:.2f}x")
+
+        if args.json_path:
+            with open(args.json_path, 'w') as out:
+                json.dump({"benchmark": "available_times", "results": results, "plan": plan,
+                           "p50_growth": round(growth, 3)}, out, indent=2, default=str)
+    finally:
+        if not args.keep:
+            cleanup(connection, user_ids, hospital_ids)
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
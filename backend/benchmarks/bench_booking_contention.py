@@ -0,0 +1,155 @@
+"""Contention benchmark for Appointment.book_appointment.
+
+Many threads race to book the same handful of hospital slots, each thread as
+a different user. After every round the benchmark counts slots holding more
+than one Scheduled appointment; that double-booking count must be zero. It
+also reports booking throughput and how the attempts ended.
+
+Run from the backend directory against a scratch database with the
+migrations applied:
+    python benchmarks/bench_booking_contention.py --threads 32 --slots 5 --rounds 20
+
+Exits with status 1 if any slot was double-booked.
+"""
+import argparse
+import json
+import sys, os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+from config import Config
+from database import create_connection
+from models.appointment import Appointment
+
+BENCH_EMAIL = 'bench-contention@medtrack.invalid'
+
+
+def setup(connection, users):
+    cursor = connection.cursor()
+    cursor.execute(
+        "INSERT INTO Hospitals (name, address, phone_number) VALUES (%s, %s, %s)",
+        ('Bench Contention Hospital', '1 Contention Way', None)
+    )
+    hospital_id = cursor.lastrowid
+    user_ids = []
+    for n in range(users):
+        cursor.execute("INSERT INTO Users (email, password_hash) VALUES (%s, %s)", (f"{n}-{BENCH_EMAIL}", 'x'))
+        user_ids.append(cursor.lastrowid)
+    connection.commit()
+    cursor.close()
+    return hospital_id, user_ids
+
+
+def double_bookings(connection, hospital_id):
+    """Number of extra Scheduled appointments sitting on an already-taken slot."""
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT COALESCE(SUM(taken - 1), 0) FROM (
+            SELECT COUNT(*) AS taken
+            FROM Appointments
+            WHERE hospital_id = %s AND status = 'Scheduled'
+            GROUP BY appointment_time
+            HAVING COUNT(*) > 1
+        ) doubled
+    """, (hospital_id,))
+    extra = int(cursor.fetchone()[0])
+    connection.commit()
+    cursor.close()
+    return extra
+
+
+def clear_round(connection, hospital_id):
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM Appointments WHERE hospital_id = %s", (hospital_id,))
+    connection.commit()
+    cursor.close()
+
+
+def cleanup(connection, hospital_id, user_ids):
+    clear_round(connection, hospital_id)
+    cursor = connection.cursor()
+    cursor.execute(f"DELETE FROM Users WHERE user_id IN ({', '.join(['%s'] * len(user_ids))})", user_ids)
+    cursor.execute("DELETE FROM Hospitals WHERE hospital_id = %s", (hospital_id,))
+    connection.commit()
+    cursor.close()
+
+
+def run_round(hospital_id, user_ids, slots, attempts_per_thread):
+    """Releases all threads at once and has each try every slot in turn."""
+    outcomes = Counter()
+    outcomes_lock = threading.Lock()
+    barrier = threading.Barrier(len(user_ids))
+
+    def worker(offset, user_id):
+        local = Counter()
+        barrier.wait()
+        for attempt in range(attempts_per_thread):
+            slot = slots[(offset + attempt) % len(slots)]
+            result = Appointment.book_appointment(user_id, slot, hospital_id)
+            local[result['message'] if not result['success'] else 'booked'] += 1
+        with outcomes_lock:
+            outcomes.update(local)
+
+    threads = [threading.Thread(target=worker, args=(n, user_id)) for n, user_id in enumerate(user_ids)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32, help="Concurrent bookers, one user each")
+    parser.add_argument('--slots', type=int, default=5, help="Hospital slots everyone competes for")
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--attempts', type=int, default=None, help="Booking attempts per thread per round (default: --slots)")
+    parser.add_argument('--json', dest='json_path', help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    # Every booker needs its own pooled connection to create real contention
+    Config.DB_POOL_SIZE = max(Config.DB_POOL_SIZE, args.threads)
+    attempts = args.attempts or args.slots
+    base = datetime.combine(datetime.now().date() + timedelta(days=7), datetime.min.time()).replace(hour=8)
+    slots = [(base + timedelta(hours=n)).strftime('%Y-%m-%d %H:%M:%S') for n in range(args.slots)]
+
+    connection = create_connection()
+    hospital_id, user_ids = setup(connection, args.threads)
+    totals, elapsed, doubled = Counter(), 0.0, 0
+    try:
+        for _ in range(args.rounds):
+            outcomes, seconds = run_round(hospital_id, user_ids, slots, attempts)
+            totals.update(outcomes)
+            elapsed += seconds
+            doubled += double_bookings(connection, hospital_id)
+            clear_round(connection, hospital_id)
+    finally:
+        cleanup(connection, hospital_id, user_ids)
+        connection.close()
+
+    attempts_total = sum(totals.values())
+    result = {
+        "benchmark": "booking_contention",
+        "threads": args.threads,
+        "slots": args.slots,
+        "rounds": args.rounds,
+        "attempts": attempts_total,
+        "attempts_per_second": round(attempts_total / elapsed, 1) if elapsed else None,
+        "bookings": totals['booked'],
+        "expected_bookings": args.slots * args.rounds,
+        "outcomes": dict(totals),
+        "double_bookings": doubled,
+    }
+    print(json.dumps(result, indent=2))
+    if args.json_path:
+        with open(args.json_path, 'w') as out:
+            json.dump(result, out, indent=2)
+    return 1 if doubled else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
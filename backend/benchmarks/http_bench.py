@@ -0,0 +1,407 @@
+"""HTTP benchmark suite for the Flask API.
+
+Runs scripted workloads against create_app() and reports, per workload and
+endpoint, throughput, p50/p95/p99 latency and database statements per
+request (from the X-DB-Query-Count header, see Config.QUERY_COUNT_HEADER).
+
+Targets:
+    inprocess  calls the WSGI app directly through werkzeug's test client,
+               so the numbers are app + database time, with no sockets
+    server     spawns a local threaded werkzeug server running create_app()
+               and drives it over keep-alive HTTP connections
+    --url      drives a server that is already running (e.g. gunicorn); it
+               must have QUERY_COUNT_HEADER=true for query counts
+
+Workloads (--workloads, comma-separated):
+    login      80% good passwords, 15% wrong passwords, 5% unknown emails
+    calendar   available-times for a day, sometimes a week of slot counts
+    churn      book a free slot, look its id up, cancel it
+    history    medical history summary and prior appointments
+
+The workloads log in as users made by scripts/generate_dataset.py, so load
+the seeds and a generated dataset first. Run from the backend directory:
+    python benchmarks/http_bench.py --target inprocess --duration 20 --concurrency 8 --json bench.json
+    python benchmarks/http_bench.py --compare before.json bench.json
+"""
+import argparse
+import http.client
+import json
+import platform
+import random
+import socket
+import subprocess
+import sys, os
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+from scripts.generate_dataset import EMAIL_DOMAIN, LOADTEST_PASSWORD
+
+WORKLOADS = ('login', 'calendar', 'churn', 'history')
+
+
+# Clients: both return (status, headers, body) for one request
+
+class InProcessClient:
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, params=None, body=None, headers=None):
+        response = self._client.open(path, method=method, query_string=params, json=body, headers=headers or {})
+        return response.status_code, response.headers, response.get_data()
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self._host, self._port = parts.hostname, parts.port or 80
+        self._connection = None
+
+    def request(self, method, path, params=None, body=None, headers=None):
+        if params:
+            path = f"{path}?{urlencode(params, doseq=True)}"
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(self._host, self._port, timeout=60)
+            try:
+                self._connection.request(method, path, body=payload, headers=headers)
+                response = self._connection.getresponse()
+                return response.status, response.headers, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed a keep-alive connection; reconnect once
+                self._connection.close()
+                self._connection = None
+                if attempt:
+                    raise
+
+
+# Sessions and workloads
+
+class Session:
+    """One virtual user: a client, an identity and the samples it records."""
+
+    def __init__(self, client, user_id, rng, hospital_ids):
+        self.client = client
+        self.user_id = user_id
+        self.rng = rng
+        self.hospital_ids = hospital_ids
+        self.token = None
+        self.samples = []  # (endpoint, seconds, status, queries)
+
+    def call(self, endpoint, method, path, params=None, body=None, record=True):
+        headers = {'Authorization': f"Bearer {self.token}"} if self.token else {}
+        started = time.perf_counter()
+        status, response_headers, data = self.client.request(method, path, params, body, headers)
+        elapsed = time.perf_counter() - started
+        if record:
+            queries = response_headers.get('X-DB-Query-Count')
+            self.samples.append((endpoint, elapsed, status, int(queries) if queries is not None else None))
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def login(self):
+        status, body = self.call('login', 'POST', '/api/auth/login',
+                                 body={"email": email_for(self.user_id), "password": LOADTEST_PASSWORD}, record=False)
+        if status == 200:
+            self.token = body.get('token')
+        return status
+
+    def hospital(self):
+        # Popular hospitals first, as in the generated dataset
+        return self.hospital_ids[int(len(self.hospital_ids) * self.rng.random() ** 2)]
+
+    def weekday(self, within_days=60):
+        day = date.today() + timedelta(days=self.rng.randint(1, within_days))
+        while day.weekday() >= 5:
+            day += timedelta(days=1)
+        return day
+
+
+def email_for(user_id):
+    return f"user{user_id}@{EMAIL_DOMAIN}"
+
+
+def login_workload(session, users):
+    roll = session.rng.random()
+    user_id = users[session.rng.randrange(len(users))]
+    if roll < 0.05:
+        email, password = f"nobody-{session.rng.randrange(10 ** 9)}@{EMAIL_DOMAIN}", LOADTEST_PASSWORD
+    else:
+        email, password = email_for(user_id), LOADTEST_PASSWORD if roll < 0.85 else 'wrong-password'
+    session.call('login', 'POST', '/api/auth/login', body={"email": email, "password": password})
+
+
+def calendar_workload(session, users):
+    hospital_id, day = session.hospital(), session.weekday()
+    session.call('available-times', 'GET', '/api/appointments/available-times',
+                 params={"date": day.isoformat(), "hospital_id": hospital_id, "user_id": session.user_id})
+    if session.rng.random() < 0.3:
+        session.call('availability', 'GET', '/api/appointments/availability',
+                     params={"hospital_id": hospital_id, "start": day.isoformat(),
+                             "end": (day + timedelta(days=6)).isoformat(), "view": "counts"})
+
+
+def churn_workload(session, users):
+    hospital_id, day = session.hospital(), session.weekday(within_days=30)
+    status, times = session.call('available-times', 'GET', '/api/appointments/available-times',
+                                 params={"date": day.isoformat(), "hospital_id": hospital_id, "user_id": session.user_id})
+    if status != 200 or not times:
+        return
+    hours, minutes, seconds = (int(part) for part in session.rng.choice(times)['timeslot_time'].split(':'))
+    when = f"{day.isoformat()} {hours:02d}:{minutes:02d}:{seconds:02d}"
+    status, _ = session.call('book', 'POST', '/api/appointments/book',
+                             body={"user_id": session.user_id, "appointment_time": when, "hospital_id": hospital_id})
+    if status != 201:
+        return  # Lost the slot to another session
+    status, body = session.call('get-appointment-id', 'GET', '/api/appointments/get-appointment-id',
+                                params={"user_id": session.user_id, "appointment_time": when, "hospital_id": hospital_id})
+    if status == 200:
+        session.call('cancel', 'POST', '/api/appointments/cancel', body={"appointment_id": body['appointment_id']})
+
+
+def history_workload(session, users):
+    session.call('medical-summary', 'GET', '/api/medical_history/summary', params={"user_id": session.user_id})
+    if session.rng.random() < 0.5:
+        session.call('prior-appointments', 'GET', '/api/medical_history/appointments',
+                     params={"user_id": session.user_id})
+
+
+WORKLOAD_STEPS = {
+    'login': login_workload,
+    'calendar': calendar_workload,
+    'churn': churn_workload,
+    'history': history_workload,
+}
+
+
+# Running and reporting
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))]
+
+
+def summarize(samples, wall_seconds):
+    latencies = sorted(seconds * 1000 for _, seconds, _, _ in samples)
+    queries = sorted(count for _, _, _, count in samples if count is not None)
+    statuses = {}
+    for _, _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, status, _ in samples if status >= 500),
+        "throughput_rps": round(len(samples) / wall_seconds, 1) if wall_seconds else None,
+        "p50_ms": _round(percentile(latencies, 0.50)),
+        "p95_ms": _round(percentile(latencies, 0.95)),
+        "p99_ms": _round(percentile(latencies, 0.99)),
+        "max_ms": _round(latencies[-1] if latencies else None),
+        "queries_per_request": _round(sum(queries) / len(queries) if queries else None),
+        "queries_max": queries[-1] if queries else None,
+        "statuses": statuses,
+    }
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
+
+
+def run_workload(name, make_client, users, hospital_ids, concurrency, duration, warmup, seed):
+    """Runs one workload on ``concurrency`` threads; returns (samples, measured seconds)."""
+    step = WORKLOAD_STEPS[name]
+    sessions = []
+    for n in range(concurrency):
+        rng = random.Random(f"{seed}:{name}:{n}")
+        session = Session(make_client(), users[rng.randrange(len(users))], rng, hospital_ids)
+        if name != 'login':
+            session.login()
+        sessions.append(session)
+
+    start_barrier = threading.Barrier(concurrency + 1)
+    stop = threading.Event()
+
+    def worker(session):
+        start_barrier.wait()
+        while not stop.is_set():
+            try:
+                step(session, users)
+            except Exception as e:
+                session.samples.append((f"{name}-exception", 0.0, 599, None))
+                print(f"Error in {name} workload: {e}", file=sys.stderr)
+
+    threads = [threading.Thread(target=worker, args=(session,), daemon=True) for session in sessions]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    time.sleep(warmup)
+    for session in sessions:
+        session.samples.clear()  # Warm-up samples are dropped
+    started = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return [sample for session in sessions for sample in session.samples], elapsed
+
+
+def report(name, samples, elapsed):
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    result = {"overall": summarize(samples, elapsed),
+              "endpoints": {endpoint: summarize(rows, elapsed) for endpoint, rows in sorted(by_endpoint.items())}}
+    overall = result["overall"]
+    print(f"{name:<10} {overall['requests']:>8} req {overall['throughput_rps'] or 0:>9.1f} req/s "
+          f"p50 {overall['p50_ms'] or 0:>8.2f} p95 {overall['p95_ms'] or 0:>8.2f} p99 {overall['p99_ms'] or 0:>8.2f} ms "
+          f"queries/req {overall['queries_per_request'] if overall['queries_per_request'] is not None else '-'} "
+          f"errors {overall['errors']}")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"  {endpoint:<22} {stats['requests']:>8} req p50 {stats['p50_ms'] or 0:>8.2f} "
+              f"p99 {stats['p99_ms'] or 0:>8.2f} ms queries/req {stats['queries_per_request']}")
+    return result
+
+
+def compare(before_path, after_path):
+    """Prints per-workload and per-endpoint changes between two result files."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['meta'].get('commit', '?')[:10]} -> {after['meta'].get('commit', '?')[:10]}")
+    for workload, result in after["workloads"].items():
+        old = before["workloads"].get(workload)
+        if old is None:
+            continue
+        rows = [('overall', old["overall"], result["overall"])]
+        rows += [(endpoint, old["endpoints"][endpoint], stats)
+                 for endpoint, stats in result["endpoints"].items() if endpoint in old["endpoints"]]
+        print(workload)
+        for label, a, b in rows:
+            changes = []
+            for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'):
+                if a.get(key) and b.get(key) is not None:
+                    changes.append(f"{key} {a[key]} -> {b[key]} ({(b[key] - a[key]) / a[key] * 100:+.1f}%)")
+            print(f"  {label:<22} " + ', '.join(changes))
+
+
+def serve(port):
+    """Entry point of the spawned server process."""
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    make_server('127.0.0.1', port, create_app(), threaded=True).serve_forever()
+
+
+def spawn_server():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, QUERY_COUNT_HEADER='true')
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)], env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("Benchmark server exited during startup")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    sys.exit("Benchmark server did not start within 30 seconds")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=('inprocess', 'server'), default='inprocess')
+    parser.add_argument('--url', help="Benchmark a running server instead of starting one")
+    parser.add_argument('--workloads', default=','.join(WORKLOADS))
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrent virtual users per workload")
+    parser.add_argument('--duration', type=float, default=15, help="Measured seconds per workload")
+    parser.add_argument('--warmup', type=float, default=2, help="Unmeasured seconds before each workload")
+    parser.add_argument('--first-user-id', type=int, default=1, help="First generated user to log in as")
+    parser.add_argument('--users', type=int, default=1000, help="How many generated users to spread load over")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', dest='json_path', help="Write results to this JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="Compare two result files and exit")
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        return serve(args.serve)
+    if args.compare:
+        return compare(*args.compare)
+
+    workloads = [name.strip() for name in args.workloads.split(',') if name.strip()]
+    unknown = set(workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"Unknown workloads: {', '.join(sorted(unknown))}")
+
+    server = None
+    if args.url:
+        base_url = args.url
+        make_client = lambda: HttpClient(base_url)
+    elif args.target == 'server':
+        server, base_url = spawn_server()
+        make_client = lambda: HttpClient(base_url)
+    else:
+        from config import Config
+        Config.QUERY_COUNT_HEADER = True
+        from app import create_app
+        app = create_app()
+        make_client = lambda: InProcessClient(app)
+
+    users = list(range(args.first_user_id, args.first_user_id + args.users))
+    results = {}
+    try:
+        status, hospitals = Session(make_client(), users[0], random.Random(), []).call(
+            'hospitals', 'GET', '/api/appointments/hospitals', record=False)
+        if status != 200 or not hospitals:
+            sys.exit(f"Could not list hospitals (status {status}); is the database seeded?")
+        hospital_ids = [hospital['hospital_id'] for hospital in hospitals]
+
+        for name in workloads:
+            samples, elapsed = run_workload(name, make_client, users, hospital_ids,
+                                            args.concurrency, args.duration, args.warmup, args.seed)
+            results[name] = report(name, samples, elapsed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.json_path:
+        meta = {
+            "commit": git_commit(),
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            "target": args.url or args.target,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "users": args.users,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        }
+        with open(args.json_path, 'w') as out:
+            json.dump({"meta": meta, "workloads": results}, out, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+"""Generate a large, realistic MedTrack dataset for load testing.
+
+Produces Users, Appointments, Medical_History, Conditions and Medications on
+top of the seeded hospitals and streams them either into MySQL (through
+app/bulk.py) or into CSV files that LOAD DATA INFILE reads. The defaults are
+production scale: 1M users and 20M appointments.
+
+Output is deterministic: the same --seed, --anchor and sizes give
+byte-identical rows, so a benchmark or an index experiment can be reproduced
+anywhere. Each table draws from its own random stream, so changing one
+table's size does not reshuffle the others.
+
+Shape of the data:
+* Users: every user's password is LOADTEST_PASSWORD, hashed the way the app
+  hashes (scrypt), so benchmarks can log in as any of them.
+* Appointments: activity is skewed, so a small share of users and of
+  hospitals account for most rows. Future weekday slots are booked as
+  Scheduled up to --occupancy, and never twice per hospital or user slot,
+  so the uniqueness indexes accept them. The rest are past Completed or
+  Cancelled visits and future cancellations.
+* Medical_History: most users have one. Conditions and Medications per
+  history follow a long-tailed count, and their names are drawn from a
+  Zipf-like popularity list.
+
+Run from the backend directory after the migrations and seeds:
+    python scripts/generate_dataset.py --users 1000000 --appointments 20000000 --method infile
+    python scripts/generate_dataset.py --output csv --out-dir /tmp/medtrack-data --users 10000 --appointments 200000
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys, os
+import time
+from datetime import date, timedelta
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import bulk
+
+LOADTEST_PASSWORD = 'loadtest-password'
+EMAIL_DOMAIN = 'loadtest.medtrack.invalid'
+SLOT_HOURS = range(8, 18)
+
+CONDITIONS = [
+    ('Hypertension', 'High blood pressure'),
+    ('Type 2 Diabetes', 'Insulin resistance'),
+    ('Hyperlipidemia', 'Elevated cholesterol'),
+    ('Asthma', 'Chronic airway inflammation'),
+    ('Osteoarthritis', 'Joint cartilage degeneration'),
+    ('Depression', 'Major depressive disorder'),
+    ('Anxiety', 'Generalized anxiety disorder'),
+    ('Hypothyroidism', 'Underactive thyroid'),
+    ('GERD', 'Gastroesophageal reflux disease'),
+    ('Migraine', 'Recurrent headaches'),
+    ('COPD', 'Chronic obstructive pulmonary disease'),
+    ('Atrial Fibrillation', 'Irregular heart rhythm'),
+    ('Chronic Kidney Disease', 'Reduced kidney function'),
+    ('Psoriasis', 'Autoimmune skin condition'),
+    ('Gout', 'Uric acid crystal arthritis'),
+]
+MEDICATIONS = [
+    ('Lisinopril', ('10mg', '20mg', '40mg')),
+    ('Metformin', ('500mg', '850mg', '1000mg')),
+    ('Atorvastatin', ('10mg', '20mg', '40mg')),
+    ('Levothyroxine', ('25mcg', '50mcg', '100mcg')),
+    ('Amlodipine', ('5mg', '10mg')),
+    ('Omeprazole', ('20mg', '40mg')),
+    ('Albuterol', ('90mcg',)),
+    ('Sertraline', ('50mg', '100mg')),
+    ('Metoprolol', ('25mg', '50mg')),
+    ('Ibuprofen', ('200mg', '400mg', '600mg')),
+    ('Gabapentin', ('300mg', '600mg')),
+    ('Losartan', ('25mg', '50mg', '100mg')),
+]
+NOTES = ['Routine follow-up.', 'Stable on current treatment.', 'Review in three months.',
+         'Patient reports improvement.', 'Referred to specialist.', None]
+LAB_RESULTS = ['Within normal limits.', 'Elevated LDL.', 'HbA1c 7.1%.', 'Mild anemia.', None]
+
+TABLES = {
+    'Users': ('user_id', 'email', 'password_hash'),
+    'Medical_History': ('history_id', 'user_id', 'doctor_notes', 'lab_results', 'report_date'),
+    'Conditions': ('history_id', 'condition_name', 'condition_description', 'diagnosed_date'),
+    'Medications': ('history_id', 'medication_name', 'dosage', 'start_date', 'end_date'),
+    'Appointments': ('user_id', 'appointment_time', 'hospital_id', 'status'),
+}
+
+
+def zipf_weights(count, exponent=1.1):
+    """Cumulative weights for rank 1..count with P(rank) ~ 1 / rank**exponent."""
+    total, cumulative = 0.0, []
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        cumulative.append(total)
+    return cumulative
+
+
+def skewed_index(rng, count, skew):
+    """An index in [0, count) where low indices are drawn far more often; skew=1 is uniform."""
+    return int(count * rng.random() ** skew)
+
+
+def long_tail_count(rng, mean):
+    """A geometric count >= 0 with the given mean: most draw 0-2, a few draw many."""
+    p = 1 / (mean + 1)
+    count = 0
+    while rng.random() > p:
+        count += 1
+    return count
+
+
+def password_hash(seed, method='scrypt:32768:8:1'):
+    """A werkzeug-format hash of LOADTEST_PASSWORD with a salt derived from the seed."""
+    n, r, p = method.split(':')[1:]
+    salt = hashlib.sha256(f"{seed}:salt".encode()).hexdigest()[:16]
+    n, r, p = int(n), int(r), int(p)
+    digest = hashlib.scrypt(LOADTEST_PASSWORD.encode(), salt=salt.encode(), n=n, r=r, p=p,
+                            maxmem=132 * n * r * p).hex()
+    return f"{method}${salt}${digest}"
+
+
+def weekday_slots(start, end):
+    """'YYYY-MM-DD HH:MM:SS' for every weekday slot in [start, end)."""
+    slots = []
+    day = start
+    while day < end:
+        if day.weekday() < 5:
+            slots.extend(f"{day.isoformat()} {hour:02d}:00:00" for hour in SLOT_HOURS)
+        day += timedelta(days=1)
+    return slots
+
+
+class DatasetGenerator:
+    """Row generators for each table; ids are assigned here so tables can be streamed independently."""
+
+    def __init__(self, users, appointments, hospital_ids, seed=42, anchor=None, first_user_id=1,
+                 first_history_id=1, history_share=0.7, occupancy=0.3, past_days=730, future_days=180,
+                 user_skew=1.5, hospital_skew=2.0):
+        self.users = users
+        self.appointments = appointments
+        self.hospital_ids = list(hospital_ids)
+        self.seed = seed
+        self.anchor = anchor or date.today()
+        self.first_user_id = first_user_id
+        self.first_history_id = first_history_id
+        self.history_share = history_share
+        self.occupancy = occupancy
+        self.user_skew = user_skew
+        self.hospital_skew = hospital_skew
+        self.past_slots = weekday_slots(self.anchor - timedelta(days=past_days), self.anchor)
+        self.future_slots = weekday_slots(self.anchor + timedelta(days=1), self.anchor + timedelta(days=future_days))
+
+    def _rng(self, table):
+        return random.Random(f"{self.seed}:{table}")
+
+    def _date(self, rng, days_back):
+        return (self.anchor - timedelta(days=rng.randrange(days_back))).isoformat()
+
+    def _user_id(self, rng):
+        return self.first_user_id + skewed_index(rng, self.users, self.user_skew)
+
+    def _hospital_id(self, rng):
+        return self.hospital_ids[skewed_index(rng, len(self.hospital_ids), self.hospital_skew)]
+
+    def users_rows(self):
+        hashed = password_hash(self.seed)
+        for n in range(self.users):
+            user_id = self.first_user_id + n
+            yield (user_id, f"user{user_id}@{EMAIL_DOMAIN}", hashed)
+
+    def _history_user_ids(self):
+        # Its own stream, so Conditions and Medications can recount histories without their contents
+        rng = self._rng('Medical_History:users')
+        for n in range(self.users):
+            if rng.random() < self.history_share:
+                yield self.first_user_id + n
+
+    def medical_history_rows(self):
+        rng = self._rng('Medical_History')
+        for history_id, user_id in enumerate(self._history_user_ids(), self.first_history_id):
+            yield (history_id, user_id, rng.choice(NOTES), rng.choice(LAB_RESULTS), self._date(rng, 730))
+
+    def _history_ids(self):
+        return range(self.first_history_id,
+                     self.first_history_id + sum(1 for _ in self._history_user_ids()))
+
+    def conditions_rows(self):
+        rng = self._rng('Conditions')
+        weights = zipf_weights(len(CONDITIONS))
+        for history_id in self._history_ids():
+            for _ in range(long_tail_count(rng, 1.2)):
+                name, description = rng.choices(CONDITIONS, cum_weights=weights)[0]
+                yield (history_id, name, description, self._date(rng, 3650))
+
+    def medications_rows(self):
+        rng = self._rng('Medications')
+        weights = zipf_weights(len(MEDICATIONS))
+        for history_id in self._history_ids():
+            for _ in range(long_tail_count(rng, 1.5)):
+                name, dosages = rng.choices(MEDICATIONS, cum_weights=weights)[0]
+                start = self.anchor - timedelta(days=rng.randrange(1825))
+                # Two in five prescriptions are ongoing
+                end = None if rng.random() < 0.4 else (start + timedelta(days=rng.randrange(7, 365))).isoformat()
+                yield (history_id, name, rng.choice(dosages), start.isoformat(), end)
+
+    def scheduled_count(self):
+        capacity = int(len(self.hospital_ids) * len(self.future_slots) * self.occupancy)
+        return min(capacity, self.appointments)
+
+    def appointments_rows(self):
+        rng = self._rng('Appointments')
+        remaining = self.appointments
+
+        # Future bookings, slot by slot, so no hospital or user slot is held twice
+        booked = 0
+        target = self.scheduled_count()
+        if target:
+            per_slot = max(1, round(target / len(self.future_slots)))
+            for slot in self.future_slots:
+                if booked >= target:
+                    break
+                hospitals, users = set(), set()
+                for _ in range(min(per_slot, target - booked)):
+                    hospital_id, user_id = self._hospital_id(rng), self._user_id(rng)
+                    if hospital_id in hospitals or user_id in users:
+                        continue  # Popular slot already taken: the patient went elsewhere
+                    hospitals.add(hospital_id)
+                    users.add(user_id)
+                    booked += 1
+                    yield (user_id, slot, hospital_id, 'Scheduled')
+        remaining -= booked
+
+        # History and cancellations carry no slot constraint
+        for _ in range(remaining):
+            if rng.random() < 0.8:
+                slot = rng.choice(self.past_slots)
+                status = 'Completed' if rng.random() < 0.85 else 'Cancelled'
+            else:
+                slot, status = rng.choice(self.future_slots), 'Cancelled'
+            yield (self._user_id(rng), slot, self._hospital_id(rng), status)
+
+    def tables(self):
+        """(table, columns, rows) in foreign key order."""
+        return [
+            ('Users', TABLES['Users'], self.users_rows()),
+            ('Medical_History', TABLES['Medical_History'], self.medical_history_rows()),
+            ('Conditions', TABLES['Conditions'], self.conditions_rows()),
+            ('Medications', TABLES['Medications'], self.medications_rows()),
+            ('Appointments', TABLES['Appointments'], self.appointments_rows()),
+        ]
+
+
+def next_ids(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT COALESCE(MAX(user_id), 0) + 1 FROM Users")
+    first_user_id = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(MAX(history_id), 0) + 1 FROM Medical_History")
+    first_history_id = cursor.fetchone()[0]
+    cursor.execute("SELECT hospital_id FROM Hospitals ORDER BY hospital_id")
+    hospital_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return first_user_id, first_history_id, hospital_ids
+
+
+def write_csv_tables(generator, out_dir, progress=None):
+    """Writes <table>.csv per table plus manifest.json; returns LoadStats per table."""
+    os.makedirs(out_dir, exist_ok=True)
+    results = []
+    for table, columns, rows in generator.tables():
+        stats = bulk.LoadStats(table, 'csv')
+        started = time.perf_counter()
+        stats.rows = bulk.write_csv(os.path.join(out_dir, f"{table}.csv"), rows)
+        stats.seconds = time.perf_counter() - started
+        results.append(stats)
+        if progress:
+            progress(stats)
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as out:
+        json.dump({
+            "seed": generator.seed,
+            "anchor": generator.anchor.isoformat(),
+            "hospital_ids": [generator.hospital_ids[0], generator.hospital_ids[-1]],
+            "password": LOADTEST_PASSWORD,
+            "tables": {stats.table: {"file": f"{stats.table}.csv", "columns": list(TABLES[stats.table]),
+                                     "rows": stats.rows} for stats in results},
+        }, out, indent=2)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--appointments', type=int, default=20000000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor', type=date.fromisoformat, default=date.today(),
+                        help="'Today' for the generated timeline; fix it for reproducible output")
+    parser.add_argument('--occupancy', type=float, default=0.3, help="Share of future slots booked as Scheduled")
+    parser.add_argument('--output', choices=('mysql', 'csv'), default='mysql')
+    parser.add_argument('--out-dir', default='dataset', help="Directory for --output csv")
+    parser.add_argument('--hospitals', type=int, default=112,
+                        help="Hospital ids 1..N to reference with --output csv (MySQL uses the loaded ones)")
+    parser.add_argument('--method', choices=('executemany', 'infile'), default='executemany')
+    parser.add_argument('--chunk-size', type=int, help="Rows per INSERT or per CSV file")
+    args = parser.parse_args(argv)
+
+    def progress(stats):
+        print(f"\r{stats.table}: {stats.rows:,} rows", end='', file=sys.stderr, flush=True)
+
+    options = dict(seed=args.seed, anchor=args.anchor, occupancy=args.occupancy)
+    started = time.perf_counter()
+    if args.output == 'csv':
+        generator = DatasetGenerator(args.users, args.appointments, range(1, args.hospitals + 1), **options)
+        results = write_csv_tables(generator, args.out_dir)
+    else:
+        from database import create_connection
+
+        connection = create_connection(allow_local_infile=args.method == 'infile')
+        try:
+            first_user_id, first_history_id, hospital_ids = next_ids(connection)
+            if not hospital_ids:
+                sys.exit("No hospitals found: load them first with scripts/load_seeds.py")
+            generator = DatasetGenerator(args.users, args.appointments, hospital_ids, first_user_id=first_user_id,
+                                         first_history_id=first_history_id, **options)
+            results = []
+            with bulk.bulk_session(connection, list(TABLES)):
+                for table, columns, rows in generator.tables():
+                    results.append(bulk.load(connection, table, columns, rows, args.method, args.chunk_size, progress))
+                    print(file=sys.stderr)
+        finally:
+            connection.close()
+    elapsed = time.perf_counter() - started
+
+    for stats in results:
+        print(stats)
+    total = sum(stats.rows for stats in results)
+    print(f"{'total':<20} {total:>12,} rows in {elapsed:8.2f}s ({round(total / elapsed):,} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""Bulk-load the seed hospitals and timeslots.
+
+Does what database/seeds.sql and its GenerateTimeslots procedure do, but the
+rows are generated in Python and streamed to MySQL in large chunks, either as
+multi-row INSERTs (executemany) or through LOAD DATA LOCAL INFILE. Foreign
+key and unique checks are off for the load. Each table reports rows/sec.
+
+Run from the backend directory against a database with the migrations
+applied:
+    python scripts/load_seeds.py --truncate --method infile
+
+Re-running without --truncate adds only what is missing: hospitals whose
+name already exists, existing timeslots and hospitals that already have
+schedule rules are skipped.
+--truncate refuses to run while Appointments has rows, because those point at
+the hospitals it deletes; --truncate-appointments deletes the bookings too.
+
+--method infile needs local_infile=ON on the server
+(SET GLOBAL local_infile = 1). --schedules also writes the weekly
+Hospital_Schedules rules used when TIMESLOT_SOURCE=schedule.
+
+Seeded hospitals get made-up coordinates, so /hospitals/nearby has
+something to find. Databases seeded before that, or from seeds.sql, can be
+filled in with:
+    python scripts/load_seeds.py --backfill-coordinates
+Only hospitals without coordinates are touched.
+"""
+import argparse
+import hashlib
+import json
+import sys, os
+import time
+from datetime import date, timedelta
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import bulk
+from database import create_connection, is_missing_table_error
+
+NAMED_HOSPITALS = [
+    ('Downtown Clinic', '123 Main Street, Springfield', '123-456-7890'),
+    ('Uptown Clinic', '456 Main Street, Springfield', '123-654-9870'),
+]
+HOSPITAL_COLUMNS = ('name', 'address', 'phone_number', 'latitude', 'longitude')
+NAMED_COORDINATES = {
+    'Downtown Clinic': (39.781721, -89.650148),  # Springfield, Illinois
+    'Uptown Clinic': (39.801055, -89.643604),
+}
+# Generated hospitals are spread over the contiguous United States
+LATITUDES = (25.0, 49.0)
+LONGITUDES = (-124.0, -67.0)
+WEEKDAYS = range(5)         # Monday to Friday
+SLOT_HOURS = range(8, 18)   # 08:00 to 17:00 starts
+
+# Children first so TRUNCATE never trips over a dependent table. Appointments
+# are patient data, only emptied with --truncate-appointments.
+TRUNCATE_ORDER = ['Schedule_Exceptions', 'Hospital_Schedules', 'Timeslots', 'Hospitals']
+
+
+def hospital_coordinates(name):
+    """Made-up (latitude, longitude) for a seed hospital, the same for the same name on every run."""
+    if name in NAMED_COORDINATES:
+        return NAMED_COORDINATES[name]
+    digest = hashlib.blake2b(name.encode('utf-8'), digest_size=8).digest()
+    lat_fraction = int.from_bytes(digest[:4], 'little') / 0xFFFFFFFF
+    lng_fraction = int.from_bytes(digest[4:], 'little') / 0xFFFFFFFF
+    return (round(LATITUDES[0] + lat_fraction * (LATITUDES[1] - LATITUDES[0]), 6),
+            round(LONGITUDES[0] + lng_fraction * (LONGITUDES[1] - LONGITUDES[0]), 6))
+
+
+def hospital_rows(count, existing=()):
+    """Yields rows for HOSPITAL_COLUMNS: the named hospitals, then ``count`` generated ones.
+
+    Hospitals whose name is in ``existing`` are left out.
+    """
+    rows = list(NAMED_HOSPITALS)
+    rows.extend((f"Hospital {n}", f"Address {n}, City {n}, State {n}", f"+1-555-000-{n:03d}") for n in range(count))
+    for name, address, phone_number in rows:
+        if name not in existing:
+            yield (name, address, phone_number) + hospital_coordinates(name)
+
+
+def backfill_coordinates(connection):
+    """Gives hospitals without coordinates their seed ones; returns how many were updated."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT hospital_id, name FROM Hospitals WHERE latitude IS NULL OR longitude IS NULL")
+        updates = [hospital_coordinates(name) + (hospital_id,) for hospital_id, name in cursor.fetchall()]
+        cursor.executemany("UPDATE Hospitals SET latitude = %s, longitude = %s WHERE hospital_id = %s", updates)
+        connection.commit()
+    finally:
+        cursor.close()
+    return len(updates)
+
+
+def timeslot_rows(hospital_ids, start, end):
+    """Yields (hospital_id, time, date) for every weekday slot in [start, end), per hospital."""
+    days = [start + timedelta(days=offset) for offset in range((end - start).days)]
+    days = [day.isoformat() for day in days if day.weekday() in WEEKDAYS]
+    times = [f"{hour:02d}:00:00" for hour in SLOT_HOURS]
+    for hospital_id in hospital_ids:
+        for day in days:
+            for slot_time in times:
+                yield (hospital_id, slot_time, day)
+
+
+def schedule_rows(hospital_ids):
+    opens, closes = f"{SLOT_HOURS[0]:02d}:00:00", f"{SLOT_HOURS[-1] + 1:02d}:00:00"
+    for hospital_id in hospital_ids:
+        for weekday in WEEKDAYS:
+            yield (hospital_id, weekday, opens, closes, 60)
+
+
+def fetch_hospital_ids(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT hospital_id FROM Hospitals ORDER BY hospital_id")
+    hospital_ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return hospital_ids
+
+
+def fetch_hospital_names(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT name FROM Hospitals")
+    names = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return names
+
+
+def fetch_scheduled_hospital_ids(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT DISTINCT hospital_id FROM Hospital_Schedules")
+    hospital_ids = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return hospital_ids
+
+
+def has_appointments(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT 1 FROM Appointments LIMIT 1")
+    found = cursor.fetchone() is not None
+    cursor.close()
+    return found
+
+
+def truncate(connection, appointments=False):
+    """Empties the seeded tables, and Appointments too when ``appointments`` is set."""
+    tables = ['Appointments'] + TRUNCATE_ORDER if appointments else TRUNCATE_ORDER
+    cursor = connection.cursor()
+    # SQLite has no TRUNCATE; an unqualified DELETE is its equivalent
+    statement = 'DELETE FROM' if getattr(connection, 'dialect', 'mysql') == 'sqlite' else 'TRUNCATE TABLE'
+    try:
+        for table in tables:
+            try:
+                cursor.execute(f"{statement} `{table}`")
+            except Exception as e:
+                if not is_missing_table_error(e):
+                    raise
+                # Schedule tables only exist once migration 0008 has run
+                print(f"Skipping {table}: {e}")
+    finally:
+        cursor.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--method', choices=('executemany', 'infile'), default='executemany')
+    parser.add_argument('--chunk-size', type=int, help="Rows per INSERT or per CSV file")
+    parser.add_argument('--hospitals', type=int, default=110, help="Generated hospitals besides the named two")
+    parser.add_argument('--years', type=int, default=3, help="Years of timeslots from --start")
+    parser.add_argument('--start', type=date.fromisoformat, default=date.today(), help="First timeslot date")
+    parser.add_argument('--schedules', action='store_true', help="Also load weekly Hospital_Schedules rules")
+    parser.add_argument('--no-timeslots', dest='timeslots', action='store_false',
+                        help="Skip Timeslots, e.g. with TIMESLOT_SOURCE=schedule")
+    parser.add_argument('--truncate', action='store_true', help="Empty the seeded tables first (destroys their data)")
+    parser.add_argument('--truncate-appointments', action='store_true',
+                        help="With --truncate, also delete every appointment (patient bookings)")
+    parser.add_argument('--json', dest='json_path', help="Write the load report to this JSON file")
+    parser.add_argument('--backfill-coordinates', action='store_true',
+                        help="Only give existing hospitals without coordinates their seed ones, then exit")
+    args = parser.parse_args(argv)
+
+    if args.truncate_appointments and not args.truncate:
+        parser.error("--truncate-appointments only applies with --truncate")
+    if args.backfill_coordinates:
+        connection = create_connection()
+        try:
+            print(f"Backfilled coordinates of {backfill_coordinates(connection):,} hospitals")
+        finally:
+            connection.close()
+        return
+
+    try:
+        end = args.start.replace(year=args.start.year + args.years)
+    except ValueError:  # 29 February
+        end = args.start.replace(year=args.start.year + args.years, day=28)
+    tables = ['Hospitals'] + (['Timeslots'] if args.timeslots else []) + (['Hospital_Schedules'] if args.schedules else [])
+
+    def progress(stats):
+        print(f"\r{stats.table}: {stats.rows:,} rows", end='', file=sys.stderr, flush=True)
+
+    connection = create_connection(allow_local_infile=args.method == 'infile')
+    started = time.perf_counter()
+    results = []
+    try:
+        if args.truncate and not args.truncate_appointments and has_appointments(connection):
+            parser.error("Appointments has rows that point at the hospitals --truncate deletes; "
+                         "add --truncate-appointments to delete them as well")
+        if args.truncate_appointments:
+            print("WARNING: deleting every appointment", file=sys.stderr)
+        # Without --truncate the tables may already hold some rows, which must be found and skipped
+        with bulk.bulk_session(connection, tables, unique_checks=not args.truncate):
+            if args.truncate:
+                truncate(connection, appointments=args.truncate_appointments)
+            existing = set() if args.truncate else fetch_hospital_names(connection)
+            results.append(bulk.load(connection, 'Hospitals', HOSPITAL_COLUMNS,
+                                     hospital_rows(args.hospitals, existing), args.method, args.chunk_size))
+            hospital_ids = fetch_hospital_ids(connection)
+            if args.timeslots:
+                results.append(bulk.load(connection, 'Timeslots', ('hospital_id', 'timeslot_time', 'timeslot_date'),
+                                         timeslot_rows(hospital_ids, args.start, end),
+                                         args.method, args.chunk_size, progress, ignore=True))
+                print(file=sys.stderr)
+            if args.schedules:
+                scheduled = set() if args.truncate else fetch_scheduled_hospital_ids(connection)
+                results.append(bulk.load(connection, 'Hospital_Schedules',
+                                         ('hospital_id', 'weekday', 'opens_at', 'closes_at', 'slot_minutes'),
+                                         schedule_rows([hospital_id for hospital_id in hospital_ids
+                                                        if hospital_id not in scheduled]),
+                                         args.method, args.chunk_size))
+    finally:
+        connection.close()
+    elapsed = time.perf_counter() - started
+
+    for stats in results:
+        print(stats)
+    total = sum(stats.rows for stats in results)
+    print(f"{'total':<20} {total:>12,} rows in {elapsed:8.2f}s ({round(total / elapsed):,} rows/s)")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as out:
+            json.dump({"method": args.method, "seconds": round(elapsed, 3),
+                       "tables": [stats.as_dict() for stats in results]}, out, indent=2)
+
+
+if __name__ == '__main__':
+    main()
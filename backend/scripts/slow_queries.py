@@ -0,0 +1,165 @@
+"""Summarise the slow-query log written by app/slowlog.py.
+
+Entries are grouped by statement fingerprint and ranked. The worst
+statements, the code that ran them and their plans then show up without
+anyone reproducing them. Plans that read a whole table (MySQL access_type
+ALL, SQLite SCAN without an index) are flagged.
+
+Run from the backend directory:
+    python scripts/slow_queries.py --top 10 --sort total
+    python scripts/slow_queries.py --since 2026-10-01 --plans
+    python scripts/slow_queries.py --json > slow.json
+
+The rotated files (slow_queries.jsonl.1, .2, ...) are read as well.
+"""
+import argparse
+import json
+import sys, os
+from datetime import datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+from config import Config
+
+SORT_KEYS = ('total', 'max', 'avg', 'count')
+
+
+def log_files(path):
+    """The log and its rotated backups that exist, oldest first."""
+    backups = []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        backups.append(f"{path}.{n}")
+        n += 1
+    files = list(reversed(backups))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_entries(paths, since=None):
+    """Yields log entries, skipping lines that are not JSON and entries before ``since``."""
+    for path in paths:
+        with open(path) as log:
+            for line in log:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if since is not None and datetime.fromisoformat(entry["time"]) < since:
+                    continue
+                yield entry
+
+
+def full_scans(plan):
+    """Tables the plan reads in full."""
+    if isinstance(plan, list):  # SQLite: EXPLAIN QUERY PLAN detail strings
+        return sorted({detail.split()[1] for detail in plan
+                       if detail.startswith('SCAN ') and 'INDEX' not in detail and len(detail.split()) > 1})
+    scans = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get('access_type') == 'ALL':
+                scans.add(node.get('table_name', '?'))
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return sorted(scans)
+
+
+def summarize(entries):
+    """One row per fingerprint: executions, durations, rows, sources and the latest plan."""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry["fingerprint"], {
+            "fingerprint": entry["fingerprint"],
+            "count": 0,
+            "logged": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "max_rows": 0,
+            "sources": set(),
+            "routes": set(),
+            "last_seen": None,
+            "plan": None,
+            "explain_error": None,
+        })
+        group["logged"] += 1
+        group["count"] += 1 + entry.get("suppressed", 0)
+        group["total_ms"] += entry["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+        group["max_rows"] = max(group["max_rows"], entry.get("rows") or 0)
+        if entry.get("source"):
+            group["sources"].add(entry["source"])
+        if entry.get("route"):
+            group["routes"].add(entry["route"])
+        group["last_seen"] = max(group["last_seen"] or entry["time"], entry["time"])
+        if entry.get("explain") is not None:
+            group["plan"] = entry["explain"]
+        elif entry.get("explain_error"):
+            group["explain_error"] = entry["explain_error"]
+
+    summary = []
+    for group in groups.values():
+        group["avg_ms"] = round(group["total_ms"] / group["logged"], 3)
+        group["total_ms"] = round(group["total_ms"], 3)
+        group["sources"] = sorted(group["sources"])
+        group["routes"] = sorted(group["routes"])
+        group["full_scans"] = full_scans(group["plan"]) if group["plan"] is not None else []
+        summary.append(group)
+    return summary
+
+
+def rank(summary, sort='total', top=None):
+    key = {'total': 'total_ms', 'max': 'max_ms', 'avg': 'avg_ms', 'count': 'count'}[sort]
+    ranked = sorted(summary, key=lambda group: group[key], reverse=True)
+    return ranked[:top] if top else ranked
+
+
+def report(ranked, plans=False):
+    lines = []
+    for n, group in enumerate(ranked, 1):
+        lines.append(f"{n}. {group['fingerprint']}")
+        lines.append(f"   {group['count']} slow executions ({group['logged']} logged), "
+                     f"total {group['total_ms']:.1f} ms, avg {group['avg_ms']:.1f} ms, "
+                     f"max {group['max_ms']:.1f} ms, up to {group['max_rows']} rows, last {group['last_seen']}")
+        if group["sources"]:
+            lines.append(f"   from {', '.join(group['sources'])}")
+        if group["routes"]:
+            lines.append(f"   routes {', '.join(group['routes'])}")
+        if group["full_scans"]:
+            lines.append(f"   FULL SCAN of {', '.join(group['full_scans'])}")
+        if group["explain_error"] and group["plan"] is None:
+            lines.append(f"   no plan: {group['explain_error']}")
+        if plans and group["plan"] is not None:
+            plan = group["plan"]
+            text = '\n'.join(plan) if isinstance(plan, list) else json.dumps(plan, indent=2)
+            lines.extend(f"      {line}" for line in text.splitlines())
+    return '\n'.join(lines) if lines else "No slow queries logged."
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--log', default=Config.SLOW_QUERY_LOG_PATH)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--sort', choices=SORT_KEYS, default='total')
+    parser.add_argument('--since', type=datetime.fromisoformat, help="Only entries at or after this date/time")
+    parser.add_argument('--plans', action='store_true', help="Print the latest plan of each statement")
+    parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    files = log_files(args.log)
+    if not files:
+        print(f"No slow-query log at {args.log}")
+        return 1
+    ranked = rank(summarize(read_entries(files, args.since)), args.sort, args.top)
+    if args.json:
+        print(json.dumps(ranked, indent=2))
+    else:
+        print(report(ranked, args.plans))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""Shared fixtures for tests that need the database.
+
+Each test that asks for ``db`` (or ``client``) runs inside one transaction on
+one connection, and that transaction is rolled back at teardown, so tests
+never see each other's rows and nothing has to be backed up or deleted.
+The models, the request unit of work and the loaders that open their own
+connections all get this connection back. commit() only moves a savepoint
+forward and rollback() returns to it, so code under test behaves as if it
+committed.
+
+The database follows Config.STORAGE_BACKEND:
+    sqlite  a fresh file per test session (and per xdist worker), created from
+            database/sqlite/schema.sql; no server needed:
+                STORAGE_BACKEND=sqlite pytest
+    mysql   Config.DB_NAME, brought up to date with the migrations. Under
+            pytest-xdist (pytest -n 4) every worker gets its own schema,
+            {DB_NAME}_{worker}, created from init.sql on first use and kept
+            for later runs; the DB_USER needs CREATE privileges for that.
+
+The factories insert rows through the test's connection and return their ids.
+"""
+import itertools
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import lru_cache
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+import availability
+import database
+from app import create_app
+import geo
+import hospital_search
+import migrate
+import schedule
+import storage
+from bloom import email_filter
+from cache import cache, MemoryBackend
+from config import Config
+
+INIT_SQL = os.path.join(os.path.dirname(Config.MIGRATIONS_DIR), 'init.sql')
+SAVEPOINT = 'medtrack_test'
+
+_serial = itertools.count(1)
+
+
+class TransactionalConnection:
+    """A connection whose work is undone when the test ends.
+
+    close() keeps it open and commit() releases and re-creates a savepoint,
+    so every "transaction" the code under test commits stays inside the
+    test's outer transaction.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._execute("BEGIN")
+        self._execute(f"SAVEPOINT {SAVEPOINT}")
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def _execute(self, statement):
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    def commit(self):
+        self._execute(f"RELEASE SAVEPOINT {SAVEPOINT}")
+        self._execute(f"SAVEPOINT {SAVEPOINT}")
+
+    def rollback(self):
+        self._execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+
+    def is_connected(self):
+        return self._connection.is_connected()
+
+    def close(self):
+        pass  # Shared by the whole test; discard() ends it
+
+    def discard(self):
+        """Rolls back everything the test wrote and closes the connection."""
+        try:
+            self._connection.rollback()
+        finally:
+            self._connection.close()
+
+
+class SharedConnectionPool:
+    """Stands in for database._pool, handing out the test's connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.pid = os.getpid()
+        self.checkouts = 0
+
+    def acquire(self):
+        self.checkouts += 1
+        return self.connection
+
+    def stats(self):
+        return {"size": 1, "max_overflow": 0, "opened": 1, "in_use": 0, "idle": 1, "checkouts": self.checkouts}
+
+
+def _forget_loaded_state():
+    # Indexes loaded during one test hold rows that were rolled back since
+    for index in (availability.availability_index, geo.geo_index, hospital_search.hospital_index,
+                  schedule.schedule_book, email_filter):
+        index.ready = False
+    email_filter.watermark = 0
+
+
+def _prepare_mysql(schema=None):
+    connection = database.create_connection()
+    cursor = connection.cursor()
+    try:
+        if schema:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{schema}`")
+            cursor.execute(f"USE `{schema}`")
+            cursor.execute("SHOW TABLES LIKE 'Users'")
+            if cursor.fetchone() is None:
+                migrate._run_script(cursor, INIT_SQL)
+                connection.commit()
+        migrate.migrate_up(connection, migrate.discover_migrations(), verbose=False)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+@pytest.fixture(scope='session')
+def test_database(tmp_path_factory):
+    """Points Config at this session's database, creating its schema."""
+    worker = os.getenv('PYTEST_XDIST_WORKER')
+    with pytest.MonkeyPatch.context() as patch:
+        if Config.STORAGE_BACKEND == 'sqlite':
+            # tmp_path_factory already separates xdist workers
+            patch.setattr(Config, 'SQLITE_PATH', str(tmp_path_factory.mktemp('db') / 'medtrack.db'))
+            storage.reset_backends()
+            database.create_connection().close()  # Creates the schema
+        else:
+            storage.reset_backends()
+            schema = f"{Config.DB_NAME}_{worker}" if worker else None
+            _prepare_mysql(schema)
+            if schema:
+                patch.setattr(Config, 'DB_NAME', schema)
+                storage.reset_backends()
+        yield Config.STORAGE_BACKEND
+        storage.reset_backends()
+
+
+@contextmanager
+def _transaction(patch):
+    connection = TransactionalConnection(database.create_connection())
+    patch.setattr(database, '_pool', SharedConnectionPool(connection))
+    patch.setattr(database, 'create_connection', lambda **options: connection)
+    patch.setattr(cache, 'backend', MemoryBackend())
+    _forget_loaded_state()
+    try:
+        yield connection
+    finally:
+        _forget_loaded_state()
+        connection.discard()
+
+
+@pytest.fixture
+def db(test_database, monkeypatch):
+    """The test's connection, rolled back at teardown."""
+    with _transaction(monkeypatch) as connection:
+        yield connection
+
+
+@pytest.fixture(scope='module')
+def module_db(test_database):
+    """Like db, but one transaction for a whole module, for data too costly to load per test.
+
+    Do not mix it with db in one module.
+    """
+    with pytest.MonkeyPatch.context() as patch, _transaction(patch) as connection:
+        yield connection
+
+
+@pytest.fixture
+def app(db, monkeypatch):
+    monkeypatch.setattr(Config, 'PASSWORD_HASH_WORKERS', 0)  # No hashing processes per test
+    monkeypatch.setattr(Config, 'SECRET_KEY', 'test-secret-key')
+    # Loads on the test's thread: a warm-up thread would share the test's connection
+    monkeypatch.setattr(email_filter, 'warm_in_background', lambda: email_filter.load(db))
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _insert(connection, statement, params):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(statement, params)
+        connection.commit()  # A failed request rolls back to here, keeping the row
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+
+
+@lru_cache(maxsize=None)
+def _password_hash(password):
+    return generate_password_hash(password, method=Config.PASSWORD_HASH_METHOD, salt_length=Config.PASSWORD_SALT_LENGTH)
+
+
+@pytest.fixture
+def make_user(db):
+    """make_user(email=None, password='password') -> {'user_id', 'email', 'password'}"""
+    def make(email=None, password='password'):
+        email = email or f"user{next(_serial)}@example.com"
+        user_id = _insert(db, "INSERT INTO Users (email, password_hash) VALUES (%s, %s)",
+                          (email, _password_hash(password)))
+        return {"user_id": user_id, "email": email, "password": password}
+    return make
+
+
+@pytest.fixture
+def make_hospital(db):
+    """make_hospital(name=None, ...) -> hospital_id"""
+    def make(name=None, address='1 Test Street', phone_number='555-0100', latitude=None, longitude=None):
+        name = name or f"Test Hospital {next(_serial)}"
+        return _insert(db, """
+            INSERT INTO Hospitals (name, address, phone_number, latitude, longitude)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (name, address, phone_number, latitude, longitude))
+    return make
+
+
+@pytest.fixture
+def make_slots(db):
+    """make_slots(hospital_id, day, times=('09:00:00', ...)) -> ['YYYY-MM-DD HH:MM:SS', ...]"""
+    def make(hospital_id, day, times=tuple(f"{hour:02d}:00:00" for hour in range(9, 17))):
+        day = day if isinstance(day, date) else date.fromisoformat(day)
+        cursor = db.cursor()
+        try:
+            cursor.executemany(
+                "INSERT INTO Timeslots (hospital_id, timeslot_time, timeslot_date) VALUES (%s, %s, %s)",
+                [(hospital_id, time, day) for time in times]
+            )
+            db.commit()
+        finally:
+            cursor.close()
+        return [f"{day} {time}" for time in times]
+    return make
+
+
+@pytest.fixture
+def make_appointment(db):
+    """make_appointment(user_id, hospital_id, appointment_time, status='Scheduled') -> appointment_id"""
+    def make(user_id, hospital_id, appointment_time, status='Scheduled'):
+        if isinstance(appointment_time, datetime):
+            appointment_time = appointment_time.isoformat(' ', 'seconds')
+        return _insert(db, """
+            INSERT INTO Appointments (user_id, appointment_time, hospital_id, status)
+            VALUES (%s, %s, %s, %s)
+        """, (user_id, appointment_time, hospital_id, status))
+    return make
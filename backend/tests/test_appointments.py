@@ -1,99 +1,38 @@
 import pytest
 import sys, os
 from mysql.connector import Error
-from werkzeug.security import generate_password_hash
+from datetime import date, timedelta
 
 # Set the current directory to the 'backend' root
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
 
-from app import create_app
-from database import get_db_connection
-
-@pytest.fixture
-def client():
-    app = create_app()
-    app.config['TESTING'] = True
-    client = app.test_client()
-
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
+import sqlite3
+from mysql.connector import errorcode
+from mysql.connector.errors import IntegrityError, InternalError
 
-    # Disable foreign key checks to allow deletion during setup
-    cursor.execute("SET FOREIGN_KEY_CHECKS=0")
-
-    # Backup existing data
-    cursor.execute("SELECT * FROM Users")
-    backup_users = cursor.fetchall()
-    cursor.execute("SELECT * FROM Appointments")
-    backup_appointments = cursor.fetchall()
-    cursor.execute("SELECT * FROM Timeslots")
-    backup_timeslots = cursor.fetchall()
-    cursor.execute("SELECT * FROM Hospitals")
-    backup_hospitals = cursor.fetchall()
-
-    # Clean tables for tests
-    cursor.execute("DELETE FROM Appointments")
-    cursor.execute("DELETE FROM Users")
-    cursor.execute("DELETE FROM Timeslots")
-    cursor.execute("DELETE FROM Hospitals")
-    connection.commit()
-
-    # Enable foreign key checks
-    cursor.execute("SET FOREIGN_KEY_CHECKS=1")
-
-    password = generate_password_hash('hashed_password')
-    password2 = generate_password_hash('hashed_password2')
-
-
-    # Insert sample data
-    cursor.execute("INSERT INTO Users (user_id, email, password_hash, created_at, updated_at) VALUES (%s, %s, %s, NOW(), NOW())",(1, 'testuser@example.com', password))
-    cursor.execute("INSERT INTO Users (user_id, email, password_hash, created_at, updated_at) VALUES (%s, %s, %s, NOW(), NOW())",(2, 'testuser2@example.com', password2))        
-    cursor.execute("INSERT INTO Hospitals (hospital_id, name, address, phone_number) VALUES (1, 'Sample Hospital', '123 Health St', '555-1234')")
-    cursor.execute("INSERT INTO Timeslots (timeslot_id, hospital_id, timeslot_time, timeslot_date) VALUES (1, 1, '10:00:00', '2024-12-01')")
-    cursor.execute("INSERT INTO Timeslots (timeslot_id, hospital_id, timeslot_time, timeslot_date) VALUES (2, 1, '11:00:00', '2024-12-01')")
+from config import Config
+from database import get_db_connection
+from models.appointment import Appointment
+from models.user import User
+from storage.mysql import MySQLBackend
+import models.appointment
+
+SLOT_DATE = (date.today() + timedelta(days=30)).isoformat()
+NO_SLOTS_DATE = (date.today() + timedelta(days=31)).isoformat()
+SLOT_TAKEN = "This time slot is no longer available. Please choose a different time."
+USER_CONFLICT = "Appointment conflicts with an existing one. Please choose a different time."
+
+@pytest.fixture(autouse=True)
+def sample(make_user, make_hospital, make_slots, make_appointment):
+    user = make_user('testuser@example.com', 'hashed_password')
+    other_user = make_user('testuser2@example.com', 'hashed_password2')
+    hospital_id = make_hospital('Sample Hospital', '123 Health St', '555-1234')
+    make_slots(hospital_id, SLOT_DATE, ['10:00:00', '11:00:00'])
 
     # Add a future appointment for the user
-    future_appointment_time = "2024-12-01 10:00:00"
-    cursor.execute("INSERT INTO Appointments (user_id, appointment_time, hospital_id, status) VALUES (%s, %s, %s, 'Scheduled')", 
-                   (1, future_appointment_time, 1))
-    connection.commit()
-
-    yield client  # Provide the client to the test
-
-    # Restore original data
-    cursor.execute("SET FOREIGN_KEY_CHECKS=0")
-    cursor.execute("DELETE FROM Appointments")
-    cursor.execute("DELETE FROM Appointments")
-    cursor.execute("DELETE FROM Users")
-    cursor.execute("DELETE FROM Timeslots")
-    cursor.execute("DELETE FROM Hospitals")
-    connection.commit()
-    cursor.execute("SET FOREIGN_KEY_CHECKS=1")
-    for user in backup_users:
-        cursor.execute(
-            "INSERT INTO Users (user_id, email, password_hash, created_at, updated_at) VALUES (%s, %s, %s, %s, %s)",
-            (user['user_id'], user['email'], user['password_hash'], user['created_at'], user['updated_at'])
-        )
-    for appointment in backup_appointments:
-        cursor.execute(
-            "INSERT INTO Appointments (appointment_id, user_id, appointment_time, hospital_id, status) VALUES (%s, %s, %s, %s, %s)",
-            (appointment['appointment_id'], appointment['user_id'], appointment['appointment_time'], appointment['hospital_id'], appointment['status'])
-        )
-    for timeslot in backup_timeslots:
-        cursor.execute(
-            "INSERT INTO Timeslots (timeslot_id, hospital_id, timeslot_time, timeslot_date) VALUES (%s, %s, %s, %s)",
-            (timeslot['timeslot_id'], timeslot['hospital_id'], timeslot['timeslot_time'], timeslot['timeslot_date'])
-        )
-    for hospital in backup_hospitals:
-        cursor.execute(
-            "INSERT INTO Hospitals (hospital_id, name, address, phone_number) VALUES (%s, %s, %s, %s)",
-            (hospital['hospital_id'], hospital['name'], hospital['address'], hospital['phone_number'])
-        )
-
-    connection.commit()
-    cursor.close()
-    connection.close()
+    make_appointment(user['user_id'], hospital_id, f"{SLOT_DATE} 10:00:00")
+    return {'user_id': user['user_id'], 'other_user_id': other_user['user_id'], 'hospital_id': hospital_id}
 
 def get_last_inserted_appointment_id(client):
     """Fetch the most recently inserted appointment ID."""
@@ -142,21 +81,22 @@ def test_select_hospital(client):
     assert isinstance(hospitals, list)
     assert all("hospital_id" in hospital and "name" in hospital for hospital in hospitals)
 
-def test_upcoming_appointments(client):
-    user_id = 1
+def test_upcoming_appointments(client, sample):
+    user_id = sample['user_id']
     response = client.get(f'/api/appointments/upcoming?user_id={user_id}')
     assert response.status_code == 200
-    appointment = response.json
-    if appointment:
-        assert "appointment_time" in appointment
-        assert "hospital_name" in appointment
+    appointments = response.json
+    if isinstance(appointments, list):
+        assert appointments
+        assert all("appointment_time" in appointment and "hospital_name" in appointment
+                   for appointment in appointments)
     else:
-        assert appointment.get("message") == "No upcoming appointments"
+        assert appointments.get("message") == "No upcoming appointments"
 
-def test_available_times(client):
+def test_available_times(client, sample):
     user_id = get_last_inserted_user(client)
-    selected_date = "2024-12-01"
-    hospital_id = 1
+    selected_date = SLOT_DATE
+    hospital_id = sample['hospital_id']
     
     response = client.get(f'/api/appointments/available-times?user_id={user_id}&date={selected_date}&hospital_id={hospital_id}')
     assert response.status_code == 200
@@ -164,10 +104,10 @@ def test_available_times(client):
     assert isinstance(available_times, list)
     assert all("timeslot_time" in slot for slot in available_times)
 
-def test_book_appointment(client):
-    user_id = 1
-    appointment_time = "2024-12-01 13:00:00"
-    hospital_id = 1
+def test_book_appointment(client, sample):
+    user_id = sample['user_id']
+    appointment_time = f"{SLOT_DATE} 13:00:00"
+    hospital_id = sample['hospital_id']
 
     response = client.post('/api/appointments/book', json={
         'user_id': user_id,
@@ -178,8 +118,8 @@ def test_book_appointment(client):
     message = response.json
     assert message.get("message") == "Appointment successfully booked"
 
-def test_full_appointment_process(client):
-    user_id = 1
+def test_full_appointment_process(client, sample):
+    user_id = sample['user_id']
 
     hospital_response = client.get('/api/appointments/hospitals')
     assert hospital_response.status_code == 200
@@ -190,7 +130,7 @@ def test_full_appointment_process(client):
     upcoming_response = client.get(f'/api/appointments/upcoming?user_id={user_id}')
     assert upcoming_response.status_code == 200
 
-    selected_date = "2024-12-01"
+    selected_date = SLOT_DATE
     available_times_response = client.get(f'/api/appointments/available-times?user_id={user_id}&date={selected_date}&hospital_id={hospital_id}')
     assert available_times_response.status_code == 200
     available_times = available_times_response.json
@@ -207,12 +147,12 @@ def test_full_appointment_process(client):
     booking_message = book_response.json
     assert booking_message.get("message") == "Appointment successfully booked"
 
-def test_book_already_taken_slot(client):
-    user_id = 1
-    appointment_time = "2024-12-01 10:00:00"
-    hospital_id = 1
+def test_book_already_taken_slot(client, sample):
+    user_id = sample['user_id']
+    appointment_time = f"{SLOT_DATE} 10:00:00"
+    hospital_id = sample['hospital_id']
 
-    user_id2 = 2
+    user_id2 = sample['other_user_id']
 
     # Book the first appointment
     client.post('/api/appointments/book', json={
@@ -221,14 +161,15 @@ def test_book_already_taken_slot(client):
         'hospital_id': hospital_id
     })
 
-    # Attempt to book the same slot again
+    # Attempt to book the same slot again; it breaks both unique slot indexes,
+    # and which one the database reports first depends on the backend
     response = client.post('/api/appointments/book', json={
         'user_id': user_id,
         'appointment_time': appointment_time,
         'hospital_id': hospital_id
     })
     assert response.status_code == 500
-    assert b"Failed to book appointment" in response.data
+    assert response.json["error"] in (SLOT_TAKEN, USER_CONFLICT)
 
     # Attempt to book the same slot again with a different user
     response = client.post('/api/appointments/book', json={
@@ -237,27 +178,152 @@ def test_book_already_taken_slot(client):
         'hospital_id': hospital_id
     })
     assert response.status_code == 500
-    assert b"Failed to book appointment" in response.data
+    assert response.json["error"] == SLOT_TAKEN
+
+def test_booking_a_taken_hospital_slot_says_it_is_unavailable(client, sample):
+    response = client.post('/api/appointments/book', json={
+        'user_id': sample['other_user_id'],
+        'appointment_time': f"{SLOT_DATE} 10:00:00",
+        'hospital_id': sample['hospital_id']
+    })
+    assert response.status_code == 500
+    assert response.json == {"error": SLOT_TAKEN}
+    assert not is_time_slot_available(client, sample['hospital_id'], SLOT_DATE, "10:00:00")
+
+def test_booking_the_same_time_elsewhere_says_it_conflicts(client, sample, make_hospital, make_slots):
+    other_hospital_id = make_hospital()
+    make_slots(other_hospital_id, SLOT_DATE, ['10:00:00'])
+    response = client.post('/api/appointments/book', json={
+        'user_id': sample['user_id'],
+        'appointment_time': f"{SLOT_DATE} 10:00:00",
+        'hospital_id': other_hospital_id
+    })
+    assert response.status_code == 500
+    assert response.json == {"error": USER_CONFLICT}
+    assert is_time_slot_available(client, other_hospital_id, SLOT_DATE, "10:00:00")
+
+def test_rescheduling_onto_a_taken_slot_says_it_is_unavailable(client, sample, make_appointment):
+    appointment_id = get_last_inserted_appointment_id(client)
+    make_appointment(sample['other_user_id'], sample['hospital_id'], f"{SLOT_DATE} 11:00:00")
+    response = client.post('/api/appointments/reschedule', json={
+        'appointment_id': appointment_id,
+        'new_time': f"{SLOT_DATE} 11:00:00"
+    })
+    assert response.status_code == 500
+    assert response.json == {"error": SLOT_TAKEN}
+    assert not is_time_slot_available(client, sample['hospital_id'], SLOT_DATE, "10:00:00")
+
+def test_rescheduling_onto_own_appointment_elsewhere_says_it_conflicts(client, sample, make_hospital,
+                                                                      make_appointment):
+    appointment_id = get_last_inserted_appointment_id(client)
+    make_appointment(sample['user_id'], make_hospital(), f"{SLOT_DATE} 11:00:00")
+    response = client.post('/api/appointments/reschedule', json={
+        'appointment_id': appointment_id,
+        'new_time': f"{SLOT_DATE} 11:00:00"
+    })
+    assert response.status_code == 500
+    assert response.json == {"error": USER_CONFLICT}
+
+@pytest.mark.parametrize('key, message', [
+    ("Appointments.uq_appointments_user_slot", USER_CONFLICT),
+    ("uq_appointments_user_slot", USER_CONFLICT),
+    ("Appointments.uq_appointments_hospital_slot", SLOT_TAKEN),
+])
+def test_conflict_message_follows_the_mysql_key_name(monkeypatch, key, message):
+    monkeypatch.setattr(models.appointment, 'duplicate_key_name', MySQLBackend().duplicate_key_name)
+    error = IntegrityError(msg=f"Duplicate entry '7-2030-01-07 10:00:00-1' for key '{key}'", errno=errorcode.ER_DUP_ENTRY)
+    assert models.appointment._conflict_message(error) == message
+
+def test_cancelled_slot_can_be_booked_by_another_user(client, sample):
+    client.post('/api/appointments/cancel', json={'appointment_id': get_last_inserted_appointment_id(client)})
+    response = client.post('/api/appointments/book', json={
+        'user_id': sample['other_user_id'],
+        'appointment_time': f"{SLOT_DATE} 10:00:00",
+        'hospital_id': sample['hospital_id']
+    })
+    assert response.status_code == 201
+
 
-def test_no_available_times(client):
-    user_id = 1
-    selected_date = "2024-12-25"  # Assuming this date has no available times in test data
-    hospital_id = 1
+def retryable_error():
+    """An error the configured backend counts as a deadlock or lock wait timeout."""
+    if Config.STORAGE_BACKEND == 'sqlite':
+        return sqlite3.OperationalError("database is locked")
+    return InternalError(msg="Deadlock found when trying to get lock", errno=errorcode.ER_LOCK_DEADLOCK)
+
+
+class FlakyConnection:
+    """Fails the next ``failures`` appointment INSERTs, optionally losing the savepoint like a deadlock does."""
+
+    def __init__(self, connection, failures, lose_savepoint=False):
+        self._connection = connection
+        self.failures = failures
+        self.lose_savepoint = lose_savepoint
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return FlakyCursor(self._connection.cursor(*args, **kwargs), self)
+
+
+class FlakyCursor:
+    def __init__(self, cursor, owner):
+        self._cursor = cursor
+        self._owner = owner
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, operation, params=None):
+        if 'INSERT INTO Appointments' in operation and self._owner.failures:
+            self._owner.failures -= 1
+            raise retryable_error()
+        if operation.startswith('ROLLBACK TO SAVEPOINT') and self._owner.lose_savepoint:
+            raise InternalError(msg="SAVEPOINT does not exist", errno=errorcode.ER_SP_DOES_NOT_EXIST)
+        return self._cursor.execute(operation, params)
+
+
+def test_booking_retry_keeps_the_rest_of_the_request(app, sample, monkeypatch):
+    monkeypatch.setattr(Config, 'BOOKING_RETRY_BACKOFF', 0)
+    with app.app_context():
+        User.create_user('earlier-in-request@example.com', 'x')
+        flaky = FlakyConnection(get_db_connection(), failures=2)
+        monkeypatch.setattr(models.appointment, 'get_db_connection', lambda: flaky)
+        result = Appointment.book_appointment(sample['other_user_id'], f"{SLOT_DATE} 11:00:00", sample['hospital_id'])
+        assert result["success"] and flaky.failures == 0
+    assert User.get_user_by_email('earlier-in-request@example.com') is not None
+    assert not is_time_slot_available(None, sample['hospital_id'], SLOT_DATE, "11:00:00")
+
+def test_lost_transaction_is_not_half_committed(app, sample, monkeypatch):
+    monkeypatch.setattr(Config, 'BOOKING_RETRY_BACKOFF', 0)
+    with app.app_context():
+        User.create_user('earlier-in-request@example.com', 'x')
+        flaky = FlakyConnection(get_db_connection(), failures=1, lose_savepoint=True)
+        monkeypatch.setattr(models.appointment, 'get_db_connection', lambda: flaky)
+        result = Appointment.book_appointment(sample['other_user_id'], f"{SLOT_DATE} 11:00:00", sample['hospital_id'])
+        assert not result["success"]
+    assert User.get_user_by_email('earlier-in-request@example.com') is None
+    assert is_time_slot_available(None, sample['hospital_id'], SLOT_DATE, "11:00:00")
+
+def test_no_available_times(client, sample):
+    user_id = sample['user_id']
+    selected_date = NO_SLOTS_DATE  # No timeslots in the test data
+    hospital_id = sample['hospital_id']
 
     response = client.get(f'/api/appointments/available-times?user_id={user_id}&date={selected_date}&hospital_id={hospital_id}')
     assert response.status_code == 500
     available_times = response.json
     assert available_times == []
 
-def test_reschedule_appointment_success(client):
+def test_reschedule_appointment_success(client, sample):
     """Test successful rescheduling of an appointment."""
-    new_time = "2024-12-01 11:00:00"
+    new_time = f"{SLOT_DATE} 11:00:00"
     appointment_id = get_last_inserted_appointment_id(client)
     assert appointment_id is not None, "No appointment found to reschedule."
 
     # Verify new time slot is available
-    hospital_id = 1
-    assert is_time_slot_available(client, hospital_id, "2024-12-01", "11:00:00"), "Time slot is not available."
+    hospital_id = sample['hospital_id']
+    assert is_time_slot_available(client, hospital_id, SLOT_DATE, "11:00:00"), "Time slot is not available."
 
     response = client.post('/api/appointments/reschedule', json={
         'appointment_id': appointment_id,
@@ -267,14 +333,14 @@ def test_reschedule_appointment_success(client):
     assert response.json.get("message") == "Appointment successfully rescheduled"
 
     
-def test_reschedule_appointment_timeslot_assignment(client):
+def test_reschedule_appointment_timeslot_assignment(client, sample):
     """Test that rescheduling updates the appointment time without creating double-booking."""
     appointment_id = get_last_inserted_appointment_id(client)
     assert appointment_id is not None, "No appointment found to reschedule."
 
-    original_time = "2024-12-01 10:00:00"
-    new_time = "2024-12-01 11:00:00"
-    hospital_id = 1
+    original_time = f"{SLOT_DATE} 10:00:00"
+    new_time = f"{SLOT_DATE} 11:00:00"
+    hospital_id = sample['hospital_id']
 
     # Verify original time slot has the scheduled appointment
     connection = get_db_connection()
@@ -288,7 +354,7 @@ def test_reschedule_appointment_timeslot_assignment(client):
     assert original_slot['count'] == 1, "Original time slot does not have the scheduled appointment."
 
     # Verify new time slot is available
-    assert is_time_slot_available(client, hospital_id, "2024-12-01", "11:00:00"), "New time slot is not available."
+    assert is_time_slot_available(client, hospital_id, SLOT_DATE, "11:00:00"), "New time slot is not available."
 
     # Reschedule the appointment
     response = client.post('/api/appointments/reschedule', json={
@@ -320,33 +386,33 @@ def test_reschedule_appointment_timeslot_assignment(client):
     cursor.close()
     connection.close()
 
-def test_original_timeslot_available_after_reschedule(client):
+def test_original_timeslot_available_after_reschedule(client, sample):
     """Test that the original timeslot becomes available after rescheduling."""
-    user_id = 1
+    user_id = sample['user_id']
     original_time = "10:00:00"
-    hospital_id = 1
+    hospital_id = sample['hospital_id']
     appointment_id = get_last_inserted_appointment_id(client)
     assert appointment_id is not None, "No appointment found to reschedule."
 
     # Reschedule to a new time
     client.post('/api/appointments/reschedule', json={
         'appointment_id': appointment_id,
-        'new_time': "2024-12-01 11:00:00"
+        'new_time': f"{SLOT_DATE} 11:00:00"
     })
 
     # Check availability of original timeslot
     response = client.get(
-        f'/api/appointments/available-times?user_id={user_id}&date=2024-12-01&hospital_id={hospital_id}'
+        f'/api/appointments/available-times?user_id={user_id}&date={SLOT_DATE}&hospital_id={hospital_id}'
     )
     assert response.status_code == 200
     available_times = [slot['timeslot_time'] for slot in response.json]
     assert original_time in available_times
 
-def test_no_double_booking_on_rescheduled_timeslot(client):
+def test_no_double_booking_on_rescheduled_timeslot(client, sample):
     """Test that the rescheduled timeslot cannot be double-booked."""
-    user_id = 2  # Another user trying to book the rescheduled slot
-    new_time = "2024-12-01 11:00:00"
-    hospital_id = 1
+    user_id = sample['other_user_id']  # Another user trying to book the rescheduled slot
+    new_time = f"{SLOT_DATE} 11:00:00"
+    hospital_id = sample['hospital_id']
     appointment_id = get_last_inserted_appointment_id(client)
     assert appointment_id is not None, "No appointment found to reschedule."
 
@@ -363,7 +429,7 @@ def test_no_double_booking_on_rescheduled_timeslot(client):
         'hospital_id': hospital_id
     })
     assert response.status_code == 500
-    assert b"Failed to book appointment" in response.data
+    assert response.json["error"] == SLOT_TAKEN
 
 
 def test_cancel_appointment_success(client):
@@ -377,9 +443,9 @@ def test_cancel_appointment_success(client):
     assert response.status_code == 200
     assert response.json.get("message") == "Appointment successfully cancelled"
 
-def test_canceled_timeslot_becomes_available(client):
+def test_canceled_timeslot_becomes_available(client, sample):
     """Test that the canceled timeslot becomes available for booking."""
-    user_id = 1
+    user_id = sample['user_id']
     appointment_id = get_last_inserted_appointment_id(client)
     assert appointment_id is not None, "No appointment found to cancel."
 
@@ -390,28 +456,29 @@ def test_canceled_timeslot_becomes_available(client):
 
     # Check that the timeslot is released
     response = client.get(
-        f'/api/appointments/available-times?user_id={user_id}&date=2024-12-01&hospital_id=1'
+        f'/api/appointments/available-times?user_id={user_id}&date={SLOT_DATE}&hospital_id={sample["hospital_id"]}'
     )
     assert response.status_code == 200
     available_times = [slot['timeslot_time'] for slot in response.json]
     assert "10:00:00" in available_times
 
-def test_database_update_after_reschedule_and_cancel(client):
+def test_database_update_after_reschedule_and_cancel(client, sample):
     """Test that the database is updated correctly after rescheduling and cancellation."""
-    user_id = 1
+    user_id = sample['user_id']
     appointment_id = get_last_inserted_appointment_id(client)
     assert appointment_id is not None, "No appointment found to reschedule."
 
     # Check rescheduling database integrity
-    new_time = "2024-12-01 11:00:00"
+    new_time = f"{SLOT_DATE} 11:00:00"
     client.post('/api/appointments/reschedule', json={
         'appointment_id': appointment_id,
         'new_time': new_time
     })
     rescheduled_response = client.get(f'/api/appointments/upcoming?user_id={user_id}')
     assert rescheduled_response.status_code == 200
-    rescheduled_appointment = rescheduled_response.json
-    assert rescheduled_appointment.get("appointment_time") == "2024-12-01 11:00:00"
+    rescheduled_appointments = rescheduled_response.json
+    assert [appointment["appointment_id"] for appointment in rescheduled_appointments] == [appointment_id]
+    assert rescheduled_appointments[0]["appointment_time"] == f"{SLOT_DATE} 11:00:00"
 
     # Check cancellation database integrity
     client.post('/api/appointments/cancel', json={
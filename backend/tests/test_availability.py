@@ -0,0 +1,132 @@
+import pytest
+import sys, os
+from datetime import date, datetime, timedelta
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from availability import AvailabilityIndex
+
+DAY = date(2030, 3, 4)
+HOURS = range(8, 18)
+
+
+class FakeCursor:
+    """Answers the three warm-up queries from in-memory rows."""
+
+    def __init__(self, timeslots, appointments):
+        self.timeslots = timeslots
+        self.appointments = appointments
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        if 'DISTINCT timeslot_time' in sql:
+            self.rows = [(t,) for t in sorted({row[2] for row in self.timeslots})]
+        elif 'FROM Timeslots' in sql:
+            self.rows = list(self.timeslots)
+        else:
+            self.rows = list(self.appointments)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, timeslots, appointments=()):
+        self.timeslots = timeslots
+        self.appointments = appointments
+
+    def cursor(self):
+        return FakeCursor(self.timeslots, self.appointments)
+
+
+@pytest.fixture
+def index():
+    timeslots = [(hospital_id, DAY + timedelta(days=offset), timedelta(hours=hour))
+                 for hospital_id in (1, 2) for offset in range(3) for hour in HOURS]
+    appointments = [(1, datetime(2030, 3, 4, 10)), (2, datetime(2030, 3, 5, 8))]
+    return AvailabilityIndex().warm(FakeConnection(timeslots, appointments), start=DAY, days=30)
+
+
+def test_booked_slots_are_excluded(index):
+    times = index.available_times(1, '2030-03-04')
+    assert '10:00:00' not in times
+    assert times[0] == '8:00:00' and len(times) == 9
+    assert len(index.available_times(2, '2030-03-04')) == 10
+
+def test_unknown_hospital_and_days_without_slots_are_empty(index):
+    assert index.available_times(99, '2030-03-04') == []
+    assert index.available_times(1, '2030-03-20') == []
+
+def test_outside_window_is_not_answered(index):
+    assert index.available_times(1, '2030-02-01') is None
+    assert index.available_times(1, '2031-01-01') is None
+    assert AvailabilityIndex().available_times(1, '2030-03-04') is None
+
+def test_incremental_updates(index):
+    index.mark_booked(1, '2030-03-06 17:00:00')
+    assert '17:00:00' not in index.available_times(1, '2030-03-06')
+    index.mark_free(1, datetime(2030, 3, 4, 10))
+    assert '10:00:00' in index.available_times(1, '2030-03-04')
+
+def test_masks_are_sixteen_bit_and_footprint_reported(index):
+    stats = index.stats()
+    assert stats["mask_bits"] == 16
+    assert stats["hospitals"] == 2
+    # Two 16-bit masks per hospital-day
+    assert index.memory_footprint()["bitmaps"] == 2 * 2 * 30 * 2
+
+def test_range_lookup_answers_from_index(index, monkeypatch):
+    import models.appointment as appointment_module
+    from models.appointment import Appointment
+    monkeypatch.setattr(appointment_module, 'availability_index', index)
+
+    counts = Appointment.get_availability_range([1, 2], DAY, DAY + timedelta(days=6), counts_only=True)
+    assert counts[1] == {'2030-03-04': 9, '2030-03-05': 10, '2030-03-06': 10}
+    assert counts[2]['2030-03-05'] == 9
+
+    times = Appointment.get_availability_range([1], DAY, DAY)
+    assert times[1]['2030-03-04'][0] == '8:00:00'
+
+def test_earliest_free_merges_hospitals_in_time_order(index):
+    slots = index.earliest_free(datetime(2030, 3, 4, 16, 30), 5)
+    assert [(when.strftime('%d %H'), hospital_id) for when, hospital_id in slots] == [
+        ('04 17', 1), ('04 17', 2), ('05 08', 1), ('05 09', 1), ('05 09', 2)]
+
+    only_second = index.earliest_free(datetime(2030, 3, 4, 16, 30), 2, hospital_ids=[2])
+    assert [when.hour for when, _ in only_second] == [17, 9]
+
+def test_earliest_free_defers_to_sql_beyond_window(index):
+    assert index.earliest_free(datetime(2030, 3, 1), 5) is None
+    # Only 3 days of slots are loaded into the 30-day window; asking past it can't be answered
+    assert index.earliest_free(datetime(2030, 3, 4), 500, until=date(2031, 1, 1)) is None
+
+def test_day_lookup_rereads_bookings_from_other_workers(db, make_user, make_hospital, make_slots,
+                                                        make_appointment, monkeypatch):
+    import models.appointment as appointment_module
+    from models.appointment import Appointment
+    hospital_id = make_hospital()
+    user_id = make_user()['user_id']
+    make_slots(hospital_id, DAY, ('09:00:00', '10:00:00', '11:00:00'))
+    later = make_appointment(user_id, hospital_id, datetime(2030, 3, 4, 11))
+    index = AvailabilityIndex().warm(db, start=DAY, days=30)
+    monkeypatch.setattr(appointment_module, 'availability_index', index)
+
+    # Another worker books 9:00 and cancels 11:00; this process's bitmaps never hear of it
+    make_appointment(user_id, hospital_id, datetime(2030, 3, 4, 9))
+    cursor = db.cursor()
+    cursor.execute("UPDATE Appointments SET status = 'Cancelled' WHERE appointment_id = %s", (later,))
+    cursor.close()
+
+    assert index.available_times(hospital_id, DAY) == ['9:00:00', '10:00:00']
+    times = Appointment.get_available_times(DAY.isoformat(), hospital_id)
+    assert [slot['timeslot_time'] for slot in times] == ['10:00:00', '11:00:00']
@@ -0,0 +1,104 @@
+import pytest
+import sys, os
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from flask import Flask
+
+import bloom
+import database
+from bloom import BloomFilter, EmailFilter
+from models.user import User
+
+
+class FakeCursor:
+    def __init__(self, users):
+        self.users = users
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        if 'COUNT(*)' in sql:
+            self.rows = [(len(self.users), max((u for u, _ in self.users), default=0))]
+        elif 'user_id <=' in sql:
+            self.rows = [(email,) for user_id, email in self.users if user_id <= params[0]]
+        else:
+            self.rows = [(user_id, email) for user_id, email in self.users if user_id > params[0]]
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, users):
+        self.users = users
+
+    def cursor(self):
+        return FakeCursor(self.users)
+
+    def close(self):
+        pass
+
+
+def test_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(10000, error_rate=0.01)
+    for n in range(10000):
+        bloom.add(f"user{n}@example.com")
+    assert all(f"user{n}@example.com" in bloom for n in range(10000))
+    false_positives = sum(f"stranger{n}@example.com" in bloom for n in range(10000))
+    assert false_positives < 200
+
+def test_email_filter_is_case_insensitive_and_catches_up():
+    users = [(1, 'Alice@Example.com'), (2, 'bob@example.com')]
+    connection = FakeConnection(users)
+    emails = EmailFilter(catchup_interval=0).load(connection)
+    assert emails.might_contain('alice@example.com ')
+    assert not emails.might_contain('carol@example.com')
+
+    # Signed up through another worker process
+    users.append((3, 'carol@example.com'))
+    assert emails.catch_up(connection) == 1
+    assert emails.might_contain('carol@example.com')
+    assert emails.watermark == 3
+
+def test_full_filter_is_rebuilt_larger():
+    users = [(n, f"user{n}@example.com") for n in range(1, 11)]
+    connection = FakeConnection(users)
+    emails = EmailFilter().load(connection)
+    capacity = emails.stats()["capacity"]
+    users.extend((n, f"user{n}@example.com") for n in range(11, capacity + 20))
+    emails.catch_up(connection)
+    assert emails.stats()["capacity"] > capacity
+    assert emails.might_contain(f"user{capacity + 10}@example.com")
+
+def test_filter_is_loaded_in_the_background_not_by_signups(monkeypatch):
+    email_filter = EmailFilter()
+    monkeypatch.setattr(bloom, 'email_filter', email_filter)
+    monkeypatch.setattr('models.user.email_filter', email_filter)
+    monkeypatch.setattr(database, 'create_connection', lambda **options: FakeConnection([(1, 'a@example.com')]))
+    app = Flask(__name__)
+    app.config['EMAIL_FILTER_ENABLED'] = True
+
+    started = []
+    with monkeypatch.context() as patch:
+        patch.setattr(email_filter, 'warm_in_background', lambda: started.append(True))
+        bloom.init_app(app)
+        assert started == [True]
+        # A signup before the load finishes asks Users instead of loading the filter itself
+        assert User.may_exist('b@example.com') and not email_filter.ready
+        assert started == [True, True]
+
+    email_filter.warm_in_background().join()
+    assert email_filter.ready and email_filter.might_contain('A@example.com')
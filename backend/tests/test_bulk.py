@@ -0,0 +1,126 @@
+import pytest
+import sys, os
+from datetime import date, timedelta
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+import bulk
+import database
+from scripts import load_seeds
+from scripts.load_seeds import HOSPITAL_COLUMNS, LATITUDES, LONGITUDES, hospital_rows, timeslot_rows
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, params=None):
+        self.connection.statements.append(sql)
+        if params and sql.startswith('LOAD DATA'):
+            with open(params[0]) as f:
+                self.connection.files.append(f.read())
+
+    def executemany(self, sql, rows):
+        self.connection.batches.append(list(rows))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements, self.batches, self.files = [], [], []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_insert_rows_streams_in_chunks():
+    connection = FakeConnection()
+    stats = bulk.insert_rows(connection, 'Timeslots', ('a', 'b'), ((n, n) for n in range(25)), chunk_size=10)
+    assert [len(batch) for batch in connection.batches] == [10, 10, 5]
+    assert stats.rows == 25 and connection.commits == 3
+
+def test_load_infile_writes_escaped_csv():
+    connection = FakeConnection()
+    rows = [(1, 'Main St, Springfield', None), (2, 'back\\slash "quoted"', timedelta(hours=8))]
+    stats = bulk.load_infile(connection, 'Hospitals', ('a', 'b', 'c'), rows, chunk_size=1)
+    assert stats.rows == 2 and len(connection.files) == 2
+    assert connection.files[0] == '1,"Main St, Springfield",\\N\n'
+    assert connection.files[1] == '2,"back\\\\slash ""quoted""",08:00:00\n'
+
+def test_bulk_session_restores_checks():
+    connection = FakeConnection()
+    with bulk.bulk_session(connection, ['Timeslots']):
+        pass
+    assert connection.statements[-3:] == ["ALTER TABLE `Timeslots` ENABLE KEYS",
+                                          "SET SESSION unique_checks = 1", "SET SESSION foreign_key_checks = 1"]
+
+def test_ignoring_duplicates_keeps_unique_checks_on():
+    connection = FakeConnection()
+    with bulk.bulk_session(connection, ['Timeslots'], unique_checks=True):
+        bulk.load(connection, 'Timeslots', ('a',), [(1,)], ignore=True)
+        bulk.load(connection, 'Timeslots', ('a',), [(1,)], method='infile', ignore=True)
+    assert not any('unique_checks' in statement for statement in connection.statements)
+    assert connection.statements[-3].startswith("LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE `Timeslots`")
+
+def test_timeslot_rows_cover_weekdays_only():
+    monday = date(2030, 3, 4)
+    rows = list(timeslot_rows([1, 2], monday, monday + timedelta(days=7)))
+    assert len(rows) == 2 * 5 * 10
+    assert rows[0] == (1, '08:00:00', '2030-03-04') and rows[-1] == (2, '17:00:00', '2030-03-08')
+
+def test_seed_hospitals_have_stable_coordinates():
+    rows = list(hospital_rows(50))
+    assert len(rows) == 52 and all(len(row) == len(HOSPITAL_COLUMNS) for row in rows)
+    assert rows == list(hospital_rows(50))
+    assert all(LATITUDES[0] <= lat <= LATITUDES[1] and LONGITUDES[0] <= lng <= LONGITUDES[1]
+               for _, _, _, lat, lng in rows[2:])
+    assert len({(lat, lng) for _, _, _, lat, lng in rows}) == 52
+
+
+def _count(connection, table):
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    count = cursor.fetchone()[0]
+    cursor.close()
+    return count
+
+SEED_ARGS = ['--hospitals', '3', '--years', '1', '--start', '2030-03-04', '--schedules']
+
+@pytest.fixture
+def seed(db, monkeypatch):
+    monkeypatch.setattr(load_seeds, 'create_connection', lambda **options: db)
+    return lambda *args: load_seeds.main(SEED_ARGS + list(args))
+
+def test_seeding_twice_adds_nothing_the_first_run_loaded(db, seed):
+    seed()
+    counts = {table: _count(db, table) for table in ('Hospitals', 'Timeslots', 'Hospital_Schedules')}
+    assert counts['Hospitals'] == 5 and counts['Timeslots'] == 5 * 261 * 10
+    seed()
+    assert {table: _count(db, table) for table in counts} == counts
+
+def test_truncate_keeps_appointments_unless_asked(db, seed, make_user, make_hospital, make_appointment):
+    make_appointment(make_user()['user_id'], make_hospital(), '2030-03-04 09:00:00')
+    with pytest.raises(SystemExit):
+        seed('--truncate')
+    assert _count(db, 'Appointments') == 1 and _count(db, 'Hospitals') == 1
+
+    seed('--truncate', '--truncate-appointments')
+    assert _count(db, 'Appointments') == 0 and _count(db, 'Hospitals') == 5
+
+def test_truncate_only_skips_missing_tables(db, monkeypatch, make_hospital, make_slots):
+    monkeypatch.setattr(load_seeds, 'TRUNCATE_ORDER', ['Not_A_Table', 'Timeslots'])
+    load_seeds.truncate(db)  # Skipped, like the schedule tables before migration 0008
+
+    # Outside bulk_session foreign keys are enforced, and that failure must not be swallowed
+    make_slots(make_hospital(), '2030-03-04')
+    monkeypatch.setattr(load_seeds, 'TRUNCATE_ORDER', ['Hospitals'])
+    with pytest.raises(Exception, match='FOREIGN KEY'):
+        load_seeds.truncate(db)
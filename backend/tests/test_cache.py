@@ -0,0 +1,142 @@
+import pytest
+import sys, os
+import time
+import pickle
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from cache import Cache, MemoryBackend, FileBackend
+
+
+def counting(cache, **options):
+    calls = []
+
+    @cache.cached(**options)
+    def lookup(user_id):
+        calls.append(user_id)
+        return {"user_id": user_id, "calls": len(calls)}
+    return lookup, calls
+
+
+def test_read_through_and_tag_invalidation():
+    cache = Cache(MemoryBackend())
+    lookup, calls = counting(cache, ttl=60, tags=lambda user_id: [f"user:{user_id}"])
+
+    assert lookup(1) == lookup(1)
+    lookup(2)
+    assert calls == [1, 2]
+
+    cache.invalidate("user:1")
+    lookup(1)
+    lookup(2)
+    assert calls == [1, 2, 1]
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 3 and stats["invalidations"] == 1
+
+def test_cached_values_are_copies():
+    cache = Cache(MemoryBackend())
+    lookup, _ = counting(cache, ttl=60)
+    lookup(1)["user_id"] = 'changed'
+    assert lookup(1)["user_id"] == 1
+
+def test_ttl_expiry():
+    cache = Cache(MemoryBackend())
+    lookup, calls = counting(cache, ttl=0.01)
+    lookup(1)
+    time.sleep(0.02)
+    lookup(1)
+    assert calls == [1, 1]
+    assert cache.stats()["expirations"] == 1
+
+def test_lru_eviction():
+    cache = Cache(MemoryBackend(max_entries=2))
+    lookup, calls = counting(cache, ttl=60)
+    lookup(1)
+    lookup(2)
+    lookup(1)   # 2 is now least recently used
+    lookup(3)
+    lookup(1)
+    lookup(2)
+    assert calls == [1, 2, 3, 2]
+    assert cache.stats()["evictions"] == 2
+
+def test_invalidation_during_compute_is_not_cached():
+    cache = Cache(MemoryBackend())
+    calls = []
+
+    @cache.cached(ttl=60, tags=lambda user_id: [f"user:{user_id}"])
+    def lookup(user_id):
+        calls.append(user_id)
+        if len(calls) == 1:
+            # A write commits while the first read is still running
+            cache.invalidate(f"user:{user_id}")
+        return len(calls)
+
+    assert lookup(1) == 1
+    assert lookup(1) == 2
+    assert lookup(1) == 2
+
+def test_none_results_are_not_cached():
+    cache = Cache(MemoryBackend())
+    calls = []
+
+    @cache.cached(ttl=60)
+    def failing():
+        calls.append(1)
+        return None
+
+    failing()
+    failing()
+    assert len(calls) == 2
+
+def test_file_backend_invalidation_is_seen_by_other_processes(tmp_path):
+    # Two backends on one directory stand in for two worker processes
+    worker_a = Cache(FileBackend(str(tmp_path)))
+    worker_b = Cache(FileBackend(str(tmp_path)))
+    lookup_a, calls_a = counting(worker_a, ttl=60, tags=lambda user_id: [f"user:{user_id}"])
+    lookup_b, calls_b = counting(worker_b, ttl=60, tags=lambda user_id: [f"user:{user_id}"])
+
+    lookup_a(1)
+    lookup_b(1)
+    assert calls_b == []  # Served from the entry worker A wrote
+
+    worker_b.invalidate("user:1")
+    lookup_a(1)
+    assert calls_a == [1, 1]
+
+def test_file_backend_prunes_least_recently_used(tmp_path):
+    backend = FileBackend(str(tmp_path), max_entries=3, prune_every=1)
+    for n in range(5):
+        backend.set(f"key{n}", n, 60, {})
+    assert backend.size() == 3
+
+def test_file_backend_round_trips_row_types_as_json(tmp_path):
+    backend = FileBackend(str(tmp_path / 'cache'))
+    row = {"appointment_time": datetime(2030, 1, 2, 9, 30), "diagnosed_date": date(2019, 5, 2),
+           "timeslot_time": timedelta(hours=9), "latitude": Decimal('40.7128'), "notes": None}
+    backend.set("key", [row], 60, {"user:1": ''})
+    assert backend.get("key") == (True, [row])
+    with open(backend._entry_path("key")) as entry:
+        assert entry.read().startswith('["key", [{"appointment_time": {"$datetime": "2030-01-02T09:30:00"}')
+
+def test_file_backend_never_unpickles(tmp_path):
+    backend = FileBackend(str(tmp_path / 'cache'))
+    with open(backend._entry_path("key"), 'wb') as entry:
+        entry.write(pickle.dumps(("key", "planted", time.time() + 60, {})))
+    assert backend.get("key") == (False, None)
+
+def test_file_backend_directory_is_private(tmp_path):
+    with pytest.raises(ValueError):
+        FileBackend('')
+    FileBackend(str(tmp_path / 'new'))
+    assert os.stat(tmp_path / 'new').st_mode & 0o777 == 0o700
+
+    shared = tmp_path / 'shared'
+    shared.mkdir(mode=0o777)
+    os.chmod(shared, 0o777)
+    FileBackend(str(shared))
+    assert os.stat(shared).st_mode & 0o777 == 0o700
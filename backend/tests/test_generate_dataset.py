@@ -0,0 +1,54 @@
+import sys, os
+from collections import Counter
+from datetime import date
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from werkzeug.security import check_password_hash
+from scripts.generate_dataset import DatasetGenerator, LOADTEST_PASSWORD, password_hash, write_csv_tables
+
+ANCHOR = date(2030, 1, 1)
+
+
+def generator(**options):
+    return DatasetGenerator(500, 5000, range(1, 21), anchor=ANCHOR, **options)
+
+
+def test_output_is_deterministic():
+    first = [list(rows) for _, _, rows in generator().tables()]
+    second = [list(rows) for _, _, rows in generator().tables()]
+    assert first == second
+    assert first != [list(rows) for _, _, rows in generator(seed=7).tables()]
+
+def test_foreign_keys_line_up():
+    tables = {table: list(rows) for table, _, rows in generator(first_user_id=1001, first_history_id=51).tables()}
+    user_ids = {row[0] for row in tables['Users']}
+    history_ids = {row[0] for row in tables['Medical_History']}
+    assert {row[1] for row in tables['Medical_History']} <= user_ids
+    assert {row[0] for row in tables['Conditions']} <= history_ids
+    assert {row[0] for row in tables['Medications']} <= history_ids
+    assert {row[0] for row in tables['Appointments']} <= user_ids
+    assert min(history_ids) == 51
+
+def test_scheduled_slots_are_never_double_booked():
+    appointments = list(generator().appointments_rows())
+    assert len(appointments) == 5000
+    scheduled = [row for row in appointments if row[3] == 'Scheduled']
+    assert scheduled and all(row[1] > '2030-01-01' for row in scheduled)
+    assert len({(row[2], row[1]) for row in scheduled}) == len(scheduled)
+    assert len({(row[0], row[1]) for row in scheduled}) == len(scheduled)
+
+def test_activity_is_skewed():
+    per_hospital = Counter(row[2] for row in generator().appointments_rows())
+    assert per_hospital[1] > 5 * per_hospital[20]
+
+def test_password_hash_verifies():
+    assert check_password_hash(password_hash(42), LOADTEST_PASSWORD)
+
+def test_csv_output_has_manifest(tmp_path):
+    results = write_csv_tables(generator(), tmp_path)
+    assert {stats.table for stats in results} == {'Users', 'Medical_History', 'Conditions', 'Medications', 'Appointments'}
+    assert (tmp_path / 'manifest.json').exists()
+    assert sum(1 for _ in open(tmp_path / 'Users.csv')) == 500
@@ -0,0 +1,124 @@
+import pytest
+import sys, os
+import math
+import random
+from datetime import datetime
+from decimal import Decimal
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+import database
+import geo
+from geo import GeoIndex, EARTH_RADIUS_KM
+from scripts.load_seeds import backfill_coordinates, hospital_coordinates
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.connection.queries += 1
+        if 'COUNT(*)' in sql:
+            self.rows = [{"hospitals": len(self.connection.hospitals), "changed": self.connection.changed}]
+        else:
+            self.rows = [dict(row) for row in self.connection.hospitals if row['latitude'] is not None]
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, hospitals):
+        self.hospitals = hospitals
+        self.changed = datetime(2030, 1, 1)
+        self.queries = 0
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def hospitals():
+    rng = random.Random(7)
+    rows = [{"hospital_id": n, "name": f"Hospital {n}", "address": "", "phone_number": None,
+             "latitude": Decimal(f"{rng.uniform(-80, 80):.6f}"), "longitude": Decimal(f"{rng.uniform(-180, 180):.6f}")}
+            for n in range(2000)]
+    rows.append({"hospital_id": 9999, "name": "Not geocoded", "address": "", "phone_number": None,
+                 "latitude": None, "longitude": None})
+    return rows
+
+
+@pytest.fixture
+def index(hospitals):
+    return GeoIndex().load(FakeConnection(hospitals))
+
+
+def brute_force(hospitals, lat, lng, k, accept=lambda h: True):
+    located = [h for h in hospitals if h['latitude'] is not None and accept(h['hospital_id'])]
+    located.sort(key=lambda h: haversine_km(lat, lng, float(h['latitude']), float(h['longitude'])))
+    return [h['hospital_id'] for h in located[:k]]
+
+
+def test_matches_brute_force(index, hospitals):
+    rng = random.Random(1)
+    for _ in range(50):
+        lat, lng = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        found = index.nearest(lat, lng, 5)
+        assert [h['hospital_id'] for h in found] == brute_force(hospitals, lat, lng, 5)
+        distances = [h['distance_km'] for h in found]
+        assert distances == sorted(distances)
+
+def test_distance_is_great_circle(index):
+    nearest = index.nearest(10, 20, 1)[0]
+    assert nearest['distance_km'] == pytest.approx(
+        haversine_km(10, 20, nearest['latitude'], nearest['longitude']), abs=0.01)
+
+def test_wraps_across_the_antimeridian():
+    rows = [{"hospital_id": 1, "latitude": 0, "longitude": 179.9},
+            {"hospital_id": 2, "latitude": 0, "longitude": 175}]
+    index = GeoIndex().load(FakeConnection(rows))
+    assert [h['hospital_id'] for h in index.nearest(0, -179.9, 2)] == [1, 2]
+
+def test_filter_and_radius(index, hospitals):
+    even = lambda hospital_id: hospital_id % 2 == 0
+    found = index.nearest(45, 7, 4, accept=even)
+    assert [h['hospital_id'] for h in found] == brute_force(hospitals, 45, 7, 4, even)
+    assert all(h['distance_km'] <= 500 for h in index.nearest(45, 7, 50, max_km=500))
+    assert index.nearest(45, 7, 3, accept=lambda hospital_id: False) == []
+
+def test_unchanged_table_is_not_reloaded(hospitals):
+    connection = FakeConnection(hospitals)
+    index = GeoIndex().load(connection)
+    index.load(connection, force=False)
+    assert index.builds == 1
+    connection.changed = datetime(2030, 1, 2)
+    index.load(connection, force=False)
+    assert index.builds == 2
+    assert index.stats()["hospitals"] == 2000
+
+def test_seeded_hospitals_without_coordinates_are_backfilled(client, make_hospital):
+    hospital_id = make_hospital('Downtown Clinic')
+    lat, lng = hospital_coordinates('Downtown Clinic')
+    url = f"/api/appointments/hospitals/nearby?lat={lat}&lng={lng}&k=1"
+    assert client.get(url).json == []
+
+    assert backfill_coordinates(database.get_db_connection()) == 1
+    geo.geo_index.ready = False
+    [nearest] = client.get(url).json
+    assert nearest['hospital_id'] == hospital_id and nearest['distance_km'] < 0.01
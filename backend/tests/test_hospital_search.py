@@ -0,0 +1,133 @@
+import pytest
+import sys, os
+from datetime import datetime
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from hospital_search import HospitalSearchIndex, encode_cursor, decode_cursor
+
+LOADED = datetime(2030, 1, 1, 12, 0, 0)
+
+
+def hospital(hospital_id, name, address, updated_at=LOADED):
+    return {"hospital_id": hospital_id, "name": name, "address": address,
+            "phone_number": None, "updated_at": updated_at}
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.connection.queries.append(sql)
+        rows = self.connection.hospitals
+        if 'COUNT(*)' in sql:
+            self.rows = [{"hospitals": len(rows), "id_sum": sum(row['hospital_id'] for row in rows)}]
+        elif params:
+            self.rows = [row for row in rows if row['updated_at'] >= params[0]]
+        else:
+            self.rows = list(rows)
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, hospitals):
+        self.hospitals = hospitals
+        self.queries = []
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def hospitals():
+    return [
+        hospital(1, 'Downtown Clinic', '123 Main Street, Springfield'),
+        hospital(2, 'Uptown Clinic', '456 Main Street, Springfield'),
+        hospital(3, 'Springfield General Hospital', '1 Elm Road, Shelbyville'),
+        hospital(4, 'Saint Mary’s Médical Center', '9 Oak Avenue, Capital City'),
+    ] + [hospital(100 + n, f'Clinic {n:03d}', f'{n} Long Road, Ogdenville') for n in range(300)]
+
+
+@pytest.fixture
+def index(hospitals):
+    return HospitalSearchIndex().load(FakeConnection(hospitals))
+
+
+def names(rows):
+    return [row['name'] for row in rows]
+
+
+def test_prefix_typeahead_matches_word_starts(index):
+    rows, _ = index.search('spr', 10)
+    assert names(rows) == ['Downtown Clinic', 'Springfield General Hospital', 'Uptown Clinic']
+    rows, _ = index.search('main clin', 10)
+    assert names(rows) == ['Downtown Clinic', 'Uptown Clinic']
+    assert index.search('medic', 10)[0][0]['hospital_id'] == 4  # Accents are folded
+    assert index.search('springfieldz', 10) == ([], None)
+
+def test_substring_match_uses_trigrams(index):
+    assert index.search('town', 10)[0] == []
+    rows, _ = index.search('town', 10, substring=True)
+    assert names(rows) == ['Downtown Clinic', 'Uptown Clinic']
+
+def test_keyset_pagination_walks_every_match_once(index):
+    seen, after = [], None
+    while True:
+        rows, after = index.search('clinic', 40, after)
+        seen.extend(row['hospital_id'] for row in rows)
+        if after is None:
+            break
+        after = decode_cursor(encode_cursor(after))
+    assert len(seen) == len(set(seen)) == 302
+    assert seen[:3] == [100, 101, 102]
+
+def test_empty_query_pages_through_all_hospitals(index):
+    rows, after = index.search('', 2)
+    assert names(rows) == ['Clinic 000', 'Clinic 001']
+    rows, _ = index.search('', 2, after)
+    assert names(rows) == ['Clinic 002', 'Clinic 003']
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+def test_incremental_refresh_applies_changed_rows(hospitals):
+    connection = FakeConnection(hospitals)
+    index = HospitalSearchIndex().load(connection)
+    hospitals[0] = hospital(1, 'Riverside Clinic', '123 Main Street, Springfield', datetime(2030, 1, 1, 12, 5))
+
+    assert index.refresh(connection) == 1
+    assert index.full_loads == 1
+    assert names(index.search('river', 10)[0]) == ['Riverside Clinic']
+    assert index.search('downtown', 10)[0] == []
+    assert index.watermark == datetime(2030, 1, 1, 12, 5)
+
+def test_deleted_hospital_forces_full_reload(hospitals):
+    connection = FakeConnection(hospitals)
+    index = HospitalSearchIndex().load(connection)
+    del hospitals[2]
+    index.refresh(connection)
+    assert index.full_loads == 2
+    assert index.search('general', 10)[0] == []
+
+def test_delete_and_insert_in_one_window_forces_full_reload(hospitals):
+    connection = FakeConnection(hospitals)
+    index = HospitalSearchIndex().load(connection)
+    del hospitals[2]
+    hospitals.append(hospital(500, 'Ogdenville Hospital', '5 Pine Road, Ogdenville'))  # Same row count
+    index.refresh(connection)
+    assert index.full_loads == 2
+    assert index.search('general', 10)[0] == []
+    assert names(index.search('ogdenville hosp', 10)[0]) == ['Ogdenville Hospital']
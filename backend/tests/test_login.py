@@ -7,63 +7,15 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
 
 
-from app import create_app  # Import the app factory function
-from database import get_db_connection  # Import the database connection function
-
-@pytest.fixture
-def client():
-    app = create_app()  # Create an app instance
-    app.config['TESTING'] = True
-    client = app.test_client()
-
-    # Initialize database connection
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-
-    # Disable foreign key checks to allow deletion during setup
-    cursor.execute("SET FOREIGN_KEY_CHECKS=0")
-
-    # Backup existing data from both Users and Appointments
-    cursor.execute("SELECT * FROM Users")
-    backup_users = cursor.fetchall()
-
-    cursor.execute("SELECT * FROM Appointments")
-    backup_appointments = cursor.fetchall()
-
-    # Clean both tables for the tests
-    cursor.execute("DELETE FROM Appointments")
-    cursor.execute("DELETE FROM Users")
-    connection.commit()
-
-    # Enable foreign key checks after cleanup
-    cursor.execute("SET FOREIGN_KEY_CHECKS=1")
-
-    yield client  # Provide the client to the test
+from flask import g
+from werkzeug.security import generate_password_hash
 
-    cursor.execute("SET FOREIGN_KEY_CHECKS=0")
-    cursor.execute("DELETE FROM Appointments")
-    cursor.execute("DELETE FROM Users")
-    connection.commit()
-
-    cursor.execute("SET FOREIGN_KEY_CHECKS=1")
-    # Restore original data in Users table
-    for user in backup_users:
-        cursor.execute(
-            "INSERT INTO Users (user_id, email, password_hash, created_at, updated_at) VALUES (%s, %s, %s, %s, %s)",
-            (user['user_id'], user['email'], user['password_hash'], user['created_at'], user['updated_at'])
-        )
-
-    # Restore original data in Appointments table
-    for appointment in backup_appointments:
-        cursor.execute(
-            "INSERT INTO Appointments (appointment_id, user_id, date, details) VALUES (%s, %s, %s, %s)",
-            (appointment['appointment_id'], appointment['user_id'], appointment['date'], appointment['details'])
-        )
-
-    connection.commit()
-
-    cursor.close()
-    connection.close()
+import passwords
+from config import Config
+from bloom import email_filter
+from database import get_db_connection  # Import the database connection function
+from models.user import User
+from passwords import full_method
 
 def test_database_connection(client):
     try:
@@ -125,3 +77,75 @@ def test_login_invalid_credentials(client):
     
     assert response.status_code == 401
     assert b'Invalid credentials' in response.data
+
+def test_login_does_not_hold_a_connection_while_hashing(client, make_user, monkeypatch):
+    user = make_user()
+    verify = passwords.hasher.verify
+    held = []
+
+    def watched_verify(password_hash, password):
+        held.append(g.get('_db_unit_of_work') is not None)
+        return verify(password_hash, password)
+
+    monkeypatch.setattr(passwords.hasher, 'verify', watched_verify)
+    response = client.post('/api/auth/login', json={'email': user['email'], 'password': user['password']})
+    assert response.status_code == 200
+    assert held == [False]
+
+def test_login_upgrades_outdated_hash(client, make_user):
+    user = make_user()
+    cursor = get_db_connection().cursor()
+    cursor.execute("UPDATE Users SET password_hash = %s WHERE user_id = %s",
+                   (generate_password_hash(user['password'], 'pbkdf2:sha256:1000'), user['user_id']))
+    cursor.close()
+
+    response = client.post('/api/auth/login', json={'email': user['email'], 'password': user['password']})
+    assert response.status_code == 200
+    stored = User.get_user_by_email(user['email'])['password_hash']
+    assert stored.split('$', 1)[0] == full_method(Config.PASSWORD_HASH_METHOD)
+
+def _insert_user(user_id, email, password='password'):
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    cursor.execute("INSERT INTO Users (user_id, email, password_hash) VALUES (%s, %s, %s)",
+                   (user_id, email, generate_password_hash(password, 'pbkdf2:sha256:1000')))
+    connection.commit()
+    cursor.close()
+
+def test_login_finds_users_committed_out_of_id_order(client, db):
+    # B took id 1000002 and committed first; the filter's watermark moved past A's id before A committed
+    _insert_user(1000002, 'b@example.com')
+    email_filter.load(db)
+    assert email_filter.watermark == 1000002
+    _insert_user(1000001, 'a@example.com')
+    email_filter.catch_up(db)
+    assert not email_filter.might_contain('a@example.com')
+
+    response = client.post('/api/auth/login', json={'email': 'a@example.com', 'password': 'password'})
+    assert response.status_code == 200
+
+def test_signup_of_a_missed_email_is_still_rejected(client, db):
+    _insert_user(1000002, 'b@example.com')
+    email_filter.load(db)
+    _insert_user(1000001, 'a@example.com')
+    response = client.post('/api/auth/signup', json={'email': 'a@example.com', 'password': 'securepassword'})
+    assert response.status_code == 400
+    assert b'User already exists' in response.data
+
+def test_signup_of_a_known_email_skips_hashing(client, db, make_user, monkeypatch):
+    user = make_user()
+    email_filter.catch_up(db)  # Created after the startup load, like a user from another worker
+    hashes = []
+    monkeypatch.setattr(passwords.hasher, 'hash', lambda password: hashes.append(password))
+    response = client.post('/api/auth/signup', json={'email': user['email'], 'password': 'securepassword'})
+    assert response.status_code == 400
+    assert hashes == []
+
+def test_signup_rejects_an_email_differing_only_in_case(client):
+    # Both backends compare emails case-insensitively, so the unique index catches it
+    response = client.post('/api/auth/signup', json={'email': 'Case@Example.com', 'password': 'securepassword'})
+    assert response.status_code == 201
+    response = client.post('/api/auth/signup', json={'email': 'case@example.COM', 'password': 'securepassword'})
+    assert response.status_code == 400
+    assert b'User already exists' in response.data
+    assert User.get_user_by_email('CASE@EXAMPLE.COM')['user_id'] == User.get_user_by_email('Case@Example.com')['user_id']
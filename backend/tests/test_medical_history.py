@@ -0,0 +1,120 @@
+import pytest
+import sys, os
+from datetime import date
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from cache import cache
+from database import get_db_connection
+import models.medical
+
+
+@pytest.fixture
+def patient(db, make_user):
+    """A user with a history report, two conditions and one medication."""
+    user = make_user()
+    cursor = db.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO Medical_History (user_id, doctor_notes, lab_results, report_date)
+            VALUES (%s, %s, %s, %s)
+        """, (user['user_id'], 'Recovering well', 'Cholesterol normal', date(2026, 9, 1)))
+        history_id = cursor.lastrowid
+        cursor.executemany("""
+            INSERT INTO Conditions (history_id, condition_name, condition_description, diagnosed_date)
+            VALUES (%s, %s, %s, %s)
+        """, [(history_id, 'Asthma', 'Mild', date(2019, 5, 2)), (history_id, 'Fracture', 'Left wrist', date(2025, 3, 14))])
+        cursor.execute("""
+            INSERT INTO Medications (history_id, medication_name, dosage, start_date)
+            VALUES (%s, %s, %s, %s)
+        """, (history_id, 'Salbutamol', '100mcg', date(2019, 5, 2)))
+        db.commit()
+    finally:
+        cursor.close()
+    return user
+
+
+def test_summary_returns_every_section(client, patient):
+    response = client.get(f"/api/medical_history/summary?user_id={patient['user_id']}")
+    assert response.status_code == 200
+    summary = response.json
+    assert set(summary) == {'conditions', 'medications', 'history'}
+    assert [condition['condition_name'] for condition in summary['conditions']] == ['Fracture', 'Asthma']
+    assert [medication['medication_name'] for medication in summary['medications']] == ['Salbutamol']
+    assert [(report['doctor_notes'], report['lab_results']) for report in summary['history']] == \
+        [('Recovering well', 'Cholesterol normal')]
+
+def test_summary_matches_the_per_section_endpoints(client, patient):
+    summary = client.get(f"/api/medical_history/summary?user_id={patient['user_id']}").json
+    assert summary['conditions'] == client.get(f"/api/medical_history/conditions?user_id={patient['user_id']}").json
+    assert summary['medications'] == client.get(f"/api/medical_history/medications?user_id={patient['user_id']}").json
+    assert summary['history'] == client.get(f"/api/medical_history/?user_id={patient['user_id']}").json
+
+def test_fields_select_sections(client, patient):
+    response = client.get(f"/api/medical_history/summary?user_id={patient['user_id']}&fields=medications, conditions")
+    assert response.status_code == 200
+    assert set(response.json) == {'conditions', 'medications'}
+
+def test_unknown_fields_are_rejected(client, patient):
+    response = client.get(f"/api/medical_history/summary?user_id={patient['user_id']}&fields=conditions,x-rays")
+    assert response.status_code == 400
+    assert response.json == {"error": "Unknown fields: x-rays"}
+
+def test_user_without_history_gets_empty_sections(client, make_user):
+    user = make_user()
+    response = client.get(f"/api/medical_history/summary?user_id={user['user_id']}")
+    assert response.status_code == 200
+    assert response.json == {'conditions': [], 'medications': [], 'history': []}
+
+def test_same_sections_share_one_cache_entry(client, patient):
+    cache.backend.clear()
+    client.get(f"/api/medical_history/summary?user_id={patient['user_id']}")
+    client.get(f"/api/medical_history/summary?user_id={patient['user_id']}&fields=history,medications,conditions")
+    assert cache.backend.size() == 1
+
+
+class BrokenConnection:
+    def cursor(self, *args, **kwargs):
+        return self
+
+    def execute(self, *args, **kwargs):
+        raise RuntimeError("Lost connection to MySQL server during query")
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize('path, rows', [('appointments', 0), ('conditions', 2), ('medications', 1), ('', 1)])
+def test_failed_reads_are_errors_and_not_cached(client, patient, monkeypatch, path, rows):
+    url = f"/api/medical_history/{path}?user_id={patient['user_id']}"
+    with monkeypatch.context() as broken:
+        broken.setattr(models.medical, 'get_db_connection', BrokenConnection)
+        response = client.get(url)
+    assert response.status_code == 500 and "error" in response.json
+
+    response = client.get(url)
+    assert response.status_code == 200 and len(response.json) == rows
+
+def test_reads_of_a_rolled_back_request_are_not_cached(app, client, patient):
+    cache.backend.clear()
+
+    @app.route('/test/failing-write')
+    def failing_write():
+        cursor = get_db_connection().cursor()
+        cursor.execute("""
+            INSERT INTO Medications (history_id, medication_name, dosage, start_date)
+            SELECT history_id, 'Ibuprofen', '200mg', report_date FROM Medical_History WHERE user_id = %s
+        """, (patient['user_id'],))
+        cursor.close()
+        assert len(models.medical.MedicalRecord.get_medications(patient['user_id'])) == 2
+        return {"error": "Internal server error"}, 500
+
+    assert client.get('/test/failing-write').status_code == 500
+    assert cache.backend.size() == 0
+    response = client.get(f"/api/medical_history/medications?user_id={patient['user_id']}")
+    assert [row['medication_name'] for row in response.json] == ['Salbutamol']
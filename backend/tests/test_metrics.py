@@ -0,0 +1,122 @@
+import pytest
+import sys, os
+import threading
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from flask import Flask, jsonify
+import database
+import metrics
+from metrics import MetricsRegistry, fingerprint
+from pool import ConnectionPool
+
+
+class FakeCursor:
+    def execute(self, operation, params=None):
+        pass
+
+    def fetchall(self):
+        return [(1,), (2,)]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor()
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    monkeypatch.setattr(metrics, 'registry', registry)
+    return registry
+
+
+@pytest.fixture
+def client(registry, monkeypatch):
+    monkeypatch.setattr(database, '_pool', ConnectionPool(FakeConnection, size=1, max_overflow=0))
+    app = Flask(__name__)
+    metrics.init_app(app)
+    database.init_app(app)
+
+    @app.route('/hospitals/<int:hospital_id>')
+    def hospital(hospital_id):
+        cursor = database.get_db_connection().cursor()
+        cursor.execute("SELECT name FROM Hospitals WHERE hospital_id = %s", (hospital_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return jsonify(rows=len(rows)), 200 if hospital_id else 404
+
+    return app.test_client()
+
+
+def test_fingerprint_replaces_literals():
+    assert fingerprint("SELECT *  FROM T\n WHERE a = 5 AND b = 'x' AND c IN (%s, %s, %s) LIMIT %s") == \
+        "SELECT * FROM T WHERE a = ? AND b = ? AND c IN (?+) LIMIT ?"
+    assert fingerprint("SELECT t1.a FROM T t1") == "SELECT t1.a FROM T t1"
+
+def test_histogram_renders_cumulative_buckets(registry):
+    for seconds in (0.05, 0.5, 5):
+        registry.observe('medtrack_http_request_duration_seconds', (('route', '/x'),), seconds)
+    text = registry.render()
+    assert '# TYPE medtrack_http_request_duration_seconds histogram' in text
+    assert 'medtrack_http_request_duration_seconds_bucket{route="/x",le="0.1"} 1' in text
+    assert 'medtrack_http_request_duration_seconds_bucket{route="/x",le="1.0"} 2' in text
+    assert 'medtrack_http_request_duration_seconds_bucket{route="/x",le="+Inf"} 3' in text
+    assert 'medtrack_http_request_duration_seconds_count{route="/x"} 3' in text
+
+def test_counts_from_exited_threads_are_kept(registry):
+    def work():
+        for _ in range(100):
+            registry.inc('medtrack_db_queries_total', (('statement', 'SELECT ?'),))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    registry.inc('medtrack_db_queries_total', (('statement', 'SELECT ?'),))
+    assert registry.collect().counters[('medtrack_db_queries_total', (('statement', 'SELECT ?'),))] == 401
+    assert registry.collect().counters[('medtrack_db_queries_total', (('statement', 'SELECT ?'),))] == 401
+
+def test_label_values_are_escaped(registry):
+    registry.inc('medtrack_db_queries_total', (('statement', 'SELECT "a"\\b'),))
+    assert 'statement="SELECT \\"a\\"\\\\b"' in registry.render()
+
+def test_requests_and_queries_are_recorded(client):
+    client.get('/hospitals/3')
+    client.get('/hospitals/0')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'medtrack_http_requests_total{route="/hospitals/<int:hospital_id>",method="GET",status="200"} 1' in text
+    assert 'medtrack_http_requests_total{route="/hospitals/<int:hospital_id>",method="GET",status="404"} 1' in text
+    statement = 'statement="SELECT name FROM Hospitals WHERE hospital_id = ?"'
+    assert f'medtrack_db_queries_total{{{statement}}} 2' in text
+    assert f'medtrack_db_query_rows_total{{{statement}}} 4' in text
+    assert f'medtrack_db_query_duration_seconds_count{{{statement}}} 2' in text
+
+def test_statement_cap_groups_new_fingerprints(monkeypatch):
+    monkeypatch.setattr(metrics, '_statements', {'SELECT ?'})
+    monkeypatch.setattr(metrics.Config, 'METRICS_MAX_STATEMENTS', 1)
+    metrics.statement_label.cache_clear()
+    assert metrics.statement_label("SELECT 1") == 'SELECT ?'
+    assert metrics.statement_label("SELECT a FROM T") == 'other'
+    metrics.statement_label.cache_clear()
@@ -0,0 +1,122 @@
+import pytest
+import sys, os
+from datetime import date, timedelta
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+import database
+import migrate
+from config import Config
+from migrate import discover_migrations, split_statements, migrate_up, migrate_down
+from schedule import ScheduleBook
+
+INIT_SQL = os.path.join(os.path.dirname(Config.MIGRATIONS_DIR), 'init.sql')
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.connection.executed.append(sql)
+        if sql.startswith("INSERT INTO schema_migrations"):
+            self.connection.applied.add(params[0])
+        elif sql.startswith("DELETE FROM schema_migrations"):
+            self.connection.applied.discard(params[0])
+        elif sql.startswith("SELECT version"):
+            self.result = [(version,) for version in self.connection.applied]
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, applied=()):
+        self.applied = set(applied)
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def migrations_dir(tmp_path):
+    (tmp_path / "0001_first.up.sql").write_text("-- comment\nCREATE INDEX a ON T (x);\nCREATE INDEX b\n  ON T (y);\n")
+    (tmp_path / "0001_first.down.sql").write_text("DROP INDEX b ON T;\nDROP INDEX a ON T;\n")
+    (tmp_path / "0002_second.up.sql").write_text("ALTER TABLE T ADD COLUMN z INT;\n")
+    (tmp_path / "0002_second.down.sql").write_text("ALTER TABLE T DROP COLUMN z;\n")
+    (tmp_path / "README.md").write_text("not a migration")
+    return tmp_path
+
+
+def test_discover_orders_by_version(migrations_dir):
+    migrations = discover_migrations(str(migrations_dir))
+    assert [(m.version, m.name) for m in migrations] == [(1, "first"), (2, "second")]
+    assert all(m.down_path for m in migrations)
+
+def test_split_statements_handles_multiline_and_comments():
+    statements = split_statements("-- header\nCREATE INDEX b\n  ON T (y);\n\nSELECT 1;\n")
+    assert statements == ["CREATE INDEX b\n  ON T (y)", "SELECT 1"]
+
+def test_up_applies_only_pending(migrations_dir):
+    migrations = discover_migrations(str(migrations_dir))
+    connection = FakeConnection(applied={1})
+    applied = migrate_up(connection, migrations, verbose=False)
+    assert [m.version for m in applied] == [2]
+    assert connection.applied == {1, 2}
+    assert "ALTER TABLE T ADD COLUMN z INT" in connection.executed
+    assert "CREATE INDEX a ON T (x)" not in connection.executed
+
+def test_down_reverts_newest_first(migrations_dir):
+    migrations = discover_migrations(str(migrations_dir))
+    connection = FakeConnection(applied={1, 2})
+    reverted = migrate_down(connection, migrations, target=0, verbose=False)
+    assert [m.version for m in reverted] == [2, 1]
+    assert connection.applied == set()
+
+def test_repository_migrations_are_well_formed():
+    migrations = discover_migrations()
+    versions = [m.version for m in migrations]
+    assert versions == sorted(set(versions))
+    assert all(m.down_path for m in migrations)
+
+@pytest.mark.skipif(Config.STORAGE_BACKEND != 'mysql', reason="The migrations are MySQL SQL")
+def test_converted_schedules_end_with_the_last_timeslot(test_database):
+    # Its own schema: migrations run DDL, which would commit the test transaction
+    schema = f"{Config.DB_NAME}_migration_0008"
+    connection = database.create_connection()
+    cursor = connection.cursor()
+    first, last = date(2030, 3, 4), date(2030, 3, 15)  # Monday to the Friday a week later
+    try:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{schema}`")
+        cursor.execute(f"CREATE DATABASE `{schema}`")
+        cursor.execute(f"USE `{schema}`")
+        migrate._run_script(cursor, INIT_SQL)
+        connection.commit()
+        migrate_up(connection, discover_migrations(), target=7, verbose=False)
+
+        cursor.execute("INSERT INTO Hospitals (name, address, phone_number) VALUES ('Closing Clinic', '1 Road', '555')")
+        hospital_id = cursor.lastrowid
+        days = [first + timedelta(days=n) for n in range((last - first).days + 1)]
+        cursor.executemany("INSERT INTO Timeslots (hospital_id, timeslot_time, timeslot_date) VALUES (%s, %s, %s)",
+                           [(hospital_id, time, day) for day in days if day.weekday() < 5
+                            for time in ('09:00:00', '10:00:00')])
+        connection.commit()
+        migrate_up(connection, discover_migrations(), target=8, verbose=False)
+
+        book = ScheduleBook().load(connection)
+        assert book.slot_times(hospital_id, first) == book.slot_times(hospital_id, last) == (9 * 3600, 10 * 3600)
+        assert list(book.iter_slots(hospital_id, last + timedelta(days=1), last + timedelta(days=90))) == []
+    finally:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{schema}`")
+        cursor.close()
+        connection.close()
@@ -0,0 +1,93 @@
+import pytest
+import sys, os
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from werkzeug.security import generate_password_hash
+from passwords import PasswordHasher, HashingBusyError, full_method
+
+# Cheap parameters keep the tests fast; only the method string matters here
+FAST = 'pbkdf2:sha256:1000'
+
+
+def test_inline_hash_and_verify():
+    hasher = PasswordHasher(workers=0, max_pending=1, method=FAST)
+    password_hash = hasher.hash('secret')
+    assert password_hash.startswith(FAST + '$')
+    assert hasher.verify(password_hash, 'secret')
+    assert not hasher.verify(password_hash, 'wrong')
+    stats = hasher.stats()
+    assert stats['hashed'] == 1 and stats['verified'] == 2
+    assert stats['latency']['max_ms'] >= stats['hash_time']['p50_ms'] >= 0
+
+def test_outdated_hash_is_upgraded():
+    hasher = PasswordHasher(workers=0, max_pending=1, method=FAST)
+    old_hash = generate_password_hash('secret', 'pbkdf2:sha256:500')
+    assert hasher.needs_rehash(old_hash)
+    new_hash = hasher.rehash_if_needed(old_hash, 'secret')
+    assert new_hash.startswith(FAST + '$') and hasher.verify(new_hash, 'secret')
+    assert hasher.rehash_if_needed(new_hash, 'secret') is None
+    assert hasher.stats()['rehashed'] == 1
+
+def test_short_method_names_match_their_stored_form():
+    assert full_method('scrypt') == 'scrypt:32768:8:1'
+    assert full_method('pbkdf2') == full_method('pbkdf2:sha256') == generate_password_hash('x', 'pbkdf2').split('$')[0]
+    hasher = PasswordHasher(workers=0, max_pending=1, method='pbkdf2:sha256')
+    assert not hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2'))
+    assert hasher.needs_rehash(generate_password_hash('secret', FAST))
+    assert not PasswordHasher(workers=0, max_pending=1, method='scrypt').needs_rehash('scrypt:32768:8:1$salt$hash')
+
+def test_broken_pool_is_busy_and_replaced():
+    hasher = PasswordHasher(workers=1, max_pending=2, method=FAST, timeout=5)
+
+    class BrokenExecutor:
+        def submit(self, func, *args):
+            future = Future()
+            future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+            return future
+
+    hasher._executor, hasher._pid = BrokenExecutor(), os.getpid()
+    with pytest.raises(HashingBusyError):
+        hasher.hash('secret')
+    assert hasher._executor is None and hasher.stats()['pending'] == 0
+
+def test_full_queue_is_rejected_immediately():
+    hasher = PasswordHasher(workers=1, max_pending=2, method=FAST, timeout=5)
+    blocked = [Future(), Future()]
+    submitted = []
+
+    class StuckExecutor:
+        def submit(self, func, *args):
+            submitted.append(func)
+            return blocked[len(submitted) - 1]
+
+    hasher._get_executor = lambda: StuckExecutor()
+    waiters = [threading.Thread(target=hasher.hash, args=('secret',)) for _ in blocked]
+    for waiter in waiters:
+        waiter.start()
+    while hasher.stats()['pending'] < 2:
+        pass
+
+    with pytest.raises(HashingBusyError):
+        hasher.hash('secret')
+    assert hasher.stats()['rejected'] == 1
+
+    for future in blocked:
+        future.set_result(('hash', 0.0))
+    for waiter in waiters:
+        waiter.join()
+    assert hasher.stats()['pending'] == 0
+
+def test_process_pool_round_trip():
+    hasher = PasswordHasher(workers=1, max_pending=4, method=FAST, timeout=60)
+    try:
+        password_hash = hasher.hash('secret')
+        assert hasher.verify(password_hash, 'secret')
+        assert hasher.stats()['peak_pending'] == 1
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,122 @@
+import pytest
+import sys, os
+import threading
+import time
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    """Stands in for a mysql.connector connection."""
+
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+        self.rollbacks = 0
+
+    def ping(self):
+        if not self.alive:
+            raise ConnectionError("server has gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def is_connected(self):
+        return not self.closed and self.alive
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def created():
+    return []
+
+
+def make_pool(created, **kwargs):
+    def creator():
+        connection = FakeConnection()
+        created.append(connection)
+        return connection
+    return ConnectionPool(creator, **kwargs)
+
+
+def test_connection_is_reused(created):
+    pool = make_pool(created, size=2, max_overflow=0)
+    connection = pool.acquire()
+    connection.close()
+    connection = pool.acquire()
+    connection.close()
+
+    assert len(created) == 1
+    assert created[0].rollbacks == 2
+    stats = pool.stats()
+    assert stats["created"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["idle"] == 1 and stats["in_use"] == 0
+
+def test_close_is_idempotent(created):
+    pool = make_pool(created, size=1, max_overflow=0)
+    connection = pool.acquire()
+    connection.close()
+    connection.close()
+    assert pool.stats()["idle"] == 1
+
+def test_overflow_connections_are_closed_on_release(created):
+    pool = make_pool(created, size=1, max_overflow=1)
+    first = pool.acquire()
+    second = pool.acquire()
+    assert pool.stats()["in_use"] == 2
+
+    first.close()
+    second.close()
+    assert pool.stats()["opened"] == 1
+    assert sum(connection.closed for connection in created) == 1
+
+def test_timeout_when_exhausted(created):
+    pool = make_pool(created, size=1, max_overflow=0, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+    held.close()
+
+def test_waiter_gets_released_connection(created):
+    pool = make_pool(created, size=1, max_overflow=0, timeout=2)
+    held = pool.acquire()
+    threading.Timer(0.05, held.close).start()
+
+    connection = pool.acquire()
+    assert connection.is_connected()
+    stats = pool.stats()
+    assert stats["waits"] == 1
+    assert stats["wait_time_max"] > 0
+    connection.close()
+
+def test_dead_connection_is_replaced_on_pre_ping(created):
+    pool = make_pool(created, size=1, max_overflow=0, pre_ping=True)
+    pool.acquire().close()
+    created[0].alive = False
+
+    connection = pool.acquire()
+    assert connection.is_connected()
+    assert len(created) == 2
+    assert created[0].closed
+    assert pool.stats()["ping_failures"] == 1
+
+def test_idle_and_old_connections_are_recycled(created):
+    pool = make_pool(created, size=1, max_overflow=0, max_idle_time=0.01)
+    pool.acquire().close()
+    time.sleep(0.02)
+    pool.acquire().close()
+    assert len(created) == 2
+    assert pool.stats()["recycled"] == 1
+
+    pool = make_pool(created, size=1, max_overflow=0, recycle=0)
+    pool.acquire().close()
+    pool.acquire().close()
+    assert pool.stats()["recycled"] == 1
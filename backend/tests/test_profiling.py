@@ -0,0 +1,107 @@
+import pytest
+import sys, os
+import pstats
+import time
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from flask import Flask, jsonify
+import profiling
+from app import create_app
+from config import Config
+from profiling import ProfileStore
+from views.system import system_bp
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ProfileStore(str(tmp_path / 'profiles'), max_files=3)
+    monkeypatch.setattr(profiling, 'store', store)
+    return store
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(Config, 'PROFILING_KEY', 'let-me-profile')
+    monkeypatch.setattr(Config, 'SYSTEM_KEY', 'operator')
+    monkeypatch.setattr(Config, 'PROFILING_SAMPLE_RATE', 0)
+    app = Flask(__name__)
+    app.config['PROFILING_ENABLED'] = True
+    profiling.init_app(app)
+    app.register_blueprint(system_bp, url_prefix='/api/system')
+
+    @app.route('/api/appointments/available-times')
+    def available_times():
+        time.sleep(0.03)
+        return jsonify([{"timeslot_time": f"{hour}:00:00"} for hour in range(8, 18)])
+
+    return app.test_client()
+
+
+def test_only_requests_with_the_key_are_profiled(client, store):
+    assert 'X-Profile-Id' not in client.get('/api/appointments/available-times').headers
+    assert 'X-Profile-Id' not in client.get('/api/appointments/available-times',
+                                            headers={'X-Profile': 'guess'}).headers
+    assert 'X-Profile-Id' not in client.get('/api/appointments/available-times',
+                                            headers={'X-Profile': 'lét-me-profile'}).headers
+    response = client.get('/api/appointments/available-times', headers={'X-Profile': 'let-me-profile'})
+    name = response.headers['X-Profile-Id']
+    assert '_GET_200_' in name and name.endswith('ms_api_appointments_available-times.pstats')
+
+    stats = pstats.Stats(store.path(name))
+    assert any(function == 'available_times' for _, _, function in stats.stats)
+
+def test_sampled_requests_write_collapsed_stacks(client, store, monkeypatch):
+    monkeypatch.setattr(Config, 'PROFILER', 'sampling')
+    monkeypatch.setattr(Config, 'PROFILING_INTERVAL', 0.001)
+    monkeypatch.setattr(Config, 'PROFILING_SAMPLE_RATE', 2)
+    names = [client.get('/api/appointments/available-times').headers.get('X-Profile-Id') for _ in range(4)]
+    profiled = [name for name in names if name]
+    assert len(profiled) == 2 and all(name.endswith('.collapsed') for name in profiled)
+    with open(store.path(profiled[0])) as collapsed:
+        stack, count = collapsed.readline().rsplit(' ', 1)
+    assert 'available_times' in stack and int(count) > 0
+
+def test_profiles_are_listed_pruned_and_downloadable(client, store):
+    for _ in range(4):
+        client.get('/api/appointments/available-times', headers={'X-Profile': 'let-me-profile'})
+    operator = {'X-System-Key': 'operator'}
+    profiles = client.get('/api/system/profiles', headers=operator).json
+    assert len(profiles) == 3
+    assert profiles[0]["route"] == 'api_appointments_available-times'
+    assert profiles[0]["created"] > profiles[-1]["created"]
+
+    download = client.get(f"/api/system/profiles/{profiles[0]['name']}", headers=operator)
+    assert download.status_code == 200
+    assert 'attachment' in download.headers['Content-Disposition']
+    assert client.get('/api/system/profiles/..%2Fconfig.py', headers=operator).status_code == 404
+
+def test_system_endpoints_require_the_operator_key(client, store, monkeypatch):
+    client.get('/api/appointments/available-times', headers={'X-Profile': 'let-me-profile'})
+    name = store.list()[0]['name']
+    for path in ('/api/system/profiles', f'/api/system/profiles/{name}', '/api/system/cache'):
+        assert client.get(path).status_code == 403
+        assert client.get(path, headers={'X-System-Key': 'guess'}).status_code == 403
+        assert client.get(path, headers={'X-System-Key': 'opérator'}).status_code == 403
+    assert client.get('/api/system/cache', headers={'X-System-Key': 'operator'}).status_code == 200
+
+    # Without a configured key nobody gets in
+    monkeypatch.setattr(Config, 'SYSTEM_KEY', '')
+    assert client.get('/api/system/profiles', headers={'X-System-Key': ''}).status_code == 403
+
+@pytest.mark.parametrize('metrics_enabled, profiling_enabled, registered', [
+    (False, False, False),
+    (True, False, True),
+    (False, True, True),
+])
+def test_system_endpoints_exist_only_with_metrics_or_profiling(db, monkeypatch, metrics_enabled, profiling_enabled,
+                                                               registered):
+    monkeypatch.setattr(Config, 'METRICS_ENABLED', metrics_enabled)
+    monkeypatch.setattr(Config, 'PROFILING_ENABLED', profiling_enabled)
+    monkeypatch.setattr(Config, 'SYSTEM_KEY', 'operator')
+    monkeypatch.setattr(Config, 'SECRET_KEY', 'test-secret-key')
+    client = create_app().test_client()
+    response = client.get('/api/system/pool', headers={'X-System-Key': 'operator'})
+    assert response.status_code == (200 if registered else 404)
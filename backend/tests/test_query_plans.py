@@ -0,0 +1,421 @@
+"""Query-plan regression tests.
+
+Loads a generated dataset into the test database and calls every model
+method. Each distinct statement they issue is recorded and EXPLAINed. A
+statement fails when it reads a large table in full or, on MySQL, when the
+plan estimates more than MAX_ROWS examined rows for one table. MySQL plans
+carry row estimates; SQLite's do not, so there only scans are checked.
+Statements that read a table in full on purpose are listed in
+INTENDED_FULL_SCANS. Every public model method needs a scenario or an
+entry in UNCOVERED_METHODS that says why it has none.
+
+Every plan is written to QUERY_PLAN_REPORT (.json and .md), which CI keeps
+as an artifact:
+    STORAGE_BACKEND=sqlite pytest tests/test_query_plans.py
+"""
+import pytest
+import sys, os
+import json
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+import bulk
+import database
+from bloom import email_filter
+from cache import cache, NullBackend
+from config import Config
+from metrics import fingerprint
+from slowlog import explain
+from models.appointment import Appointment
+from models.hospital import Hospital
+from models.medical import MedicalRecord
+from models.user import User
+from scripts.generate_dataset import DatasetGenerator, TABLES, next_ids
+from scripts.load_seeds import HOSPITAL_COLUMNS, fetch_hospital_ids, hospital_rows, schedule_rows, timeslot_rows
+
+MAX_ROWS = int(os.getenv('QUERY_PLAN_MAX_ROWS', 2000))  # Estimated rows examined per table
+LARGE_TABLE_ROWS = int(os.getenv('QUERY_PLAN_LARGE_TABLE_ROWS', 1000))  # Smaller tables may be scanned
+REPORT = os.getenv('QUERY_PLAN_REPORT', os.path.join(os.path.dirname(__file__), '..', 'reports', 'query_plans'))
+
+ANCHOR = date.today()
+HOSPITALS = 40
+USERS = 4000
+APPOINTMENTS = 40000
+SLOT_DAYS = 60
+
+# Fingerprint prefix -> why reading the whole table is the point
+INTENDED_FULL_SCANS = {
+    "SELECT COUNT(*), COALESCE(MAX(user_id), ?) FROM Users": "sizes the email Bloom filter (bloom.py)",
+    "SELECT email FROM Users WHERE user_id <= ?": "loads every email into the Bloom filter (bloom.py)",
+}
+
+# Model method -> why it has no scenario
+UNCOVERED_METHODS = {
+    "MedicalRecord.format_date": "formats a value and runs no query",
+    "MedicalRecord.add_medical_record": "writes to a MedicalHistory table that no schema defines, and nothing calls it",
+    "MedicalRecord.delete_medical_record": "deletes from a MedicalHistory table that no schema defines, and nothing calls it",
+}
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+@scenario('Appointment.get_appointment_id')
+def _(ids):
+    Appointment.get_appointment_id(ids['user_id'])
+    Appointment.get_appointment_id(ids['user_id'], ids['booked_time'], ids['hospital_id'])
+
+@scenario('Appointment.get_upcoming_appointment')
+def _(ids):
+    Appointment.get_upcoming_appointment(ids['user_id'])
+
+@scenario('Appointment.get_available_times')
+def _(ids):
+    Appointment.get_available_times(ids['day'].isoformat(), ids['hospital_id'])
+
+@scenario('Appointment.hospitals_with_availability')
+def _(ids):
+    Appointment.hospitals_with_availability(ids['day'])
+
+@scenario('Appointment.get_availability_range')
+def _(ids):
+    hospitals = ids['hospital_ids'][:3]
+    Appointment.get_availability_range(hospitals, ids['day'], ids['day'] + timedelta(days=13))
+    Appointment.get_availability_range(hospitals, ids['day'], ids['day'] + timedelta(days=13), counts_only=True)
+
+@scenario('Appointment.find_earliest_available')
+def _(ids):
+    after = datetime.combine(ids['day'], datetime.min.time())
+    Appointment.find_earliest_available(after, 5)
+    Appointment.find_earliest_available(after, 5, ids['hospital_ids'][:2])
+
+@scenario('Appointment (TIMESLOT_SOURCE=schedule)')
+def _(ids):
+    after = datetime.combine(ids['day'], datetime.min.time())
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(Config, 'TIMESLOT_SOURCE', 'schedule')
+        Appointment.get_available_times(ids['day'].isoformat(), ids['hospital_id'])
+        Appointment.get_availability_range(ids['hospital_ids'][:3], ids['day'], ids['day'] + timedelta(days=13))
+        Appointment.find_earliest_available(after, 5, ids['hospital_ids'][:2])
+
+@scenario('Appointment.book_appointment')
+def _(ids):
+    Appointment.book_appointment(ids['other_user_id'], ids['free_time'], ids['hospital_id'])
+
+@scenario('Appointment.reschedule_appointment')
+def _(ids):
+    Appointment.reschedule_appointment(ids['appointment_id'], ids['free_time_2'], user_id=ids['appointment_user_id'])
+
+@scenario('Appointment.cancel_appointment')
+def _(ids):
+    Appointment.cancel_appointment(ids['appointment_id'], user_id=ids['appointment_user_id'])
+
+@scenario('Hospital.get_hospitals')
+def _(ids):
+    Hospital.get_hospitals()
+
+@scenario('Hospital.search')
+def _(ids):
+    Hospital.search('Hospital 1', 10)
+
+@scenario('Hospital.nearby')
+def _(ids):
+    Hospital.nearby(40.0, -75.0, 5, ids['day'])
+
+@scenario('MedicalRecord.get_prior_appointments')
+def _(ids):
+    MedicalRecord.get_prior_appointments(ids['user_id'])
+
+@scenario('MedicalRecord.get_prior_conditions')
+def _(ids):
+    MedicalRecord.get_prior_conditions(ids['history_user_id'])
+
+@scenario('MedicalRecord.get_medications')
+def _(ids):
+    MedicalRecord.get_medications(ids['history_user_id'])
+
+@scenario('MedicalRecord.get_medical_history')
+def _(ids):
+    MedicalRecord.get_medical_history(ids['history_user_id'])
+
+@scenario('MedicalRecord.get_summary')
+def _(ids):
+    MedicalRecord.get_summary(ids['history_user_id'])
+
+@scenario('User.get_user_by_email')
+def _(ids):
+    User.get_user_by_email(ids['email'])
+
+@scenario('User.may_exist')
+def _(ids):
+    # The startup load run by bloom.init_app, then a miss that catches up
+    email_filter.load(database.get_db_connection())
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(email_filter, 'catchup_interval', 0)
+        User.may_exist('not-registered@example.com')
+
+@scenario('User.create_user')
+def _(ids):
+    User.create_user('query-plans@example.com', 'not-a-real-hash')
+
+@scenario('User.update_user_password')
+def _(ids):
+    User.update_user_password(ids['user_id'], 'not-a-real-hash')
+
+
+class RecordingCursor:
+    def __init__(self, cursor, statements):
+        self._cursor = cursor
+        self._statements = statements
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._statements.append((operation, params))
+        return self._cursor.execute(operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        self._statements.append((operation, seq_params[0] if seq_params else None))
+        return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+
+
+class RecordingConnection:
+    """Proxy that notes every statement run through its cursors."""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.statements = []
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(self._connection.cursor(*args, **kwargs), self.statements)
+
+
+def _scalar(connection, statement, params=()):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(statement, params)
+        row = cursor.fetchone()
+        return row[0] if row else None
+    finally:
+        cursor.close()
+
+
+def load_dataset(connection):
+    """Loads hospitals, slots, schedules and generated users and appointments; returns ids to query with."""
+    bulk.insert_rows(connection, 'Hospitals', HOSPITAL_COLUMNS, hospital_rows(HOSPITALS))
+    hospital_ids = fetch_hospital_ids(connection)
+    bulk.insert_rows(connection, 'Timeslots', ('hospital_id', 'timeslot_time', 'timeslot_date'),
+                     timeslot_rows(hospital_ids, ANCHOR + timedelta(days=1), ANCHOR + timedelta(days=SLOT_DAYS)))
+    bulk.insert_rows(connection, 'Hospital_Schedules', ('hospital_id', 'weekday', 'opens_at', 'closes_at', 'slot_minutes'),
+                     schedule_rows(hospital_ids))
+    first_user_id, first_history_id, _ = next_ids(connection)
+    generator = DatasetGenerator(USERS, APPOINTMENTS, hospital_ids, anchor=ANCHOR, first_user_id=first_user_id,
+                                 first_history_id=first_history_id, future_days=SLOT_DAYS)
+    for table, columns, rows in generator.tables():
+        bulk.insert_rows(connection, table, columns, rows)
+    if getattr(connection, 'dialect', 'mysql') == 'sqlite':
+        _scalar(connection, "ANALYZE")  # Row counts for the planner; InnoDB keeps its own
+    connection.commit()
+
+    day = ANCHOR + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    hospital_id = hospital_ids[0]
+    free = """
+        SELECT TIMESTAMP(t.timeslot_date, t.timeslot_time) FROM Timeslots t
+        WHERE t.hospital_id = %s AND t.timeslot_date > %s AND NOT EXISTS (
+            SELECT 1 FROM Appointments a WHERE a.hospital_id = t.hospital_id
+            AND a.appointment_time = TIMESTAMP(t.timeslot_date, t.timeslot_time) AND a.status = 'Scheduled')
+        ORDER BY t.timeslot_date DESC, t.timeslot_time DESC LIMIT 1 OFFSET %s
+    """
+    appointment = """
+        SELECT appointment_id FROM Appointments
+        WHERE status = 'Scheduled' AND hospital_id = %s ORDER BY appointment_id LIMIT 1
+    """
+    appointment_id = _scalar(connection, appointment, (hospital_id,))
+    return {
+        'hospital_ids': hospital_ids,
+        'hospital_id': hospital_id,
+        'day': day,
+        'user_id': first_user_id,
+        'other_user_id': first_user_id + USERS - 1,
+        'email': _scalar(connection, "SELECT email FROM Users WHERE user_id = %s", (first_user_id,)),
+        'history_user_id': _scalar(connection, "SELECT user_id FROM Medical_History ORDER BY history_id LIMIT 1"),
+        'booked_time': str(_scalar(connection, "SELECT appointment_time FROM Appointments WHERE appointment_id = %s",
+                                   (appointment_id,))),
+        'appointment_id': appointment_id,
+        'appointment_user_id': _scalar(connection, "SELECT user_id FROM Appointments WHERE appointment_id = %s",
+                                       (appointment_id,)),
+        'free_time': str(_scalar(connection, free, (hospital_id, day, 0))),
+        'free_time_2': str(_scalar(connection, free, (hospital_id, day, 1))),
+    }
+
+
+def table_sizes(connection):
+    return {table: _scalar(connection, f"SELECT COUNT(*) FROM {table}")
+            for table in list(TABLES) + ['Hospitals', 'Timeslots', 'Hospital_Schedules', 'Schedule_Exceptions']}
+
+
+_ALIASES = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+`?(\w+)`?(?:\s+(?:AS\s+)?(?!WHERE|JOIN|ON|SET|LEFT|INNER|ORDER|GROUP|LIMIT|VALUES)(\w+))?',
+                      re.IGNORECASE)
+
+
+def table_aliases(statement):
+    aliases = {}
+    for table, alias in _ALIASES.findall(statement):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def plan_findings(statement, plan, sizes):
+    """(table, problem) for each large table the plan scans in full or reads too many rows of."""
+    large = {table for table, rows in sizes.items() if rows >= LARGE_TABLE_ROWS}
+    findings = []
+    aliases = table_aliases(statement)  # Both backends name joined tables by their alias
+    if isinstance(plan, list):  # SQLite: EXPLAIN QUERY PLAN detail strings
+        for detail in plan:
+            words = detail.split()
+            if len(words) < 2 or words[0] != 'SCAN':
+                continue
+            table = aliases.get(words[1], words[1])
+            if table in large:
+                findings.append((table, f"full scan ({detail})"))
+        return findings
+
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        stack.extend(node.values())
+        table = node.get('table_name')
+        if table is None or 'access_type' not in node:
+            continue
+        table = aliases.get(table, table)
+        if node['access_type'] in ('ALL', 'index') and table in large:
+            findings.append((table, f"full {'table' if node['access_type'] == 'ALL' else 'index'} scan"))
+        rows = node.get('rows_examined_per_scan', 0)
+        if rows > MAX_ROWS:
+            findings.append((table, f"{rows} rows examined per scan (limit {MAX_ROWS})"))
+    return findings
+
+
+def intended_full_scan(text):
+    return next((reason for prefix, reason in INTENDED_FULL_SCANS.items() if text.startswith(prefix)), None)
+
+
+def write_report(path, backend, sizes, entries):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.json", 'w') as out:
+        json.dump({"backend": backend, "max_rows": MAX_ROWS, "large_table_rows": LARGE_TABLE_ROWS,
+                   "table_rows": sizes, "statements": entries}, out, indent=2, default=str)
+    lines = [f"# Query plans ({backend})", "",
+             "Rows per table: " + ', '.join(f"{table} {rows}" for table, rows in sorted(sizes.items())), ""]
+    for entry in entries:
+        status = 'FAIL' if entry['findings'] else 'ok'
+        lines.append(f"## [{status}] {entry['fingerprint']}")
+        lines.append(f"Called by: {', '.join(entry['scenarios'])}")
+        for finding in entry['findings']:
+            lines.append(f"- {finding}")
+        if entry['intended']:
+            lines.append(f"- reads the whole table on purpose: {entry['intended']}")
+        plan = entry['plan']
+        text = '\n'.join(plan) if isinstance(plan, list) else json.dumps(plan, indent=2, default=str)
+        lines += ["```", text or entry.get('error', ''), "```", ""]
+    with open(f"{path}.md", 'w') as out:
+        out.write('\n'.join(lines))
+
+
+@pytest.fixture(scope='module')
+def plans(module_db):
+    ids = load_dataset(module_db)
+    sizes = table_sizes(module_db)
+
+    recorder = RecordingConnection(module_db)
+    statements = defaultdict(dict)  # fingerprint -> {'statement', 'params', 'scenarios'}
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(database._pool, 'connection', recorder)
+        patch.setattr(cache, 'backend', NullBackend())
+        for name, run in SCENARIOS.items():
+            recorder.statements.clear()
+            run(ids)
+            for statement, params in recorder.statements:
+                entry = statements[fingerprint(statement)]
+                entry.setdefault('statement', statement)
+                entry.setdefault('params', params)
+                entry.setdefault('scenarios', [])
+                if name not in entry['scenarios']:
+                    entry['scenarios'].append(name)
+
+    entries = []
+    for text, entry in statements.items():
+        result = {"fingerprint": text, "scenarios": entry['scenarios'], "plan": None, "findings": [], "intended": None}
+        try:
+            result["plan"] = explain(module_db, entry['statement'], entry['params'])
+        except Exception as e:
+            result["error"] = str(e)
+            result["findings"].append(f"EXPLAIN failed: {e}")
+        else:
+            findings = [f"{table}: {problem}" for table, problem in plan_findings(entry['statement'], result["plan"], sizes)]
+            result["intended"] = intended_full_scan(text) if findings else None
+            if result["intended"] is None:
+                result["findings"] = findings
+        entries.append(result)
+    write_report(REPORT, Config.STORAGE_BACKEND, sizes, entries)
+    return entries
+
+
+def test_every_model_method_has_a_scenario():
+    methods = {f"{model.__name__}.{name}" for model in (Appointment, Hospital, MedicalRecord, User)
+               for name, member in vars(model).items() if isinstance(member, staticmethod) and not name.startswith('_')}
+    assert sorted(methods - set(SCENARIOS) - set(UNCOVERED_METHODS)) == []
+    assert sorted(set(UNCOVERED_METHODS) - methods) == []
+
+def test_every_scenario_runs_queries(plans):
+    called = {name for entry in plans for name in entry['scenarios']}
+    assert sorted(set(SCENARIOS) - called) == []
+
+@pytest.mark.parametrize('name', list(SCENARIOS))
+def test_queries_use_indexes(plans, name):
+    failures = [f"{entry['fingerprint']}\n    " + '\n    '.join(entry['findings'])
+                for entry in plans if name in entry['scenarios'] and entry['findings']]
+    assert not failures, f"See {REPORT}.md\n" + '\n'.join(failures)
+
+def test_findings_flag_scans_of_large_tables_only():
+    sizes = {'Appointments': 50000, 'Hospitals': 40}
+    statement = "SELECT * FROM Appointments a JOIN Hospitals h ON a.hospital_id = h.hospital_id WHERE a.status = %s"
+    assert plan_findings(statement, ["SCAN a", "SEARCH h USING INTEGER PRIMARY KEY (rowid=?)"], sizes) == \
+        [('Appointments', 'full scan (SCAN a)')]
+    assert plan_findings("SELECT * FROM Hospitals", ["SCAN Hospitals"], sizes) == []
+
+    plan = {"query_block": {"nested_loop": [
+        {"table": {"table_name": "a", "access_type": "ALL", "rows_examined_per_scan": 48000}},
+        {"table": {"table_name": "h", "access_type": "ALL", "rows_examined_per_scan": 40}},
+    ]}}
+    assert sorted(plan_findings(statement, plan, sizes)) == [
+        ('Appointments', f'48000 rows examined per scan (limit {MAX_ROWS})'), ('Appointments', 'full table scan')]
@@ -0,0 +1,131 @@
+import pytest
+import sys, os
+from datetime import date, datetime, timedelta
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from schedule import ScheduleBook
+from availability import AvailabilityIndex
+
+MONDAY = date(2030, 3, 4)
+HOUR = timedelta(hours=1)
+
+
+def template(hospital_id, weekday, opens, closes, minutes=60, valid_from=None, valid_until=None):
+    return {"hospital_id": hospital_id, "weekday": weekday, "opens_at": opens * HOUR, "closes_at": closes * HOUR,
+            "slot_minutes": minutes, "valid_from": valid_from, "valid_until": valid_until}
+
+
+def exception(hospital_id, day, opens=None, closes=None, minutes=None):
+    return {"hospital_id": hospital_id, "exception_date": day, "slot_minutes": minutes,
+            "opens_at": None if opens is None else opens * HOUR, "closes_at": None if closes is None else closes * HOUR}
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        if 'Hospital_Schedules' in sql:
+            self.rows = self.connection.templates
+        elif 'Schedule_Exceptions' in sql:
+            self.rows = self.connection.exceptions
+        else:
+            # Scheduled appointments in [params[-2], params[-1])
+            self.rows = [(h, when) for h, when in self.connection.appointments
+                         if params[-2] <= when < params[-1]]
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, templates, exceptions=(), appointments=()):
+        self.templates = list(templates)
+        self.exceptions = list(exceptions)
+        self.appointments = list(appointments)
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def connection():
+    templates = [template(1, weekday, 8, 18) for weekday in range(5)]
+    templates += [template(2, 0, 9, 12, minutes=30), template(2, 0, 13, 15, minutes=30, valid_until=date(2030, 3, 31))]
+    exceptions = [
+        exception(None, MONDAY + timedelta(days=1)),                  # Holiday everywhere
+        exception(1, MONDAY + timedelta(days=2), 10, 12),             # Short day at hospital 1
+        exception(2, MONDAY + timedelta(days=1), 9, 10, minutes=15),  # Hospital 2 opens anyway
+    ]
+    appointments = [(1, datetime(2030, 3, 4, 8)), (2, datetime(2030, 3, 4, 9, 30))]
+    return FakeConnection(templates, exceptions, appointments)
+
+
+@pytest.fixture
+def book(connection):
+    return ScheduleBook().load(connection)
+
+
+def test_weekly_rules_generate_slots(book):
+    assert book.slot_times(1, MONDAY) == tuple(hour * 3600 for hour in range(8, 18))
+    assert book.slot_times(1, MONDAY + timedelta(days=5)) == ()  # Saturday
+    # Two sessions with 30-minute slots; the afternoon one has ended by April
+    assert len(book.slot_times(2, MONDAY)) == 6 + 4
+    assert len(book.slot_times(2, date(2030, 4, 1))) == 6
+
+def test_exceptions_override_rules(book):
+    tuesday, wednesday = MONDAY + timedelta(days=1), MONDAY + timedelta(days=2)
+    assert book.slot_times(1, tuesday) == ()
+    assert book.slot_times(1, wednesday) == (10 * 3600, 11 * 3600)
+    assert book.slot_times(2, tuesday) == (32400, 33300, 34200, 35100)
+
+def test_iter_slots_is_chronological(book):
+    slots = list(book.iter_slots(1, MONDAY, MONDAY + timedelta(days=3)))
+    assert slots[0] == datetime(2030, 3, 4, 8) and slots[-1] == datetime(2030, 3, 6, 11)
+    assert slots == sorted(slots) and len(slots) == 12
+
+def test_bitmap_index_warms_from_schedule(book, connection):
+    index = AvailabilityIndex().warm(connection, start=MONDAY, days=14, schedule=book)
+    assert index.available_times(1, MONDAY)[0] == '9:00:00'  # 8:00 is booked
+    assert index.available_times(1, MONDAY + timedelta(days=1)) == []
+    assert index.available_times(2, MONDAY)[:2] == ['9:00:00', '10:00:00']
+
+def test_earliest_from_schedule_skips_bookings(book, connection, monkeypatch):
+    import models.appointment as appointment_module
+    from models.appointment import Appointment
+    monkeypatch.setattr(appointment_module, 'get_db_connection', lambda: connection)
+    monkeypatch.setattr(appointment_module, 'current_schedule', lambda: book)
+
+    slots = Appointment._earliest_from_schedule(datetime(2030, 3, 4, 7), 3, None, date(2031, 1, 1))
+    assert slots == [
+        {'hospital_id': 1, 'appointment_time': '2030-03-04 09:00:00'},
+        {'hospital_id': 2, 'appointment_time': '2030-03-04 09:00:00'},
+        {'hospital_id': 1, 'appointment_time': '2030-03-04 10:00:00'},
+    ]
+    # After Friday's last slot the next one is Monday morning
+    later = Appointment._earliest_from_schedule(datetime(2030, 3, 8, 18), 1, [1], date(2031, 1, 1))
+    assert later == [{'hospital_id': 1, 'appointment_time': '2030-03-11 08:00:00'}]
+
+def test_range_from_schedule_counts_free_slots(book, connection, monkeypatch):
+    import models.appointment as appointment_module
+    from models.appointment import Appointment
+    monkeypatch.setattr(appointment_module, 'get_db_connection', lambda: connection)
+    monkeypatch.setattr(appointment_module, 'current_schedule', lambda: book)
+
+    counts = Appointment._availability_range_from_schedule([1, 2], MONDAY, MONDAY + timedelta(days=2), True)
+    assert counts[1] == {'2030-03-04': 9, '2030-03-06': 2}
+    assert counts[2] == {'2030-03-04': 9, '2030-03-05': 4}
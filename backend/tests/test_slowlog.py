@@ -0,0 +1,89 @@
+import pytest
+import sys, os
+import json
+from datetime import date
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+import database
+import storage
+from config import Config
+from slowlog import SlowQueryLog, explain, params_shape
+from scripts.slow_queries import full_scans, log_files, rank, read_entries, summarize
+
+QUERY = "SELECT * FROM Medications WHERE history_id = %s AND start_date > %s"
+
+
+def get_medications(log, seconds):
+    return log.record(QUERY, (7, date(2030, 1, 1)), seconds, rows=3)
+
+
+@pytest.fixture
+def log(tmp_path):
+    return SlowQueryLog(str(tmp_path / 'slow.jsonl'), threshold=0.1, throttle=60, explain=False)
+
+
+def entries(log):
+    return list(read_entries(log_files(log.path)))
+
+
+def test_params_are_logged_as_shapes():
+    assert params_shape(("jane@example.com", 5, None, date(2030, 1, 1))) == ['str(16)', 'int', 'null', 'date']
+    assert params_shape([(1, 'a'), (2, 'b')], many=True) == {"rows": 2, "row": ['int', 'str(1)']}
+
+def test_only_slow_statements_are_logged(log):
+    assert not get_medications(log, 0.05)
+    assert get_medications(log, 0.25)
+    [entry] = entries(log)
+    assert entry["fingerprint"] == "SELECT * FROM Medications WHERE history_id = ? AND start_date > ?"
+    assert entry["duration_ms"] == 250.0
+    assert entry["params"] == ['int', 'date']
+    assert entry["source"].endswith("test_slowlog.py:get_medications")
+
+def test_repeats_are_throttled_and_counted(log):
+    assert get_medications(log, 0.2)
+    assert not get_medications(log, 0.3)
+    assert not get_medications(log, 0.4)
+    log.throttle = 0
+    assert get_medications(log, 0.5)
+    assert [entry["suppressed"] for entry in entries(log)] == [0, 2]
+    assert log.stats()["suppressed"] == 2
+
+def test_plan_is_captured_in_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'STORAGE_BACKEND', 'sqlite')
+    monkeypatch.setattr(Config, 'SQLITE_PATH', ':memory:')
+    storage.reset_backends()
+    try:
+        log = SlowQueryLog(str(tmp_path / 'slow.jsonl'), threshold=0.1)
+        log.record("SELECT * FROM Users WHERE password_hash = %s", ('x',), 0.3, rows=0)
+        log.flush()
+        [entry] = entries(log)
+        assert full_scans(entry["explain"]) == ['Users']
+
+        connection = database.create_connection()
+        try:
+            assert full_scans(explain(connection, "SELECT * FROM Users WHERE email = %s", ('a@b.c',))) == []
+        finally:
+            connection.close()
+    finally:
+        storage.reset_backends()
+
+def test_summary_ranks_fingerprints(log):
+    get_medications(log, 0.2)
+    log.record("SELECT 1 FROM Users WHERE user_id = 5", None, 0.9, rows=1)
+    log.throttle = 0
+    get_medications(log, 0.3)
+    ranked = rank(summarize(entries(log)), sort='total')
+    assert [group["fingerprint"] for group in ranked] == [
+        "SELECT ? FROM Users WHERE user_id = ?",
+        "SELECT * FROM Medications WHERE history_id = ? AND start_date > ?",
+    ]
+    assert ranked[1]["count"] == 2 and ranked[1]["max_ms"] == 300.0
+    assert rank(summarize(entries(log)), sort='count', top=1)[0]["count"] == 2
+
+def test_mysql_plan_full_scans():
+    plan = json.loads('{"query_block": {"nested_loop": [{"table": {"table_name": "t", "access_type": "ALL"}},'
+                      ' {"table": {"table_name": "a", "access_type": "ref"}}]}}')
+    assert full_scans(plan) == ['t']
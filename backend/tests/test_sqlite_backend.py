@@ -0,0 +1,80 @@
+import pytest
+import sys, os
+from datetime import date, datetime, timedelta
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+import database
+import storage
+from cache import cache, MemoryBackend
+from config import Config
+from storage.sqlite import translate
+from models.appointment import Appointment
+from models.medical import MedicalRecord
+from models.user import User
+
+NEXT_MONDAY = date.today() + timedelta(days=7 - date.today().weekday())
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(Config, 'STORAGE_BACKEND', 'sqlite')
+    monkeypatch.setattr(Config, 'SQLITE_PATH', ':memory:')
+    monkeypatch.setattr(database, '_pool', None)
+    monkeypatch.setattr(cache, 'backend', MemoryBackend())
+    storage.reset_backends()
+    connection = database.create_connection()
+    cursor = connection.cursor()
+    cursor.execute("INSERT INTO Users (email, password_hash) VALUES (%s, %s)", ('a@example.com', 'x'))
+    cursor.execute("INSERT INTO Users (email, password_hash) VALUES (%s, %s)", ('b@example.com', 'x'))
+    cursor.execute("INSERT INTO Hospitals (name, address) VALUES (%s, %s)", ('Downtown Clinic', '123 Main Street'))
+    cursor.executemany("INSERT INTO Timeslots (hospital_id, timeslot_time, timeslot_date) VALUES (%s, %s, %s)",
+                       [(1, timedelta(hours=hour), NEXT_MONDAY) for hour in range(8, 11)])
+    connection.commit()
+    yield connection
+    connection.close()
+    storage.reset_backends()
+
+
+def test_translate_rewrites_mysql_dialect():
+    assert translate("SELECT 1 WHERE a > NOW() AND b = %s") == "SELECT 1 WHERE a > datetime('now', 'localtime') AND b = ?"
+    assert translate("a.t = TIMESTAMP(t.timeslot_date, t.timeslot_time)") == "a.t = (t.timeslot_date || ' ' || t.timeslot_time)"
+
+def test_values_come_back_as_mysql_types(db):
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("SELECT timeslot_date, timeslot_time FROM Timeslots ORDER BY timeslot_time LIMIT 1")
+    assert cursor.fetchone() == {'timeslot_date': NEXT_MONDAY, 'timeslot_time': timedelta(hours=8)}
+
+def test_booking_respects_slot_uniqueness(db):
+    when = f"{NEXT_MONDAY} 09:00:00"
+    assert Appointment.book_appointment(1, when, 1)["success"]
+    taken = Appointment.book_appointment(2, when, 1)
+    assert not taken["success"] and "no longer available" in taken["message"]
+    times = [slot['timeslot_time'] for slot in Appointment.get_available_times(NEXT_MONDAY.isoformat(), 1)]
+    assert times == ['8:00:00', '10:00:00']
+
+    appointment_id = Appointment.get_appointment_id(1, when, 1)
+    assert Appointment.cancel_appointment(appointment_id, user_id=1)
+    assert Appointment.book_appointment(2, when, 1)["success"]
+
+def test_range_and_earliest_queries(db):
+    Appointment.book_appointment(1, f"{NEXT_MONDAY} 08:00:00", 1)
+    counts = Appointment.get_availability_range([1], NEXT_MONDAY, NEXT_MONDAY, counts_only=True)
+    assert counts == {1: {NEXT_MONDAY.isoformat(): 2}}
+    earliest = Appointment.find_earliest_available(datetime.combine(NEXT_MONDAY, datetime.min.time()), 1)
+    assert earliest == [{'hospital_id': 1, 'appointment_time': f"{NEXT_MONDAY} 09:00:00"}]
+
+def test_users_and_medical_records(db):
+    assert User.create_user('a@example.com', 'y') == {"success": False, "message": "User already exists"}
+    assert User.get_user_by_email('b@example.com') == {'user_id': 2, 'password_hash': 'x'}
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO Medical_History (user_id, doctor_notes, report_date) VALUES (%s, %s, %s)",
+                   (1, 'Routine follow-up.', date(2030, 1, 2)))
+    cursor.execute("INSERT INTO Conditions (history_id, condition_name, diagnosed_date) VALUES (%s, %s, %s)",
+                   (cursor.lastrowid, 'Asthma', date(2029, 5, 1)))
+    db.commit()
+    summary = MedicalRecord.get_summary(1)
+    assert summary['history'][0]['report_date'] == date(2030, 1, 2)
+    assert summary['conditions'][0]['condition_name'] == 'Asthma'
@@ -0,0 +1,98 @@
+import pytest
+import sys, os
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from flask import Flask, jsonify
+import tokens
+from config import Config, DEFAULT_SECRET_KEY
+from tokens import TokenSigner, TokenError, current_user_id
+
+
+def test_issue_and_verify():
+    signer = TokenSigner('secret')
+    token, expires_at = signer.issue(42)
+    claims = signer.verify(token)
+    assert claims['sub'] == 42 and claims['exp'] == expires_at
+
+def test_tampered_or_foreign_tokens_are_rejected():
+    signer = TokenSigner('secret')
+    token, _ = signer.issue(42)
+    kid, payload, signature = token.split('.')
+    forged, _ = TokenSigner('other').issue(1)
+    for bad in (f"{kid}.{payload}.{signature[:-2]}xx", forged, 'garbage', f"{kid}.%%%.{signature}",
+                f"{kid}.é.x", f"{kid}.{payload}.{signature[:-1]}é"):
+        with pytest.raises(TokenError):
+            signer.verify(bad)
+
+def test_expired_tokens_are_rejected():
+    signer = TokenSigner('secret', leeway=0)
+    token, _ = signer.issue(42, ttl=-1)
+    with pytest.raises(TokenError, match='expired'):
+        signer.verify(token)
+
+def test_rotated_keys_still_verify():
+    old_token, _ = TokenSigner('old-secret').issue(7)
+    rotated = TokenSigner('new-secret', previous_keys=['old-secret'])
+    assert rotated.verify(old_token)['sub'] == 7
+    assert rotated.issue(7)[0].split('.')[0] == rotated.kid != old_token.split('.')[0]
+
+def test_revoked_tokens_are_rejected_and_list_stays_bounded():
+    signer = TokenSigner('secret', max_revoked=2)
+    issued = [signer.issue(n)[0] for n in range(3)]
+    signer.revoke(signer.verify(issued[0]))
+    with pytest.raises(TokenError, match='revoked'):
+        signer.verify(issued[0])
+    signer.revoke(signer.verify(issued[1]))
+    signer.revoke(signer.verify(issued[2]))
+    assert signer.stats()['revoked'] == 2
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test-secret'
+    tokens.init_app(app)
+
+    @app.route('/whoami')
+    def whoami():
+        return jsonify({"user_id": current_user_id('from-param')})
+    return app.test_client()
+
+def test_request_hook_injects_user(client, monkeypatch):
+    token, _ = tokens.signer.issue(5)
+    response = client.get('/whoami', headers={'Authorization': f'Bearer {token}'})
+    assert response.json == {"user_id": 5}
+    assert client.get('/whoami', headers={'Authorization': 'Bearer nope'}).status_code == 401
+
+    # Without a token the legacy user_id parameter is used unless auth is required
+    assert client.get('/whoami').json == {"user_id": 'from-param'}
+    monkeypatch.setattr(Config, 'AUTH_REQUIRED', True)
+    assert client.get('/whoami').status_code == 401
+
+@pytest.mark.parametrize('key', ['', DEFAULT_SECRET_KEY])
+def test_default_secret_key_is_refused_outside_development(monkeypatch, key):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = key
+    monkeypatch.setattr(Config, 'SECRET_KEY', key)
+    monkeypatch.setattr(Config, 'DEVELOPMENT', False)
+    with pytest.raises(RuntimeError, match='SECRET_KEY'):
+        tokens.init_app(app)
+
+    monkeypatch.setattr(Config, 'DEVELOPMENT', True)
+    tokens.init_app(Flask(__name__))  # Signs with the default key, as auth is not required
+    monkeypatch.setattr(Config, 'AUTH_REQUIRED', True)
+    with pytest.raises(RuntimeError, match='SECRET_KEY'):
+        tokens.init_app(app)
+
+def test_stale_token_does_not_block_login(app, make_user, monkeypatch):
+    monkeypatch.setattr(Config, 'AUTH_REQUIRED', True)
+    user = make_user()
+    stale = {'Authorization': 'Bearer stale.token.value'}
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'email': user['email'], 'password': user['password']},
+                           headers=stale)
+    assert response.status_code == 200
+    assert client.get('/api/dashboard/medical-history', headers=stale).status_code == 401
@@ -0,0 +1,136 @@
+import pytest
+import sys, os
+
+# Set the current directory to the 'backend' root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../app')))
+
+from flask import Flask, jsonify
+import database
+from pool import ConnectionPool
+
+
+class FakeConnection:
+    """Records the transaction calls a request makes."""
+
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor()
+
+
+class FakeCursor:
+    def execute(self, operation, params=None):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    created = []
+
+    def creator():
+        connection = FakeConnection()
+        created.append(connection)
+        return connection
+
+    monkeypatch.setattr(database, '_pool', ConnectionPool(creator, size=2, max_overflow=0))
+    return created
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    database.init_app(app)
+
+    @app.route('/two-calls/<int:status>')
+    def two_calls(status):
+        first = database.get_db_connection()
+        first.commit()
+        first.close()
+        second = database.get_db_connection()
+        second.commit()
+        second.close()
+        return jsonify(same=first is second), status
+
+    @app.route('/three-queries')
+    def three_queries():
+        for _ in range(3):
+            cursor = database.get_db_connection().cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        return jsonify(ok=True)
+
+    @app.route('/release')
+    def release():
+        cursor = database.get_db_connection().cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+        database.release_connection()
+        in_use = database.get_pool_stats()["in_use"]
+        cursor = database.get_db_connection().cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+        return jsonify(in_use_while_released=in_use)
+
+    @app.route('/boom')
+    def boom():
+        database.get_db_connection()
+        raise RuntimeError("boom")
+
+    return app.test_client()
+
+
+def test_request_uses_one_connection_and_commits_once(client, connections):
+    response = client.get('/two-calls/200')
+    assert response.json == {"same": True}
+    assert len(connections) == 1
+    assert connections[0].commits == 1
+    assert database.get_pool_stats()["in_use"] == 0
+
+def test_error_response_rolls_back(client, connections):
+    client.get('/two-calls/500')
+    assert connections[0].commits == 0
+    assert connections[0].rollbacks >= 1
+
+def test_unhandled_exception_rolls_back_in_teardown(client, connections):
+    client.application.config['PROPAGATE_EXCEPTIONS'] = False
+    response = client.get('/boom')
+    assert response.status_code == 500
+    assert connections[0].commits == 0
+    assert database.get_pool_stats()["in_use"] == 0
+
+def test_connection_reused_across_requests(client, connections):
+    client.get('/two-calls/200')
+    client.get('/two-calls/200')
+    assert len(connections) == 1
+    assert connections[0].commits == 2
+
+def test_query_count_header(client, connections, monkeypatch):
+    monkeypatch.setattr(database.Config, 'QUERY_COUNT_HEADER', True)
+    assert client.get('/three-queries').headers['X-DB-Query-Count'] == '3'
+    assert client.get('/two-calls/200').headers['X-DB-Query-Count'] == '0'
+
+def test_released_connection_goes_back_to_the_pool(client, connections, monkeypatch):
+    monkeypatch.setattr(database.Config, 'QUERY_COUNT_HEADER', True)
+    response = client.get('/release')
+    assert response.json == {"in_use_while_released": 0}
+    assert response.headers['X-DB-Query-Count'] == '2'
+    assert sum(connection.commits for connection in connections) == 2
+    assert database.get_pool_stats()["in_use"] == 0
@@ -0,0 +1,2 @@
+DROP INDEX idx_appointments_hospital_time ON Appointments;
+DROP INDEX idx_appointments_user_status_time ON Appointments;
@@ -0,0 +1,5 @@
+-- Upcoming/conflict lookups filter on user, status and time
+CREATE INDEX idx_appointments_user_status_time ON Appointments (user_id, status, appointment_time);
+
+-- Slot availability probes filter on hospital and time
+CREATE INDEX idx_appointments_hospital_time ON Appointments (hospital_id, appointment_time);
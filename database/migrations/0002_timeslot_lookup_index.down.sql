@@ -0,0 +1 @@
+DROP INDEX idx_timeslots_hospital_date_time ON Timeslots;
@@ -0,0 +1,2 @@
+-- Available-times lookups filter on hospital and date, then read the times
+CREATE INDEX idx_timeslots_hospital_date_time ON Timeslots (hospital_id, timeslot_date, timeslot_time);
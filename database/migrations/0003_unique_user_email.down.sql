@@ -0,0 +1 @@
+ALTER TABLE Users DROP INDEX uq_users_email;
@@ -0,0 +1,3 @@
+-- Login and signup look users up by email; emails must also be unique.
+-- Fails if duplicate emails already exist: resolve those before upgrading.
+ALTER TABLE Users ADD UNIQUE INDEX uq_users_email (email);
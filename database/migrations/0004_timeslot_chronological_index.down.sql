@@ -0,0 +1 @@
+DROP INDEX idx_timeslots_date_time_hospital ON Timeslots;
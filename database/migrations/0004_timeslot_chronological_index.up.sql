@@ -0,0 +1,2 @@
+-- Earliest-slot search walks all hospitals' slots in time order and stops at the limit
+CREATE INDEX idx_timeslots_date_time_hospital ON Timeslots (timeslot_date, timeslot_time, hospital_id);
@@ -0,0 +1,4 @@
+CREATE INDEX idx_appointments_hospital_time ON Appointments (hospital_id, appointment_time);
+DROP INDEX uq_appointments_user_slot ON Appointments;
+DROP INDEX uq_appointments_hospital_slot ON Appointments;
+ALTER TABLE Appointments DROP COLUMN scheduled_flag;
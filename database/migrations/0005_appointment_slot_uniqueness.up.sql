@@ -0,0 +1,15 @@
+-- 1 for Scheduled appointments and NULL otherwise. NULLs never collide in a
+-- unique index, so cancelled and completed rows can share a slot while at
+-- most one Scheduled appointment can hold it.
+-- Fails if a slot is already double-booked: resolve those rows before upgrading.
+ALTER TABLE Appointments
+    ADD COLUMN scheduled_flag TINYINT AS (IF(status = 'Scheduled', 1, NULL)) STORED;
+
+-- One Scheduled appointment per hospital slot
+CREATE UNIQUE INDEX uq_appointments_hospital_slot ON Appointments (hospital_id, appointment_time, scheduled_flag);
+
+-- One Scheduled appointment per user at a given time, whatever the hospital
+CREATE UNIQUE INDEX uq_appointments_user_slot ON Appointments (user_id, appointment_time, scheduled_flag);
+
+-- Superseded by uq_appointments_hospital_slot, which has the same leading columns
+DROP INDEX idx_appointments_hospital_time ON Appointments;
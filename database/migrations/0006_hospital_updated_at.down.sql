@@ -0,0 +1,3 @@
+ALTER TABLE Hospitals
+    DROP INDEX idx_hospitals_updated_at,
+    DROP COLUMN updated_at;
@@ -0,0 +1,4 @@
+-- The hospital search index refreshes incrementally from rows changed since its last load.
+ALTER TABLE Hospitals
+    ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX idx_hospitals_updated_at (updated_at);
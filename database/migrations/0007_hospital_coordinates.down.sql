@@ -0,0 +1,3 @@
+ALTER TABLE Hospitals
+    DROP COLUMN longitude,
+    DROP COLUMN latitude;
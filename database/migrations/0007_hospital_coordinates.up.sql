@@ -0,0 +1,5 @@
+-- Coordinates for nearest-hospital lookups. Hospitals without them are left
+-- out of /hospitals/nearby until they are geocoded.
+ALTER TABLE Hospitals
+    ADD COLUMN latitude DECIMAL(9, 6) NULL,
+    ADD COLUMN longitude DECIMAL(9, 6) NULL;
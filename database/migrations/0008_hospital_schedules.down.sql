@@ -0,0 +1,2 @@
+DROP TABLE Schedule_Exceptions;
+DROP TABLE Hospital_Schedules;
@@ -0,0 +1,67 @@
+-- Weekly opening hours per hospital. With TIMESLOT_SOURCE=schedule, slots are
+-- generated from these rules by app/schedule.py instead of being read from
+-- Timeslots, and only bookings are stored.
+CREATE TABLE Hospital_Schedules (
+    schedule_id INT AUTO_INCREMENT PRIMARY KEY,
+    hospital_id INT NOT NULL,
+    weekday TINYINT NOT NULL,          -- 0 = Monday, as WEEKDAY()
+    opens_at TIME NOT NULL,            -- First slot starts here
+    closes_at TIME NOT NULL,           -- Last slot ends by here
+    slot_minutes SMALLINT NOT NULL DEFAULT 60,
+    valid_from DATE NULL,              -- NULL = no start / end bound
+    valid_until DATE NULL,
+    FOREIGN KEY (hospital_id) REFERENCES Hospitals(hospital_id),
+    INDEX idx_schedules_hospital_weekday (hospital_id, weekday)
+);
+
+-- Holidays, closures and special hours. A row with no opens_at closes the
+-- day; rows with hours replace the weekly template for that day. A NULL
+-- hospital_id applies to every hospital without its own exception that day.
+CREATE TABLE Schedule_Exceptions (
+    exception_id INT AUTO_INCREMENT PRIMARY KEY,
+    hospital_id INT NULL,
+    exception_date DATE NOT NULL,
+    opens_at TIME NULL,
+    closes_at TIME NULL,
+    slot_minutes SMALLINT NULL,
+    reason VARCHAR(255),
+    FOREIGN KEY (hospital_id) REFERENCES Hospitals(hospital_id),
+    INDEX idx_exceptions_date_hospital (exception_date, hospital_id)
+);
+
+-- Convert materialized Timeslots: one template per hospital and weekday from
+-- its first to its last slot time, using the smallest gap between slot times
+-- as the slot length (an hour when a weekday has a single slot). A template
+-- is valid from the first to the last date that had such slots, so a
+-- hospital whose Timeslots ran out stays closed after the conversion too;
+-- extend valid_until to open it further.
+INSERT INTO Hospital_Schedules (hospital_id, weekday, opens_at, closes_at, slot_minutes, valid_from, valid_until)
+SELECT hospital_id, weekday, MIN(slot_time),
+       SEC_TO_TIME(TIME_TO_SEC(MAX(slot_time)) + COALESCE(MIN(gap), 3600)),
+       COALESCE(MIN(gap), 3600) DIV 60,
+       MIN(first_date),
+       MAX(last_date)
+FROM (
+    SELECT hospital_id, weekday, slot_time, first_date, last_date,
+           TIME_TO_SEC(LEAD(slot_time) OVER (PARTITION BY hospital_id, weekday ORDER BY slot_time))
+               - TIME_TO_SEC(slot_time) AS gap
+    FROM (
+        SELECT hospital_id, WEEKDAY(timeslot_date) AS weekday, timeslot_time AS slot_time,
+               MIN(timeslot_date) AS first_date, MAX(timeslot_date) AS last_date
+        FROM Timeslots
+        GROUP BY hospital_id, WEEKDAY(timeslot_date), timeslot_time
+    ) distinct_times
+) gaps
+GROUP BY hospital_id, weekday;
+
+-- Days on which a hospital normally opens but has no Timeslots rows, while
+-- other hospitals do, become closures.
+INSERT INTO Schedule_Exceptions (hospital_id, exception_date, reason)
+SELECT s.hospital_id, d.timeslot_date, 'Closed (converted from Timeslots)'
+FROM (SELECT DISTINCT timeslot_date FROM Timeslots) d
+JOIN Hospital_Schedules s
+    ON s.weekday = WEEKDAY(d.timeslot_date) AND d.timeslot_date BETWEEN s.valid_from AND s.valid_until
+WHERE NOT EXISTS (
+    SELECT 1 FROM Timeslots t
+    WHERE t.hospital_id = s.hospital_id AND t.timeslot_date = d.timeslot_date
+);
@@ -0,0 +1,2 @@
+CREATE INDEX idx_timeslots_hospital_date_time ON Timeslots (hospital_id, timeslot_date, timeslot_time);
+DROP INDEX uq_timeslots_hospital_date_time ON Timeslots;
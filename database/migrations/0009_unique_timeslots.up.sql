@@ -0,0 +1,14 @@
+-- A hospital offers each slot once, so re-running scripts/load_seeds.py can
+-- skip the slots it loaded before (INSERT IGNORE) instead of duplicating them.
+-- Duplicates left by earlier re-runs are removed first, keeping the oldest row.
+DELETE t FROM Timeslots t
+JOIN Timeslots kept
+    ON kept.hospital_id = t.hospital_id
+    AND kept.timeslot_date = t.timeslot_date
+    AND kept.timeslot_time = t.timeslot_time
+    AND kept.timeslot_id < t.timeslot_id;
+
+CREATE UNIQUE INDEX uq_timeslots_hospital_date_time ON Timeslots (hospital_id, timeslot_date, timeslot_time);
+
+-- Superseded by uq_timeslots_hospital_date_time, which has the same columns
+DROP INDEX idx_timeslots_hospital_date_time ON Timeslots;
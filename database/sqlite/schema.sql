@@ -0,0 +1,109 @@
+-- SQLite schema for STORAGE_BACKEND=sqlite (app/storage/sqlite.py).
+--
+-- The state init.sql reaches after every migration in database/migrations,
+-- written for SQLite. Add the SQLite form of a new migration here as well.
+-- Column types use the MySQL names so DATE, DATETIME/TIMESTAMP and TIME
+-- values are converted to date, datetime and timedelta on the way out.
+
+CREATE TABLE Users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    password_hash VARCHAR(255) NOT NULL,
+    email VARCHAR(100) NOT NULL COLLATE NOCASE,  -- Case-insensitive like the MySQL default collation
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE UNIQUE INDEX uq_users_email ON Users (email);
+
+CREATE TABLE Medical_History (
+    history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL REFERENCES Users (user_id),
+    doctor_notes TEXT,
+    lab_results TEXT,
+    report_date DATE
+);
+CREATE UNIQUE INDEX uq_medical_history_user ON Medical_History (user_id);
+
+CREATE TABLE Conditions (
+    condition_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    history_id INT NOT NULL REFERENCES Medical_History (history_id),
+    condition_name VARCHAR(255) NOT NULL,
+    condition_description TEXT,
+    diagnosed_date DATE
+);
+CREATE INDEX idx_conditions_history ON Conditions (history_id);
+
+CREATE TABLE Medications (
+    medication_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    history_id INT NOT NULL REFERENCES Medical_History (history_id),
+    medication_name VARCHAR(255) NOT NULL,
+    dosage VARCHAR(100),
+    start_date DATE NOT NULL,
+    end_date DATE DEFAULT NULL
+);
+CREATE INDEX idx_medications_history ON Medications (history_id);
+
+CREATE TABLE Hospitals (
+    hospital_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) NOT NULL,
+    address VARCHAR(255) NOT NULL,
+    phone_number VARCHAR(50),
+    updated_at TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+    latitude REAL NULL,
+    longitude REAL NULL
+);
+CREATE INDEX idx_hospitals_updated_at ON Hospitals (updated_at);
+
+-- MySQL's ON UPDATE CURRENT_TIMESTAMP
+CREATE TRIGGER trg_hospitals_updated_at AFTER UPDATE ON Hospitals
+WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE Hospitals SET updated_at = datetime('now', 'localtime') WHERE hospital_id = NEW.hospital_id;
+END;
+
+CREATE TABLE Appointments (
+    appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL REFERENCES Users (user_id),
+    appointment_time DATETIME NOT NULL,
+    hospital_id INT NOT NULL REFERENCES Hospitals (hospital_id),
+    status VARCHAR(16) DEFAULT 'Scheduled' CHECK (status IN ('Scheduled', 'Cancelled', 'Completed')),
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX idx_appointments_user_status_time ON Appointments (user_id, status, appointment_time);
+-- Partial indexes play the part of MySQL's scheduled_flag column: at most one
+-- Scheduled appointment per hospital slot and per user at a given time
+CREATE UNIQUE INDEX uq_appointments_hospital_slot ON Appointments (hospital_id, appointment_time)
+    WHERE status = 'Scheduled';
+CREATE UNIQUE INDEX uq_appointments_user_slot ON Appointments (user_id, appointment_time)
+    WHERE status = 'Scheduled';
+
+CREATE TABLE Timeslots (
+    timeslot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hospital_id INT NOT NULL REFERENCES Hospitals (hospital_id),
+    timeslot_time TIME NOT NULL,
+    timeslot_date DATE NOT NULL
+);
+CREATE UNIQUE INDEX uq_timeslots_hospital_date_time ON Timeslots (hospital_id, timeslot_date, timeslot_time);
+CREATE INDEX idx_timeslots_date_time_hospital ON Timeslots (timeslot_date, timeslot_time, hospital_id);
+
+CREATE TABLE Hospital_Schedules (
+    schedule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hospital_id INT NOT NULL REFERENCES Hospitals (hospital_id),
+    weekday TINYINT NOT NULL,          -- 0 = Monday, as WEEKDAY()
+    opens_at TIME NOT NULL,
+    closes_at TIME NOT NULL,
+    slot_minutes SMALLINT NOT NULL DEFAULT 60,
+    valid_from DATE NULL,
+    valid_until DATE NULL
+);
+CREATE INDEX idx_schedules_hospital_weekday ON Hospital_Schedules (hospital_id, weekday);
+
+CREATE TABLE Schedule_Exceptions (
+    exception_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hospital_id INT NULL REFERENCES Hospitals (hospital_id),
+    exception_date DATE NOT NULL,
+    opens_at TIME NULL,
+    closes_at TIME NULL,
+    slot_minutes SMALLINT NULL,
+    reason VARCHAR(255)
+);
+CREATE INDEX idx_exceptions_date_hospital ON Schedule_Exceptions (exception_date, hospital_id);